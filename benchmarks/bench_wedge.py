@@ -0,0 +1,879 @@
+#!/usr/bin/env python
+
+# Benchmarks of the wedgebuilder hot paths over a matrix of problem sizes, with
+# reference equivalence checks against the original implementation
+#
+# usage, from the repository root:
+#   python benchmarks/bench_wedge.py run -o baseline.json
+#   python benchmarks/bench_wedge.py run -o new.json
+#   python benchmarks/bench_wedge.py compare baseline.json new.json
+#   python benchmarks/bench_wedge.py check
+#
+# run records the wall time (min & median over repeats) and the peak memory
+# allocated during one call (tracemalloc) of earthmodel, tuningwedge (dense and
+# sparse), tuningcurve and the full pipeline for every case, plus the start up
+# time of the headless command line and the redraw time of the wedge & tuning
+# curve plots, fully drawn and blitted as in the GUI.  compare exits with
+# status 1 when any case got slower or bigger than the thresholds, check when
+# an output no longer matches
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(os.path.dirname(HERE), "src")
+sys.path.insert(0, SRC)
+
+import montecarlo  # noqa: E402
+import reference as ref  # noqa: E402
+import resultcache  # noqa: E402
+import segy  # noqa: E402
+import spectral  # noqa: E402
+import wavelets  # noqa: E402
+import wedgebuilder as wb  # noqa: E402
+import wedgecli  # noqa: E402
+
+# every axis is varied on its own around the default case, the original
+# 101 trace, 1 ms, 100 ms Ricker wedge
+DEFAULT_CASE = {"traces": 101, "dt": 0.001, "duration": 0.100, "batch": 1}
+CASE_AXES = {
+    "traces": (101, 1001, 10001),
+    "dt": (0.001, 0.0005, 0.00025),
+    "duration": (0.100, 0.200, 0.400),
+    "batch": (1, 16, 64),
+}
+QUICK_AXES = {
+    "traces": (101, 1001),
+    "dt": (0.001, 0.0005),
+    "duration": (0.100, 0.200),
+    "batch": (1, 16),
+}
+
+# modules the command line must not import at start up
+GUI_MODULES = ("PyQt5", "matplotlib")
+
+ROCK_LOW = [2000, 2000, 2000, 2000, 2000, 2000]
+ROCK_HIGH = [4000, 2600, 4000, 2600, 4000, 2600]
+
+
+def case_matrix(axes):
+    """Returns the list of cases, the default plus one per non-default value"""
+    cases = [dict(DEFAULT_CASE)]
+    for name, values in axes.items():
+        for value in values:
+            if value != DEFAULT_CASE[name]:
+                case = dict(DEFAULT_CASE)
+                case[name] = value
+                cases.append(case)
+    return cases
+
+
+def case_name(case):
+    return "traces={traces} dt={dt} duration={duration} batch={batch}".format(**case)
+
+
+def case_inputs(case, seed=0):
+    """
+    Assumes case a dict of traces, dt, duration & batch
+    The model is 240 ms long with a 0 to 100 ms wedge like the default, sampled
+    at dt, and batch > 1 builds a stack of random rock properties
+    Returns rock_props, the earthmodel geometry keywords and the wavelet
+    """
+    dt = case["dt"]
+    geometry = {
+        "traces": case["traces"],
+        "samples": int(round(0.240 / dt)),
+        "dt": dt,
+        "dz": 0.100 / (case["traces"] - 1),
+    }
+    if case["batch"] == 1:
+        rock_props = [3000, 2315, 2200, 2150, 3000, 2315]
+    else:
+        rng = np.random.default_rng(seed)
+        rock_props = rng.uniform(ROCK_LOW, ROCK_HIGH, (case["batch"], 6))
+    w = wb.wavelet(case["duration"], dt, 25)
+    return rock_props, geometry, w
+
+
+def measure(func, min_time=0.5, max_repeat=50):
+    """
+    Assumes func a callable without arguments
+    func is run once to warm up, then repeated until min_time has passed (at
+    least 3 and at most max_repeat times), then once more under tracemalloc
+    Returns a dict of time_min & time_median in seconds and peak_bytes
+    """
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    repeat = int(min(max(min_time / max(first, 1e-9), 3), max_repeat))
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "time_min": min(times),
+        "time_median": float(np.median(times)),
+        "peak_bytes": peak,
+        "repeat": repeat,
+    }
+
+
+def bench_case(case, min_time):
+    """Returns the measurements of every hot path for one case"""
+    rock_props, geometry, w = case_inputs(case)
+    imp, rc = wb.earthmodel(rock_props, **geometry)
+    synth = wb.tuningwedge(rc, w)
+    sparse = wb.sparse_reflectivity(
+        rock_props, wb.wedge_interfaces(**geometry), geometry["samples"]
+    )
+
+    def pipeline():
+        imp, rc = wb.earthmodel(rock_props, **geometry)
+        w = wb.wavelet(case["duration"], case["dt"], 25)
+        synth = wb.tuningwedge(rc, w)
+        z, z_tuning, amp, z_apparent, z_onset = wb.tuningcurve(rc, synth)
+        thickness = wb.wedge_thickness(
+            geometry["traces"], geometry["dt"], dz=geometry["dz"]
+        )
+        wb.summary_values(
+            rock_props,
+            25,
+            thickness[z_tuning] * geometry["dt"],
+            thickness[z_onset] * geometry["dt"],
+        )
+
+    # the float32 batch mode of the sweeps, reusing its buffers between calls
+    params = np.column_stack(
+        [np.reshape(rock_props, (-1, 6)), np.full(case["batch"], 25.0)]
+    )
+    sweep_geometry = {k: v for k, v in geometry.items() if k != "dt"}
+    buffers = {}
+
+    # a bank of 8 wavelets convolved in one pass
+    bank = wavelets.WaveletBank(case["duration"], case["dt"])
+    bank.add("ricker", np.linspace(15, 50, 8))
+
+    def sweep(method="synthetic"):
+        wb.sweep_scenarios(
+            params,
+            case["duration"],
+            case["dt"],
+            method=method,
+            buffers=buffers,
+            **sweep_geometry
+        )
+
+    def backend(name):
+        wb.tuningcurve(rc, wb.tuningwedge(rc, w, backend=name), backend=name)
+
+    results = {
+        "earthmodel": measure(lambda: wb.earthmodel(rock_props, **geometry), min_time),
+        "tuningwedge": measure(lambda: wb.tuningwedge(rc, w), min_time),
+        "tuningwedge sparse": measure(lambda: wb.tuningwedge(sparse, w), min_time),
+        "tuningwedge bank x8": measure(lambda: bank.tuningwedge(rc), min_time),
+        "tuningcurve": measure(lambda: wb.tuningcurve(rc, synth), min_time),
+        "wedge spectra": measure(
+            lambda: spectral.wedge_spectra(synth, w, case["dt"], rc=rc), min_time
+        ),
+        "pipeline": measure(pipeline, min_time),
+        "sweep float32": measure(sweep, min_time),
+        "sweep analytic": measure(lambda: sweep("analytic"), min_time),
+    }
+    # tuningwedge & tuningcurve on every backend
+    for name in wb.BACKENDS:
+        results["backend " + name] = measure(lambda: backend(name), min_time)
+    return results
+
+
+def bench_redraw(traces, min_time):
+    """
+    Times redrawing the wedge and tuning curve plots of a traces wide wedge on
+    an Agg canvas of the size of the GUI canvases, fully and by blitting new
+    data onto the existing artists
+    Returns a dict of the measure records per plot and redraw
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    import wedgeplots
+
+    rock_props = [3000, 2315, 2200, 2150, 3000, 2315]
+    imp, rc = wb.earthmodel(rock_props, traces)
+    synth = wb.tuningwedge(rc, wb.wavelet())
+    curve = wb.tuningcurve(rc, synth)
+    z, z_tuning, amp, z_apparent, z_onset = curve
+
+    wedge_fig = Figure(figsize=(5, 4), dpi=100)
+    wedge_canvas = FigureCanvasAgg(wedge_fig)
+    ax_model, ax_wedge = wedge_fig.subplots(2, sharex=True, sharey=True)
+    shape = wedgeplots.display_shape(ax_wedge)
+    images = wedgeplots.plot_wedge(ax_model, ax_wedge, imp, synth, rc, shape)
+    wedge_blitter = wedgeplots.Blitter(wedge_canvas)
+    wedge_blitter.add(*images)
+    wedge_canvas.draw()
+
+    amp_fig = Figure(figsize=(5, 2), dpi=100)
+    amp_canvas = FigureCanvasAgg(amp_fig)
+    ax_amp = amp_fig.subplots()
+    artists = wedgeplots.plot_tuningcurve(
+        ax_amp, ax_amp.twinx(), z, amp, z_tuning, z_apparent, z_onset
+    )
+    amp_blitter = wedgeplots.Blitter(amp_canvas)
+    amp_blitter.add(*artists[:-1])
+    amp_blitter.cover(artists.legend)
+    amp_canvas.draw()
+
+    def wedge_blit():
+        wedgeplots.update_wedge(images, imp, synth, rc, shape)
+        wedge_blitter.update()
+
+    def amp_blit():
+        wedgeplots.update_tuningcurve(artists, z, amp, z_tuning, z_apparent, z_onset)
+        amp_blitter.update()
+
+    return {
+        "wedge draw": measure(wedge_canvas.draw, min_time, 10),
+        "wedge blit": measure(wedge_blit, min_time),
+        "tuningcurve draw": measure(amp_canvas.draw, min_time, 10),
+        "tuningcurve blit": measure(amp_blit, min_time),
+    }
+
+
+def bench_startup(repeat=5):
+    """
+    Times a fresh interpreter importing the headless command line
+    Returns a dict of time_min & time_median in seconds and the GUI modules
+    that the import pulled in, which should be none
+    """
+    code = "import sys, wedgecli; print(','.join(m for m in {} if m in sys.modules))"
+    code = code.format(GUI_MODULES)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=SRC,
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        times.append(time.perf_counter() - start)
+    loaded = [name for name in out.stdout.strip().split(",") if name]
+    return {
+        "time_min": min(times),
+        "time_median": float(np.median(times)),
+        "gui_modules": loaded,
+    }
+
+
+def same_curve(curve, curve_ref, atol=1e-12):
+    """Returns True when two tuningcurve results match, amp to within atol"""
+    return np.allclose(curve[2], curve_ref[2], 0, atol) and all(
+        np.array_equal(curve[i], curve_ref[i]) for i in (0, 1, 3, 4)
+    )
+
+
+# name: check function, run in this order by check
+CHECKS = OrderedDict()
+
+
+def register(name):
+    """Adds the decorated check(expect, n_random, seed) to CHECKS as name"""
+
+    def decorator(func):
+        CHECKS[name] = func
+        return func
+
+    return decorator
+
+
+def check_props(n_random=30, seed=0):
+    """Returns the rock properties checked, 3 fixed & n_random random models"""
+    rng = np.random.default_rng(seed)
+    props = [
+        [3000, 2315, 2200, 2150, 3000, 2315],
+        [2500, 2200, 3200, 2400, 2800, 2300],
+        [3000, 2315, 2200, 2150, 3100, 2300],
+    ]
+    return props + rng.uniform(ROCK_LOW, ROCK_HIGH, (n_random, 6)).tolist()
+
+
+WAVES = [(0.100, 25), (0.100, 10), (0.100, 40), (0.200, 25), (0.050, 60)]
+
+
+@register("engine")
+def check_engine(expect, n_random, seed):
+    """The wavelet, earth model, wedge, tuning curve & summary of the reference,
+    and a stack of models computed at once
+    """
+    for duration, f in WAVES:
+        w = ref.wavelet(duration, 0.001, f)
+        expect(
+            np.array_equal(wb.wavelet(duration, 0.001, f), w),
+            "wavelet differs, duration={} f={}".format(duration, f),
+        )
+
+    props = check_props(n_random, seed)
+    for rp in props:
+        label = "rock_props={}".format([round(x, 1) for x in rp])
+        imp_ref, rc_ref = ref.earthmodel(rp)
+        imp, rc = wb.earthmodel(rp)
+        expect(np.array_equal(imp, imp_ref), "earthmodel imp differs, " + label)
+        expect(np.array_equal(rc, rc_ref), "earthmodel rc differs, " + label)
+
+        for duration, f in WAVES:
+            w = ref.wavelet(duration, 0.001, f)
+            synth_ref = ref.tuningwedge(rc_ref, w)
+            where = "{}, duration={} f={}".format(label, duration, f)
+            for method in ("direct", "fft"):
+                expect(
+                    np.allclose(wb.tuningwedge(rc, w, method), synth_ref, 0, 1e-12),
+                    "tuningwedge {} differs, {}".format(method, where),
+                )
+            try:
+                curve_ref = ref.tuningcurve(rc_ref, synth_ref, rp)
+            except IndexError:
+                # the original fails when no trace is tuned, nothing to compare
+                continue
+            curve = wb.tuningcurve(rc_ref, synth_ref)
+            expect(
+                all(np.array_equal(a, b) for a, b in zip(curve, curve_ref)),
+                "tuningcurve differs, " + where,
+            )
+            values = [rp, f, curve_ref[1], curve_ref[4]]
+            expect(
+                wb.results_summary(values) == ref.results_summary(values),
+                "results_summary differs, " + where,
+            )
+
+    # a stack of scenarios gives the same result as one call per scenario
+    stack = np.array(props[:8])
+    w = ref.wavelet(0.100, 0.001, 25)
+    imp, rc = wb.earthmodel(stack)
+    curve = wb.tuningcurve(rc, wb.tuningwedge(rc, w))
+    for k, rp in enumerate(stack):
+        single = wb.tuningcurve(rc[k], wb.tuningwedge(rc[k], w))
+        expect(
+            np.array_equal(imp[k], wb.earthmodel(rp)[0]),
+            "stacked earthmodel differs, scenario {}".format(k),
+        )
+        expect(
+            all(np.array_equal(a[k], b) for a, b in zip(curve, single)),
+            "stacked tuningcurve differs, scenario {}".format(k),
+        )
+
+
+@register("analytic")
+def check_analytic(expect, n_random, seed):
+    """The two-spike tuning curve & thickness of the direct engine"""
+    for rp in check_props(n_random, seed):
+        label = "rock_props={}".format([round(x, 1) for x in rp])
+        imp_ref, rc_ref = ref.earthmodel(rp)
+        rc = wb.earthmodel(rp)[1]
+        for duration, f in WAVES:
+            w = ref.wavelet(duration, 0.001, f)
+            where = "{}, duration={} f={}".format(label, duration, f)
+            try:
+                curve_ref = ref.tuningcurve(rc_ref, ref.tuningwedge(rc_ref, w), rp)
+            except IndexError:
+                continue
+            # the two-spike model sums exactly like the direct engine, while
+            # np.convolve rounds amp differently in the last place
+            analytic = wb.analytictuningcurve(rp, w)
+            direct = wb.tuningcurve(rc, wb.tuningwedge(rc, w, "direct"))
+            expect(
+                all(np.array_equal(a, b) for a, b in zip(analytic, direct))
+                and same_curve(analytic, curve_ref),
+                "analytictuningcurve differs, " + where,
+            )
+            expect(
+                all(
+                    np.array_equal(a, analytic[k])
+                    for a, k in zip(wb.analytictuningthickness(rp, w), (1, 4))
+                ),
+                "analytictuningthickness differs, " + where,
+            )
+
+
+@register("sparse")
+def check_sparse(expect, n_random, seed):
+    """The sparse reflectivity & synthetic of the dense engine"""
+    for rp in check_props(n_random, seed):
+        label = "rock_props={}".format([round(x, 1) for x in rp])
+        rc = wb.earthmodel(rp)[1]
+        sparse = wb.sparse_reflectivity(rp, wb.wedge_interfaces())
+        expect(
+            np.array_equal(wb.dense_reflectivity(sparse), rc),
+            "sparse_reflectivity differs, " + label,
+        )
+        for duration, f in WAVES:
+            w = ref.wavelet(duration, 0.001, f)
+            # two spikes per trace sum exactly like the direct engine
+            expect(
+                np.array_equal(
+                    wb.tuningwedge(sparse, w), wb.tuningwedge(rc, w, "direct")
+                ),
+                "sparse synthetic differs, {}, duration={} f={}".format(
+                    label, duration, f
+                ),
+            )
+
+    # N layer models, with pinched out and crossing layers, match the RCs of
+    # their dense impedance model and its convolution
+    rng = np.random.default_rng(seed)
+    w = ref.wavelet(0.100, 0.001, 25)
+    for layers in (2, 5, 9):
+        rocks = rng.uniform(ROCK_LOW[:2] * layers, ROCK_HIGH[:2] * layers)
+        interfaces = rng.integers(-5, 245, (layers - 1, 101))
+        interfaces[:, ::3] = np.sort(interfaces[:, ::3], axis=0)
+        interfaces[1:, ::7] = interfaces[0, ::7]
+        AI = rocks[0::2] * rocks[1::2]
+        imp = AI[wb._layer_model(240, interfaces)]
+        rc_dense = (imp[1:] - imp[:-1]) / (imp[1:] + imp[:-1])
+        sparse = wb.sparse_reflectivity(rocks, interfaces)
+        expect(
+            np.array_equal(wb.dense_reflectivity(sparse), rc_dense),
+            "sparse_reflectivity differs, {} layers".format(layers),
+        )
+        expect(
+            np.allclose(
+                wb.tuningwedge(sparse, w),
+                wb.tuningwedge(rc_dense, w, "direct"),
+                0,
+                1e-12,
+            ),
+            "sparse synthetic differs, {} layers".format(layers),
+        )
+
+
+@register("streaming")
+def check_streaming(expect, n_random, seed):
+    """The tuning curve reduced from a stream of trace blocks"""
+    stack = np.array(check_props(n_random, seed)[:8])
+    w = ref.wavelet(0.100, 0.001, 25)
+    rc = wb.earthmodel(stack)[1]
+    curve = wb.tuningcurve(rc, wb.tuningwedge(rc, w))
+    for block_traces in (1, 7, 64):
+        blocks = wb.wedge_blocks(stack, w, block_traces)
+        expect(
+            all(
+                np.array_equal(a, b)
+                for a, b in zip(wb.tuningcurve_blocks(blocks, stack), curve)
+            ),
+            "tuningcurve_blocks differs, block_traces={}".format(block_traces),
+        )
+
+
+@register("sweep")
+def check_sweep(expect, n_random, seed):
+    """The synthetic & analytic sweep methods agree with each other"""
+    grid = [3000, 2315, [2000, 2400, 2800], 2150, [2800, 3200], 2315]
+    analytic = wb.tuningsweep(grid, [20, 30], method="analytic")
+    for dtype in (np.float64, np.float32):
+        synthetic = wb.tuningsweep(grid, [20, 30], method="synthetic", dtype=dtype)
+        expect(
+            np.array_equal(synthetic, analytic),
+            "tuningsweep methods disagree in {}".format(np.dtype(dtype)),
+        )
+
+
+@register("cache")
+def check_cache(expect, n_random, seed):
+    """Results read back from the disk cache are those calculated"""
+    rp = [3000, 2315, 2200, 2150, 3000, 2315]
+    grid = [3000, 2315, [2000, 2400], 2150, 3000, 2315]
+    with tempfile.TemporaryDirectory() as directory:
+        cache = resultcache.ResultCache(directory)
+        for _ in range(2):
+            results = wedgecli.compute(rp, cache=cache)
+            table = wedgecli.tuningsweep(grid, cache=cache, f=[20, 30])
+        expect(cache.hits > 0, "the cache is never hit")
+        fresh = wedgecli.compute(rp)
+        expect(
+            all(np.array_equal(results[k], fresh[k]) for k in fresh),
+            "cached pipeline results differ",
+        )
+        expect(
+            np.array_equal(table, wb.tuningsweep(grid, [20, 30])),
+            "cached sweep differs",
+        )
+
+
+@register("segy")
+def check_segy(expect, n_random, seed):
+    """SEG-Y files read back as the float32 synthetic & thickness written"""
+    stack = np.array(check_props(n_random, seed)[:3])
+    rc = wb.earthmodel(stack)[1]
+    synth = wb.tuningwedge(rc, wb.wavelet())
+    thickness = wb.wedge_thickness(synth.shape[-1]) * 0.001
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "wedge.sgy")
+        segy.write_segy(path, synth, 0.001, thickness, chunk_traces=40)
+        text, binary, traces = segy.read_segy(path)
+        # one line of traces per model, one row of samples per trace
+        data = np.array(traces["data"]).reshape(
+            synth.shape[:-2] + (-1, synth.shape[-2])
+        )
+        expect(
+            binary["samples"] == synth.shape[-2]
+            and binary["sample_interval"] == 1000
+            and np.array_equal(np.swapaxes(data, -1, -2), synth.astype(np.float32)),
+            "SEG-Y traces differ",
+        )
+        expect(
+            np.array_equal(
+                traces["header"]["thickness"][: synth.shape[-1]],
+                np.rint(thickness * 1e6),
+            ),
+            "SEG-Y thickness headers differ",
+        )
+        del traces
+
+
+@register("montecarlo")
+def check_montecarlo(expect, n_random, seed):
+    """The streaming Monte Carlo statistics match those of all realizations,
+    the percentiles within a histogram bin
+    """
+    spec = [{"normal": [3000, 100]}, 2315, {"uniform": [2000, 2400]}, 2150, 3000]
+    spec += [2315, {"normal": [25, 2]}]
+    stats = montecarlo.montecarlo(spec[:6], spec[6], 3000, seed, batch_size=512)
+    distributions = [montecarlo.distribution(entry) for entry in spec]
+    children = np.random.SeedSequence(seed).spawn(6)
+    table = np.concatenate(
+        [
+            wb.sweep_scenarios(
+                montecarlo.sample(distributions, size, np.random.default_rng(child)),
+                method="analytic",
+            )
+            for child, size in zip(children, [512] * 5 + [440])
+        ]
+    )
+    for j, name in enumerate(stats.names):
+        width = 2.0 ** stats.histogram.k[j]
+        ordered = np.sort(table[name])
+        expect(
+            np.isclose(stats.moments.mean[j], table[name].mean())
+            and np.isclose(stats.moments.std()[j], table[name].std(ddof=1))
+            and all(
+                abs(
+                    stats.percentile(name, q)
+                    - ordered[max(int(np.ceil(q / 100 * len(ordered))) - 1, 0)]
+                )
+                <= width
+                for q in (0, 10, 50, 90, 100)
+            ),
+            "montecarlo statistics differ, " + name,
+        )
+
+
+@register("avo")
+def check_avo(expect, n_random, seed):
+    """The exact AVO gather is the normal incidence wedge at 0 degrees, and
+    every angle of a gather the direct convolution of its reflectivity
+    """
+    rp = [3000, 2315, 2200, 2150, 3000, 2315]
+    elastic = wb.elastic_props(rp, [1500, 1000, 1500])
+    rc = wb.earthmodel(rp)[1]
+    w = wb.ricker(0.100, 0.001, 25)
+    for method in wb.AVO_METHODS:
+        rc_avo, synth = wb.avo_tuningwedge(elastic, [0, 15, 30, 45], w, method)
+        expect(
+            (method != "zoeppritz" or np.allclose(rc_avo[0], rc, 0, 1e-15))
+            and all(
+                np.allclose(synth[i], wb.tuningwedge(rc_avo[i], w, "direct"), 0, 1e-12)
+                for i in range(4)
+            ),
+            "AVO gather differs, " + method,
+        )
+
+
+@register("bank")
+def check_bank(expect, n_random, seed):
+    """The wedges of a wavelet bank are those of its wavelets one at a time"""
+    rc = wb.earthmodel([3000, 2315, 2200, 2150, 3000, 2315])[1]
+    bank = wavelets.WaveletBank(0.100, 0.001)
+    bank.add("ricker", [20, 25, 30]).add("ormsby", 5, 10, 40, 50)
+    bank.add("klauder", 10, 60).add("butterworth", 8, 50)
+    expect(np.array_equal(bank.w[1], wb.wavelet()), "bank Ricker differs")
+    for method in ("direct", "fft"):
+        synth = bank.tuningwedge(rc, method)
+        expect(
+            all(
+                np.allclose(synth[i], wb.tuningwedge(rc, w, method), 0, 1e-12)
+                for i, w in enumerate(bank.w)
+            ),
+            "wavelet bank wedge differs, " + method,
+        )
+
+
+@register("spectral")
+def check_spectral(expect, n_random, seed):
+    """The spectral panel & STFT are those of every trace & frame on its own,
+    and the notch thickness that of the wedge where the band has a notch
+    """
+    rc = wb.earthmodel([3000, 2315, 2200, 2150, 3000, 2315])[1]
+    synth = wb.tuningwedge(rc, wb.wavelet())
+    f, amp = spectral.spectral_panel(synth, window="hann")
+    taper = np.hanning(len(synth))
+    expect(
+        np.allclose(
+            amp[:, 7],
+            np.abs(np.fft.rfft(synth[:, 7] * taper, 2 * len(f) - 2)),
+            0,
+            1e-12,
+        ),
+        "spectral panel differs",
+    )
+    t, f, amp = spectral.stft(synth, length=20, hop=3)
+    frame = synth[3 * 5 : 3 * 5 + 20, 60] * np.hanning(20)
+    expect(
+        np.allclose(
+            amp[5, :, 60], np.abs(np.fft.rfft(frame, 2 * len(f) - 2)), 0, 1e-12
+        ),
+        "STFT differs",
+    )
+    z = wb.tuningcurve(rc, synth)[0]
+    spectra = spectral.wedge_spectra(synth, wb.wavelet(), rc=rc)
+    found = spectra["count"] > 0
+    expect(
+        found[30:].all()
+        and np.abs(spectra["thickness"][found] * 1000 - z[found]).max() < 0.5,
+        "notch thickness differs from the wedge thickness",
+    )
+
+
+@register("backends")
+def check_backends(expect, n_random, seed):
+    """Every backend gives the results of the NumPy reference, the threaded one
+    also split into more blocks than this machine may have cores
+    """
+    rc = wb.earthmodel([3000, 2315, 2200, 2150, 3000, 2315], 1001, dz=0.0001)[1]
+    stack = np.stack([rc, -rc, 2 * rc])
+    w = wb.wavelet()
+    synth = wb.tuningwedge(rc, w)
+    synth[200:, 5] = np.nan
+    synth[3, 700] = np.nan
+    curve_ref = wb.tuningcurve(rc, synth, backend="numpy")
+    backends = dict(wb.BACKENDS, split=wb.ThreadedBackend(workers=4, min_traces=8))
+    for name, backend in backends.items():
+        for method in ("direct", "fft"):
+            for dtype in (float, np.float32):
+                for model in (rc, stack):
+                    expect(
+                        np.array_equal(
+                            wb.tuningwedge(
+                                model, w, method, dtype=dtype, backend=backend
+                            ),
+                            wb.tuningwedge(
+                                model, w, method, dtype=dtype, backend="numpy"
+                            ),
+                        ),
+                        "{} backend wedge differs, {} {} {}D".format(
+                            name, method, np.dtype(dtype), model.ndim
+                        ),
+                    )
+        curve = wb.tuningcurve(rc, synth, backend=backend)
+        expect(
+            all(np.array_equal(a, b) for a, b in zip(curve, curve_ref)),
+            "{} backend tuning curve differs".format(name),
+        )
+
+
+@register("startup")
+def check_startup(expect, n_random, seed):
+    """The headless command line imports no GUI modules"""
+    startup = bench_startup(repeat=1)
+    expect(
+        not startup["gui_modules"],
+        "wedgecli imports GUI modules: {}".format(startup["gui_modules"]),
+    )
+
+
+def check(n_random=30, seed=0, names=None, report=None):
+    """
+    Runs the CHECKS of names (default all) against the reference
+    implementation and the alternative engines of wedgebuilder, each on its
+    own, so that a check that fails or raises does not stop the others.
+    report, if given, is called as report(name, failures, seconds) after each
+    Returns a list of failure messages, each prefixed with the name of its
+    check, empty when everything matches
+    """
+    failures = []
+    for name in CHECKS if names is None else names:
+        found = []
+        start = time.perf_counter()
+        try:
+            CHECKS[name](
+                lambda ok, message: ok or found.append(message), n_random, seed
+            )
+        except Exception as e:
+            found.append("raised {}: {}".format(type(e).__name__, e))
+        if report is not None:
+            report(name, found, time.perf_counter() - start)
+        failures += ["{}: {}".format(name, message) for message in found]
+    return failures
+
+
+def run(args):
+    cases = case_matrix(QUICK_AXES if args.quick else CASE_AXES)
+    results = {}
+    for case in cases:
+        name = case_name(case)
+        print(name, file=sys.stderr)
+        for func, record in bench_case(case, args.min_time).items():
+            record.update(case)
+            results["{} [{}]".format(func, name)] = record
+    results["cli startup"] = bench_startup()
+    for traces in (101, 10001):
+        for plot, record in bench_redraw(traces, args.min_time).items():
+            record["traces"] = traces
+            results["redraw {} [traces={}]".format(plot, traces)] = record
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    failures = [] if args.no_check else check()
+    for message in failures:
+        print("FAIL", message, file=sys.stderr)
+    return 1 if failures else 0
+
+
+def compare(args):
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)["results"]
+    with open(args.current) as fh:
+        current = json.load(fh)["results"]
+
+    regressions = 0
+    print("{:<62} {:>9} {:>9} {:>7} {:>7}".format("", "ms", "ms", "time", "memory"))
+    for name in sorted(set(baseline) & set(current)):
+        old, new = baseline[name], current[name]
+        time_ratio = new["time_min"] / old["time_min"]
+        mem_ratio = None
+        if old.get("peak_bytes"):
+            mem_ratio = new["peak_bytes"] / old["peak_bytes"]
+        slower = time_ratio > args.time_threshold
+        bigger = mem_ratio is not None and mem_ratio > args.memory_threshold
+        regressions += slower or bigger
+        print(
+            "{:<62} {:>9.3f} {:>9.3f} {:>6.2f}x {:>7} {}".format(
+                name,
+                old["time_min"] * 1000,
+                new["time_min"] * 1000,
+                time_ratio,
+                "-" if mem_ratio is None else "{:.2f}x".format(mem_ratio),
+                "REGRESSION" if slower or bigger else "",
+            )
+        )
+    for name in sorted(set(baseline) ^ set(current)):
+        print(
+            "{:<62} only in {}".format(
+                name, "baseline" if name in baseline else "current"
+            )
+        )
+    return 1 if regressions else 0
+
+
+def check_only(args):
+    def report(name, found, seconds):
+        print("{:<12} {:>7.1f} s  {}".format(name, seconds, "FAIL" if found else "ok"))
+
+    unknown = [name for name in args.only if name not in CHECKS]
+    if unknown:
+        print("Unknown checks: {}".format(", ".join(unknown)), file=sys.stderr)
+        return 2
+    failures = check(names=args.only or None, report=report)
+    for message in failures:
+        print("FAIL", message)
+    print("{} failures".format(len(failures)))
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmarks & equivalence checks of the wedgebuilder hot paths"
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("-o", "--output", help="JSON file, default stdout")
+    run_parser.add_argument("--quick", action="store_true", help="smaller size matrix")
+    run_parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.5,
+        help="seconds to spend repeating each measurement",
+    )
+    run_parser.add_argument(
+        "--no-check", action="store_true", help="skip the equivalence checks"
+    )
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="diff two runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--time-threshold",
+        type=float,
+        default=1.25,
+        help="time ratio above which a case is a regression",
+    )
+    compare_parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=1.10,
+        help="peak memory ratio above which a case is a regression",
+    )
+    compare_parser.set_defaults(func=compare)
+
+    check_parser = commands.add_parser("check", help="only the equivalence checks")
+    check_parser.add_argument(
+        "only",
+        nargs="*",
+        metavar="CHECK",
+        help="run only these checks: {}".format(", ".join(CHECKS)),
+    )
+    check_parser.set_defaults(func=check_only)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
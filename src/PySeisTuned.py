@@ -7,6 +7,7 @@
 
 import sys
 import os
+import threading
 from PyQt5.QtWidgets import (
     QMainWindow,
     QApplication,
@@ -23,12 +24,33 @@ from PyQt5.QtWidgets import (
     QMessageBox,
     QDialog,
     QFileDialog,
+    QCheckBox,
+    QComboBox,
+    QSpinBox,
+    QDoubleSpinBox,
+    QProgressBar,
+    QProgressDialog,
+    QDialogButtonBox,
+)
+from PyQt5.QtGui import QIcon, QValidator, QDoubleValidator, QFont
+from PyQt5.QtCore import (
+    pyqtSlot,
+    pyqtSignal,
+    QObject,
+    QRunnable,
+    QThreadPool,
+    QTimer,
 )
-from PyQt5.QtGui import QIcon, QValidator, QDoubleValidator
-from PyQt5.QtCore import pyqtSlot
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import wedgebuilder as wb
+import montecarlo
+import spectral
+import wedgeexport
+import wedgeplots
+from pipeline import GEOMETRY, WedgePipeline
+from profiling import Profiler
+import resultcache
 
 
 class PySeisTuned(QMainWindow):
@@ -103,11 +125,11 @@ class PySeisTuned(QMainWindow):
 
     def settingsMenu(self):
         """
-		1) Adjust color bar settings
-		2) Change units for velocity & distance (English vs. Metric)
-		3) Change tuning wedge plot from interpolated density to wiggle plot
-		4) Correct Ricker wavelet for apparent frequency
-		"""
+        1) Adjust color bar settings
+        2) Change units for velocity & distance (English vs. Metric)
+        3) Change tuning wedge plot from interpolated density to wiggle plot
+        4) Correct Ricker wavelet for apparent frequency
+        """
         self.settingsWindow = QDialog()
         self.settingsWindow.setWindowTitle("Settings")
         self.settingsWindow.exec_()
@@ -150,11 +172,13 @@ class tabbedWindow(QWidget):
         self.tabs = QTabWidget()
         self.tab1 = QWidget()
         self.tab2 = QWidget()
+        self.tab3 = QWidget()
         self.tabs.resize(900, 740)
 
         # Add tabs
         self.tabs.addTab(self.tab1, "Inputs")
         self.tabs.addTab(self.tab2, "Summary")
+        self.tabs.addTab(self.tab3, "Spectral")
 
         # Create the first tab
 
@@ -163,6 +187,9 @@ class tabbedWindow(QWidget):
         self.resetButton = QPushButton("Reset", self)
         self.calculateButton = QPushButton("Calculate", self)
         self.exportButton = QPushButton("Export", self)
+        self.exportButton.setStatusTip("Save the figures, arrays, summary & SEG-Y")
+        self.liveCheck = QCheckBox("Live update", self)
+        self.liveCheck.setStatusTip("Recalculate the wedge while typing")
 
         # initialize the labels and input boxes
         inputsLabel = QLabel("<b>Rock Property Inputs:</b>")
@@ -201,6 +228,15 @@ class tabbedWindow(QWidget):
         self._update_amp_ax = self.ampPlotBox.figure.subplots()
         self._update_amp_ax2 = self._update_amp_ax.twinx()
 
+        # the plots keep their artists between calculations and blit new data
+        # onto them, the whole canvas is only redrawn when its axes change
+        self.rickerBlitter = wedgeplots.Blitter(self.rickerBox)
+        self.modelBlitter = wedgeplots.Blitter(self.modelBox)
+        self.ampBlitter = wedgeplots.Blitter(self.ampPlotBox)
+        self._rickerLine = None
+        self._wedgeImages = None
+        self._ampArtists = None
+
         # initialize spacers to help with layout
         vspacerSG1 = QSpacerItem(QSizePolicy.Minimum, QSizePolicy.Expanding)
         vspacerSG2 = QSpacerItem(QSizePolicy.Minimum, QSizePolicy.Expanding)
@@ -231,6 +267,7 @@ class tabbedWindow(QWidget):
         subGrid.addItem(vspacerSG2, 9, 0, 3)
         subGrid.addWidget(self.resetButton, 10, 1)
         subGrid.addWidget(self.calculateButton, 10, 2)
+        subGrid.addWidget(self.liveCheck, 11, 1)
         subGrid.addWidget(self.exportButton, 11, 2)
 
         # attach the widgets to the main grid layout
@@ -253,18 +290,116 @@ class tabbedWindow(QWidget):
         resultsLabel = QLabel("Detailed Wedge Model Results:")
         self.resultsBox = QTextBrowser()
         # self.resultsBox.setText(wb.results_summary())
-        blankLabel = QLabel("\n")
+        timingLabel = QLabel("Calculation Timing:")
+        self.timingBox = QTextBrowser()
+        timingFont = QFont("Monospace")
+        timingFont.setStyleHint(QFont.TypeWriter)
+        self.timingBox.setFont(timingFont)
+        self.timingBox.setLineWrapMode(QTextBrowser.NoWrap)
+        self.profileCheck = QCheckBox("Record timing")
+        self.profileCheck.setChecked(True)
+
+        # Monte Carlo uncertainty of the tuning thickness, every rock property
+        # (and the frequency) drawn from a normal distribution around its input
+        montecarloLabel = QLabel("<b>Monte Carlo Uncertainty:</b>")
+        self.rockSpreadBox = QDoubleSpinBox()
+        self.rockSpreadBox.setRange(0, 50)
+        self.rockSpreadBox.setValue(5)
+        self.rockSpreadBox.setSuffix(" %")
+        self.freqSpreadBox = QDoubleSpinBox()
+        self.freqSpreadBox.setRange(0, 50)
+        self.freqSpreadBox.setSuffix(" %")
+        self.realizationsBox = QSpinBox()
+        self.realizationsBox.setRange(1000, 1000000)
+        self.realizationsBox.setSingleStep(10000)
+        self.realizationsBox.setValue(100000)
+        self.seedBox = QSpinBox()
+        self.seedBox.setRange(0, 2**31 - 1)
+        self.seedBox.setValue(1)
+        self.montecarloButton = QPushButton("Run", self)
+        self.montecarloButton.setStatusTip(
+            "Percentiles of the tuning thickness of the last calculation"
+        )
+        self.montecarloProgress = QProgressBar()
+        montecarloGrid = QGridLayout()
+        montecarloGrid.setSpacing(5)
+        montecarloGrid.addWidget(montecarloLabel, 0, 0, 1, 2)
+        montecarloGrid.addWidget(QLabel("Rock property std. dev.:"), 1, 0)
+        montecarloGrid.addWidget(self.rockSpreadBox, 1, 1)
+        montecarloGrid.addWidget(QLabel("Frequency std. dev.:"), 2, 0)
+        montecarloGrid.addWidget(self.freqSpreadBox, 2, 1)
+        montecarloGrid.addWidget(QLabel("Realizations:"), 3, 0)
+        montecarloGrid.addWidget(self.realizationsBox, 3, 1)
+        montecarloGrid.addWidget(QLabel("Seed:"), 4, 0)
+        montecarloGrid.addWidget(self.seedBox, 4, 1)
+        montecarloGrid.addWidget(self.montecarloProgress, 5, 0)
+        montecarloGrid.addWidget(self.montecarloButton, 5, 1)
+
         grid = QGridLayout()
         grid.setSpacing(10)
         grid.addWidget(resultsLabel, 1, 0)
         grid.addWidget(self.resultsBox, 2, 0)
-        grid.addWidget(blankLabel, 3, 0)
+        grid.addWidget(timingLabel, 1, 1)
+        grid.addWidget(self.timingBox, 2, 1)
+        grid.addWidget(self.profileCheck, 3, 1)
+        grid.addLayout(montecarloGrid, 3, 0)
         self.tab2.setLayout(grid)
 
+        # Create the third tab
+
+        # the spectral tuning panel of the wedge and the thickness read from
+        # its notches, only computed while the tab is shown
+        spectraLabel = QLabel("<b>Spectral Decomposition</b>")
+        self.spectraBox = PlotCanvas(self, width=6, height=5)
+        self._update_spectra_ax, self._update_spectra_ax2 = (
+            self.spectraBox.figure.subplots(
+                2, sharex=True, gridspec_kw={"height_ratios": (2, 1)}
+            )
+        )
+        self.spectraStale = False
+        spectraGrid = QGridLayout()
+        spectraGrid.setSpacing(10)
+        spectraGrid.addWidget(spectraLabel, 0, 0)
+        spectraGrid.addWidget(self.spectraBox, 1, 0)
+        self.tab3.setLayout(spectraGrid)
+
         # Add tabs to widget
         self.layout.addWidget(self.tabs)
         self.setLayout(self.layout)
 
+        # the calculation pipeline caches every stage between calculations
+        # and runs off the GUI thread, one calculation at a time, where a newer
+        # calculation cancels a stale one that has not finished yet
+        # every pipeline stage and plot update of a calculation is timed and
+        # shown in the Summary tab, unless timing is switched off
+        self.profiler = Profiler()
+        self.profileCheck.toggled.connect(self.set_profiling)
+        self.pipeline = WedgePipeline(
+            profiler=self.profiler, cache=resultcache.default_cache()
+        )
+        self.pipelineLock = threading.Lock()
+        self.calculatePool = QThreadPool(self)
+        self.calculatePool.setMaxThreadCount(1)
+        self.calculateGeneration = 0
+        self.pendingUpdates = set()
+        self.invalidatePipeline = False
+
+        # in live update mode the inputs are recalculated once typing pauses
+        self.liveTimer = QTimer(self)
+        self.liveTimer.setSingleShot(True)
+        self.liveTimer.setInterval(300)
+
+        # exports are written in the background, one at a time
+        self.exportDialog = None
+        self.exportPool = QThreadPool(self)
+        self.exportPool.setMaxThreadCount(1)
+
+        # so are Monte Carlo runs, whose percentiles follow the summary
+        self.montecarloPool = QThreadPool(self)
+        self.montecarloPool.setMaxThreadCount(1)
+        self.montecarloWorker = None
+        self.montecarloSummary = ""
+
         # initialize default values for all input boxes across both tabs
         self.calculateState = 0
         self.set_defaultValues()
@@ -317,43 +452,39 @@ class tabbedWindow(QWidget):
             rhob3 = float(self.layer3rhob.text())
 
             # create a list of the rock properties to pass to wb.earthmodel()
-            # calculate reflection coefficients of the wedge model
             self.rock_props = [vp1, rhob1, vp2, rhob2, vp3, rhob3]
-            self.earthmod, self.refCoef = wb.earthmodel(self.rock_props)
 
             # wavelet design parameters
             self.f = float(self.freqbox.text())
             dur = float(self.lenbox.text())
             dt = float(self.sampbox.text())
-
-            # design Ricker wavelet
-            self.w = wb.wavelet(dur, dt, self.f)
-            # call a function to update the self.rickerBox MLP Canvas
-            self.update_rickerPlot()
-
-            # calculate the tuning wedge
-            self.synth = wb.tuningwedge(self.refCoef, self.w)
-            # call a function to update the modelBox MLP Canvas
-            self.update_wedgePlot()
-
-            # calculate the tuning curve
-            self.z, self.z_tuning, self.amp, self.z_apparent, self.z_onset = wb.tuningcurve(
-                self.refCoef, self.synth, self.rock_props
+            self.waveletParms = (dur, dt, self.f)
+
+            # pass the inputs to the calculation pipeline in a background
+            # worker, which only reruns the stages downstream of the inputs
+            # that changed and sends the results back to on_calculated
+            self.profiler.clear()
+            self.calculateGeneration += 1
+            worker = PipelineWorker(
+                self.pipeline,
+                self.pipelineLock,
+                self.calculateGeneration,
+                lambda: self.calculateGeneration,
+                {"rock_props": self.rock_props, "wavelet_parms": self.waveletParms},
+                self.invalidatePipeline,
             )
-            # call a function to update the ampPlotBox MLP Canvas
-            self.update_ampPlot()
-
-            # send results to resultsBox
-            self.resultsBox.clear()
-            self.resultArr = [self.rock_props, self.f, self.z_tuning, self.z_onset]
-            # self.resultsBox.setText('Something has happened')
-            self.update_resultsBox()
-
-            self.exportButton.setEnabled(True)
+            self.invalidatePipeline = False
+            worker.signals.finished.connect(self.on_calculated)
+            worker.signals.error.connect(self.on_calculateError)
+            self.calculatePool.start(worker)
 
+        self.calculateValues = calculateValues
         self.calculateButton.clicked.connect(calculateValues)
+        self.liveTimer.timeout.connect(self.live_calculate)
 
         self.exportButton.clicked.connect(self.export_figures)
+        self.montecarloButton.clicked.connect(self.run_montecarlo)
+        self.tabs.currentChanged.connect(self.on_tabChanged)
 
     # function that validates the QLineEdit input fields upon changing text
     def check_state(self, *args, **kwargs):
@@ -373,9 +504,76 @@ class tabbedWindow(QWidget):
         sender.setStyleSheet("QLineEdit { background-color: %s }" % color)
         if len(self.validatorList) == 9:
             self.calculateButton.setEnabled(True)
+            if self.liveCheck.isChecked():
+                self.liveTimer.start()
         else:
             self.calculateButton.setEnabled(False)
 
+    # recalculate after the inputs stopped changing, in live update mode
+    def live_calculate(self):
+        if self.liveCheck.isChecked() and self.calculateButton.isEnabled():
+            self.calculateValues()
+
+    # receives the results of a PipelineWorker on the GUI thread
+    def on_calculated(self, generation, results):
+        # stages recomputed by a stale calculation still need their plots
+        # redrawn by the current one
+        self.pendingUpdates.update(results["updated"])
+        if generation != self.calculateGeneration or "summary" not in results:
+            return
+        updated, self.pendingUpdates = self.pendingUpdates, set()
+
+        # earth model, Ricker wavelet, tuning wedge and tuning curve
+        self.earthmod, self.refCoef = results["earthmodel"]
+        self.w = results["wavelet"]["w"]
+        self.waveletAxis = results["wavelet"]["t"]
+        self.synth = results["synth"]
+        self.z, self.z_tuning, self.amp, self.z_apparent, self.z_onset = results[
+            "tuningcurve"
+        ]
+        self.summary = results["summary"]
+        self.resultInputs = results["inputs"]
+
+        # call functions to update the MLP Canvases whose data changed
+        if "wavelet" in updated:
+            self.update_rickerPlot()
+        if "synth" in updated:
+            self.update_wedgePlot()
+        if "tuningcurve" in updated:
+            self.update_ampPlot()
+        if "synth" in updated:
+            self.spectraStale = True
+        if self.spectraStale and self.tabs.currentWidget() is self.tab3:
+            self.update_spectraPlot()
+
+        # send results to resultsBox
+        if "summary" in updated:
+            self.montecarloSummary = ""
+            self.resultsBox.clear()
+            self.update_resultsBox()
+        if self.profiler.enabled:
+            self.timingBox.setText(self.profiler.report())
+
+        self.exportButton.setEnabled(True)
+        self.montecarloButton.setEnabled(self.montecarloWorker is None)
+
+    # the spectral panel of the last calculation is drawn once its tab is shown
+    def on_tabChanged(self, index):
+        if self.spectraStale and self.tabs.widget(index) is self.tab3:
+            self.update_spectraPlot()
+            if self.profiler.enabled:
+                self.timingBox.setText(self.profiler.report())
+
+    def on_calculateError(self, generation, message):
+        if generation == self.calculateGeneration:
+            QMessageBox.warning(self, "Calculation failed", message)
+
+    # switching timing off makes the instrumentation a no-op
+    def set_profiling(self, enabled):
+        self.profiler.enabled = enabled
+        self.profiler.clear()
+        self.timingBox.setText("" if enabled else "Timing is switched off")
+
     # function to set all inputs to default state
     def set_defaultValues(self):
         self.calculateState = 0
@@ -391,6 +589,25 @@ class tabbedWindow(QWidget):
         self.resultsBox.setText("don't panic!")
         self.calculateButton.setEnabled(False)
         self.exportButton.setEnabled(False)
+        self.montecarloSummary = ""
+        if self.montecarloWorker is None:
+            self.montecarloButton.setEnabled(False)
+        self.spectraStale = False
+        self._update_spectra_ax.clear()
+        self._update_spectra_ax2.clear()
+        self.spectraBox.draw_idle()
+        # a calculation in progress is cancelled and its results dropped, and
+        # the next one recomputes every stage to redraw the cleared plots,
+        # without waiting here for the worker to let go of the pipeline
+        self.calculateGeneration += 1
+        self.pendingUpdates.clear()
+        self.invalidatePipeline = True
+        # the next calculation draws new artists on the cleared axes
+        self._rickerLine = None
+        self._wedgeImages = None
+        self._ampArtists = None
+        for blitter in (self.rickerBlitter, self.modelBlitter, self.ampBlitter):
+            blitter.clear()
         # clear out the FigureCanvases if there is no existing plots
         if self.calculateState == 0:
             self._update_ricker_ax.clear()
@@ -436,93 +653,228 @@ class tabbedWindow(QWidget):
 
     # this function updates the self.rickerBox MLP Canvas widget when 'Calculate' button is clicked
     def update_rickerPlot(self):
-        self._update_ricker_ax.cla()
-        self._update_ricker_ax.tick_params(labelleft=True, labelbottom=True)
-        x = wb.get_wavelet_plot_parms(self.w)
-        y = self.w
-        self._update_ricker_ax.plot(x, y)
-        self._update_ricker_ax.figure.canvas.draw()
+        with self.profiler.stage("update_rickerPlot"):
+            if self._rickerLine is None:
+                self._update_ricker_ax.cla()
+                self._update_ricker_ax.tick_params(labelleft=True, labelbottom=True)
+                self._rickerLine = wedgeplots.plot_ricker(
+                    self._update_ricker_ax, self.waveletAxis, self.w
+                )
+                self.rickerBlitter.add(self._rickerLine)
+                redraw = True
+            else:
+                redraw = wedgeplots.update_ricker(
+                    self._rickerLine, self.waveletAxis, self.w
+                )
+            with self.profiler.stage("update_rickerPlot draw"):
+                self.rickerBlitter.update(redraw)
 
     # this function update the modelBox MLP Canvas widget on 'calculate' button click
+    # images larger than the canvas are decimated to its size before display
     def update_wedgePlot(self):
-        self._update_earthmodel_ax.cla()
-        self._update_wedge_ax.cla()
-        self._update_earthmodel_ax.tick_params(labelleft=True)
-        self._update_wedge_ax.tick_params(labelleft=True, labelbottom=True)
-        self._update_earthmodel_ax.imshow(
-            self.earthmod, cmap="viridis_r", aspect=0.2, interpolation="bilinear"
-        )
-        self._update_wedge_ax.imshow(
-            self.synth, cmap="viridis_r", aspect=0.2, interpolation="bilinear"
-        )
-        self._update_wedge_ax.imshow(wb.mask_rc(self.refCoef), cmap="Greys", aspect=0.2)
-        self._update_earthmodel_ax.set_ylabel("TWT (ms)")
-        self._update_wedge_ax.set_xlabel("Thickness, TWT (ms)")
-        self._update_wedge_ax.set_ylabel("TWT (ms)")
-        self._update_wedge_ax.set_xlim(0, 100)
-        self._update_earthmodel_ax.figure.canvas.draw()
-        self._update_wedge_ax.figure.canvas.draw()
+        with self.profiler.stage("update_wedgePlot") as stage:
+            shape = wedgeplots.display_shape(self._update_wedge_ax)
+            redraw = self._wedgeImages is None or self._wedgeShape != self.synth.shape
+            with self.profiler.stage("update_wedgePlot imshow"):
+                if redraw:
+                    self._update_earthmodel_ax.cla()
+                    self._update_wedge_ax.cla()
+                    self._update_earthmodel_ax.tick_params(labelleft=True)
+                    self._update_wedge_ax.tick_params(labelleft=True, labelbottom=True)
+                    self._wedgeImages = wedgeplots.plot_wedge(
+                        self._update_earthmodel_ax,
+                        self._update_wedge_ax,
+                        self.earthmod,
+                        self.synth,
+                        self.refCoef,
+                        shape,
+                    )
+                    self._wedgeShape = self.synth.shape
+                    self.modelBlitter.clear()
+                    self.modelBlitter.add(*self._wedgeImages)
+                else:
+                    wedgeplots.update_wedge(
+                        self._wedgeImages,
+                        self.earthmod,
+                        self.synth,
+                        self.refCoef,
+                        shape,
+                    )
+            stage.output(self.earthmod, self.synth, self.refCoef)
+            with self.profiler.stage("update_wedgePlot draw"):
+                self.modelBlitter.update(redraw)
 
     # this function updates the ampPlotBox MLP Canvas widget on 'calculate' button click
     def update_ampPlot(self):
-        self._update_amp_ax.cla()
-        self._update_amp_ax2.cla()
-        self._update_amp_ax.tick_params(labelleft=True, labelbottom=True)
-        self._update_amp_ax2.tick_params(labelright=True)
-        self._update_amp_ax.plot(self.z, self.amp, label="Tuning Curve (top)")
-        ampMin, ampMax = wb.tuningVLine(self.amp)
-        self._update_amp_ax.vlines(
-            self.z_tuning,
-            ampMin,
-            ampMax,
-            label="Measured Tuning Thickness {}ms TWT".format(self.z_tuning),
-        )
-        self._update_amp_ax.vlines(
-            self.z_onset,
-            ampMin,
-            ampMax,
-            linestyles="dashed",
-            label="Measured Onset of Tuning {}ms TWT".format(self.z_onset),
-        )
-        self._update_amp_ax.set_xlabel("Thickness, TWT (ms)")
-        self._update_amp_ax.set_ylabel("Amplitude")
-        self._update_amp_ax2.plot(self.z, self.z, "g", label="True thickness ms TWT")
-        self._update_amp_ax2.plot(
-            self.z, self.z_apparent, "r", label="Apparent thickness ms TWT"
-        )
-        lines, labels = self._update_amp_ax.get_legend_handles_labels()
-        lines2, labels2 = self._update_amp_ax2.get_legend_handles_labels()
-        lns = lines + lines2
-        labs = labels + labels2
-        self._update_amp_ax2.legend(lns, labs, prop={"size": 6}, loc="lower right")
-        self._update_amp_ax.figure.canvas.draw()
-        self._update_amp_ax2.figure.canvas.draw()
+        with self.profiler.stage("update_ampPlot"):
+            if self._ampArtists is None:
+                self._update_amp_ax.cla()
+                self._update_amp_ax2.cla()
+                self._update_amp_ax.tick_params(labelleft=True, labelbottom=True)
+                self._update_amp_ax2.tick_params(labelright=True)
+                self._ampArtists = wedgeplots.plot_tuningcurve(
+                    self._update_amp_ax,
+                    self._update_amp_ax2,
+                    self.z,
+                    self.amp,
+                    self.z_tuning,
+                    self.z_apparent,
+                    self.z_onset,
+                )
+                self.ampBlitter.add(*self._ampArtists[:-1])
+                self.ampBlitter.cover(self._ampArtists.legend)
+                redraw = True
+            else:
+                redraw = wedgeplots.update_tuningcurve(
+                    self._ampArtists,
+                    self.z,
+                    self.amp,
+                    self.z_tuning,
+                    self.z_apparent,
+                    self.z_onset,
+                )
+            with self.profiler.stage("update_ampPlot draw"):
+                self.ampBlitter.update(redraw)
+
+    # this function updates the self.spectraBox MLP Canvas widget
+    def update_spectraPlot(self):
+        with self.profiler.stage("update_spectraPlot"):
+            # the synthetic is sampled at the dt of the model, not of the
+            # wavelet parameters, and its wavelet with it
+            dt = self.pipeline.geometry.get("dt", GEOMETRY["dt"])
+            with self.profiler.stage("wedge_spectra"):
+                spectra = spectral.wedge_spectra(
+                    self.synth, self.w, dt, rc=self.refCoef
+                )
+            self._update_spectra_ax.cla()
+            self._update_spectra_ax2.cla()
+            wedgeplots.plot_spectra(
+                self._update_spectra_ax,
+                self._update_spectra_ax2,
+                self.z,
+                spectra["f"],
+                spectra["amp"],
+                spectra["band"],
+                spectra["thickness"],
+                dt,
+            )
+            self.spectraBox.draw_idle()
+        self.spectraStale = False
 
     def update_resultsBox(self):
-        self.resultsBox.setText(wb.results_summary(self.resultArr))
-
+        self.resultsBox.setText(self.summary + self.montecarloSummary)
+
+    # draws realizations around the inputs of the last calculation in the
+    # background, the Run button cancels a run in progress
+    def run_montecarlo(self):
+        if self.montecarloWorker is not None:
+            self.montecarloWorker.cancel()
+            return
+        rock_props = self.resultInputs["rock_props"]
+        duration, dt, f = self.resultInputs["wavelet_parms"]
+        rock_spread = self.rockSpreadBox.value() / 100
+        freq_spread = self.freqSpreadBox.value() / 100
+        options = dict(
+            self.pipeline.geometry,
+            rock_props=[
+                {"normal": [value, value * rock_spread]} for value in rock_props
+            ],
+            f={"normal": [f, f * freq_spread]},
+            n=self.realizationsBox.value(),
+            seed=self.seedBox.value(),
+            duration=duration,
+        )
+        # as in the pipeline, the model is sampled at the dt of its geometry
+        # and the wavelet at the dt of the wavelet parameters
+        options.setdefault("dt", GEOMETRY["dt"])
+        options["wavelet_dt"] = dt
+
+        worker = MonteCarloWorker(options)
+        worker.signals.progress.connect(self.on_montecarloProgress)
+        worker.signals.finished.connect(self.on_montecarloFinished)
+        worker.signals.error.connect(self.on_montecarloError)
+        self.montecarloWorker = worker
+        self.montecarloButton.setText("Cancel")
+        self.montecarloProgress.setRange(0, options["n"])
+        self.montecarloProgress.setValue(0)
+        self.montecarloPool.start(worker)
+
+    def on_montecarloProgress(self, done, total):
+        self.montecarloProgress.setValue(done)
+
+    def on_montecarloFinished(self, stats):
+        self.montecarloWorker = None
+        self.montecarloButton.setText("Run")
+        self.montecarloButton.setEnabled(self.calculateState == 1)
+        if stats is None:
+            self.montecarloProgress.reset()
+            return
+        self.montecarloSummary = "\n" + montecarlo.montecarlo_summary(stats)
+        self.update_resultsBox()
+
+    def on_montecarloError(self, message):
+        self.on_montecarloFinished(None)
+        QMessageBox.warning(self, "Monte Carlo failed", message)
+
+    # asks for the export options once and writes the bundle in the background,
+    # from a snapshot of the current results, while the GUI stays responsive
     def export_figures(self):
-        ricker = QFileDialog.getSaveFileName(
-            self,
-            "Export Ricker Plot",
-            os.getenv("HOME"),
-            "Image Files (*.png *.jpeg *.tiff)",
+        if self.exportDialog is None:
+            self.exportDialog = ExportDialog(self)
+        if not self.exportDialog.exec_():
+            return
+        options = self.exportDialog.options()
+        results = {
+            "t": self.waveletAxis,
+            "w": self.w,
+            "imp": self.earthmod,
+            "rc": self.refCoef,
+            "synth": self.synth,
+            "z": self.z,
+            "amp": self.amp,
+            "z_tuning": self.z_tuning,
+            "z_apparent": self.z_apparent,
+            "z_onset": self.z_onset,
+            "summary": self.summary,
+        }
+        options["rock_props"] = self.resultInputs["rock_props"]
+        options["wavelet_parms"] = self.resultInputs["wavelet_parms"]
+        options["dt"] = self.pipeline.geometry.get("dt", GEOMETRY["dt"])
+
+        worker = ExportWorker(results, options)
+        progress = QProgressDialog("Exporting...", "Cancel", 0, 0, self)
+        progress.setWindowTitle("Export")
+        progress.setMinimumDuration(0)
+        progress.canceled.connect(worker.cancel)
+        worker.signals.progress.connect(
+            lambda done, total, path: self.on_exportProgress(
+                progress, done, total, path
+            )
         )
-        self.rickerBox.figure.savefig(ricker[0], dpi=100 * 10)
-        model = QFileDialog.getSaveFileName(
-            self,
-            "Export Wedge Model",
-            os.getenv("HOME"),
-            "Image Files (*.png *.jpeg *.tiff)",
+        worker.signals.finished.connect(
+            lambda written: self.on_exported(progress, written)
         )
-        self.modelBox.figure.savefig(model[0], dpi=100 * 10)
-        amp = QFileDialog.getSaveFileName(
-            self,
-            "Export Amplitude Plot",
-            os.getenv("HOME"),
-            "Image Files (*.png *.jpeg *.tiff)",
+        worker.signals.error.connect(
+            lambda message: self.on_exportError(progress, message)
         )
-        self.ampPlotBox.figure.savefig(amp[0], dpi=100 * 10)
+        self.exportButton.setEnabled(False)
+        progress.show()
+        self.exportPool.start(worker)
+
+    def on_exportProgress(self, progress, done, total, path):
+        progress.setMaximum(total)
+        progress.setValue(done)
+        if path:
+            progress.setLabelText("Writing {}".format(os.path.basename(path)))
+
+    def on_exported(self, progress, written):
+        progress.reset()
+        progress.deleteLater()
+        self.exportButton.setEnabled(self.calculateState == 1)
+
+    def on_exportError(self, progress, message):
+        self.on_exported(progress, [])
+        QMessageBox.warning(self, "Export failed", message)
 
     @pyqtSlot()
     def on_click(self):
@@ -535,6 +887,207 @@ class tabbedWindow(QWidget):
             )
 
 
+class WorkerSignals(QObject):
+    finished = pyqtSignal(int, object)
+    error = pyqtSignal(int, str)
+
+
+class PipelineWorker(QRunnable):
+    """
+    Sets the inputs of a WedgePipeline and runs it on a QThreadPool thread,
+    stopping between stages once a newer calculation has been requested.
+    With invalidate every stage is recomputed, e.g. after a Reset.
+    Emits finished(generation, results), where results holds the recomputed
+    stage names under "updated" and, unless cancelled, every stage output
+    """
+
+    def __init__(self, pipeline, lock, generation, current, inputs, invalidate=False):
+        super().__init__()
+        self.pipeline = pipeline
+        self.lock = lock
+        self.generation = generation
+        self.current = current
+        self.inputs = inputs
+        self.invalidate = invalidate
+        self.signals = WorkerSignals()
+
+    def cancelled(self):
+        return self.current() != self.generation
+
+    def run(self):
+        try:
+            with self.lock:
+                if self.invalidate:
+                    self.pipeline.invalidate()
+                results = {"updated": [], "inputs": self.inputs}
+                if not self.cancelled():
+                    for name, value in self.inputs.items():
+                        self.pipeline.set(name, value)
+                    results["updated"] = self.pipeline.run(self.cancelled)
+                if not self.cancelled():
+                    for name in self.pipeline.stages():
+                        results[name] = self.pipeline.get(name)
+        except Exception as e:
+            self.signals.error.emit(self.generation, str(e))
+        else:
+            self.signals.finished.emit(self.generation, results)
+
+
+class MonteCarloSignals(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+
+class MonteCarloWorker(QRunnable):
+    """
+    Runs montecarlo.montecarlo with the keyword arguments options on a
+    QThreadPool thread.  Emits progress(done, total) after every chunk of
+    realizations and finished(stats), or finished(None) once cancelled
+    """
+
+    def __init__(self, options):
+        super().__init__()
+        self.options = options
+        self.cancelled = threading.Event()
+        self.signals = MonteCarloSignals()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        try:
+            stats = montecarlo.montecarlo(
+                progress=self.signals.progress.emit,
+                cancelled=self.cancelled.is_set,
+                **self.options
+            )
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(None if self.cancelled.is_set() else stats)
+
+
+class ExportDialog(QDialog):
+    """
+    Asks where to write an export bundle and what to put in it: the figures in
+    a raster format at a chosen dpi or as vector PDF/SVG, the arrays as .npz,
+    the summary as JSON and the synthetic & impedance model as SEG-Y
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export")
+        self.directoryBox = QLineEdit(os.getenv("HOME") or os.getcwd())
+        browseButton = QPushButton("Browse...", self)
+        browseButton.clicked.connect(self.browse)
+        self.nameBox = QLineEdit("wedge")
+        self.formatBox = QComboBox()
+        self.formatBox.addItems([fmt.upper() for fmt in wedgeexport.FIGURE_FORMATS])
+        self.formatBox.currentTextChanged.connect(self.set_format)
+        self.dpiBox = QSpinBox()
+        self.dpiBox.setRange(50, 1200)
+        self.dpiBox.setSingleStep(50)
+        self.dpiBox.setValue(300)
+        self.figuresCheck = QCheckBox("Figures")
+        self.arraysCheck = QCheckBox("Arrays (.npz)")
+        self.summaryCheck = QCheckBox("Summary (.json)")
+        self.segyCheck = QCheckBox("Synthetic && impedance (SEG-Y)")
+        for check in (self.figuresCheck, self.arraysCheck, self.summaryCheck):
+            check.setChecked(True)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.button(QDialogButtonBox.Ok).setText("Export")
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        grid = QGridLayout()
+        grid.setSpacing(5)
+        grid.addWidget(QLabel("Folder:"), 0, 0)
+        grid.addWidget(self.directoryBox, 0, 1)
+        grid.addWidget(browseButton, 0, 2)
+        grid.addWidget(QLabel("File name:"), 1, 0)
+        grid.addWidget(self.nameBox, 1, 1)
+        grid.addWidget(QLabel("Figure format:"), 2, 0)
+        grid.addWidget(self.formatBox, 2, 1)
+        grid.addWidget(QLabel("Resolution (dpi):"), 3, 0)
+        grid.addWidget(self.dpiBox, 3, 1)
+        grid.addWidget(self.figuresCheck, 4, 1)
+        grid.addWidget(self.arraysCheck, 5, 1)
+        grid.addWidget(self.summaryCheck, 6, 1)
+        grid.addWidget(self.segyCheck, 7, 1)
+        grid.addWidget(buttons, 8, 0, 1, 3)
+        self.setLayout(grid)
+
+    def browse(self):
+        directory = QFileDialog.getExistingDirectory(
+            self, "Export to", self.directoryBox.text()
+        )
+        if directory:
+            self.directoryBox.setText(directory)
+
+    # the resolution only applies to raster formats
+    def set_format(self, text):
+        self.dpiBox.setEnabled(text.lower() not in wedgeexport.VECTOR_FORMATS)
+
+    def accept(self):
+        if not os.path.isdir(self.directoryBox.text()):
+            QMessageBox.warning(self, "Export", "The folder does not exist")
+        elif not self.nameBox.text().strip():
+            QMessageBox.warning(self, "Export", "Enter a file name")
+        else:
+            super().accept()
+
+    def options(self):
+        """Returns the export_bundle options, including the path prefix base"""
+        return {
+            "base": os.path.join(self.directoryBox.text(), self.nameBox.text().strip()),
+            "figures": self.figuresCheck.isChecked(),
+            "arrays": self.arraysCheck.isChecked(),
+            "summary": self.summaryCheck.isChecked(),
+            "segy_files": self.segyCheck.isChecked(),
+            "fig_format": self.formatBox.currentText().lower(),
+            "dpi": self.dpiBox.value(),
+        }
+
+
+class ExportSignals(QObject):
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+
+class ExportWorker(QRunnable):
+    """
+    Writes an export bundle with wedgeexport.export_bundle on a QThreadPool
+    thread, drawing the figures on their own figures rather than the canvases.
+    Emits progress(done, total, path) before every file and finished(paths)
+    once done, where a cancelled export leaves no files and finishes with []
+    """
+
+    def __init__(self, results, options):
+        super().__init__()
+        self.results = results
+        self.options = options
+        self.cancelled = threading.Event()
+        self.signals = ExportSignals()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        try:
+            written = wedgeexport.export_bundle(
+                results=self.results,
+                progress=self.signals.progress.emit,
+                cancelled=self.cancelled.is_set,
+                **self.options
+            )
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(written)
+
+
 class PlotCanvas(FigureCanvas):
     def __init__(self, parent=None, width=5, height=4, dpi=100):
         fig = Figure(figsize=(width, height), dpi=dpi)
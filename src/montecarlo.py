@@ -0,0 +1,421 @@
+#!/usr/bin/env python
+
+# Monte Carlo uncertainty of the tuning thickness
+# The six rock properties and the Ricker frequency are drawn from distributions
+# and evaluated in vectorized batches with wedgebuilder.sweep_scenarios.  The
+# results are reduced batch by batch into running means & variances (Welford's
+# update, merged with Chan's formula) and fixed size histograms for the
+# percentiles, so memory does not grow with the number of realizations.
+#
+# Every batch draws from its own child of one numpy SeedSequence, so a run is
+# reproduced exactly from its seed, however many worker processes share it
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import wedgebuilder as wb
+
+# distribution name: number of parameters, in the order of the numpy Generator
+# method of the same name
+DISTRIBUTIONS = {
+    "constant": 1,
+    "normal": 2,
+    "lognormal": 2,
+    "uniform": 2,
+    "triangular": 3,
+}
+
+# the percentiles reported by montecarlo_summary
+PERCENTILES = (10, 50, 90)
+
+# the batches a worker computes before its statistics are merged, fixed so that
+# the result does not depend on the number of workers
+_CHUNK_BATCHES = 2
+
+
+def distribution(spec):
+    """
+    Assumes spec a number, for a constant, or a dict of one distribution name
+    and its parameters, ex: {"normal": [2315, 50]}, {"uniform": [20, 30]} or
+    {"triangular": [2000, 2200, 2300]}, see DISTRIBUTIONS
+    Returns the (name, parameters) tuple of the distribution
+    """
+    if isinstance(spec, dict):
+        if len(spec) != 1:
+            raise ValueError("A distribution has one name: {}".format(spec))
+        ((name, params),) = spec.items()
+        params = tuple(float(p) for p in np.atleast_1d(params))
+    else:
+        name, params = "constant", (float(spec),)
+    if name not in DISTRIBUTIONS:
+        raise ValueError("Unknown distribution: {}".format(name))
+    if len(params) != DISTRIBUTIONS[name]:
+        raise ValueError(
+            "{} takes {} parameters, not {}".format(
+                name, DISTRIBUTIONS[name], len(params)
+            )
+        )
+    return name, params
+
+
+def sample(distributions, n, rng):
+    """
+    Assumes distributions a list of (name, parameters) tuples, one per entry of
+    wedgebuilder.SWEEP_PARAMS, n the number of realizations and rng a numpy
+    Generator
+    Returns an (n, 7) array of realizations, as the params of sweep_scenarios
+    """
+    params = np.empty((n, len(distributions)))
+    for i, (name, args) in enumerate(distributions):
+        if name == "constant":
+            params[:, i] = args[0]
+        else:
+            params[:, i] = getattr(rng, name)(*args, size=n)
+    return params
+
+
+class Histogram:
+    """
+    Histograms of a stream of (n, columns) values, with bins equal bins per
+    column, for the percentiles of the stream.  The bin width of a column is
+    a power of two and its bins start at a multiple of it; once new values
+    fall outside of the bins the width doubles, merging neighbouring bins,
+    until they fit.  The bins of two histograms therefore always line up and
+    merge exactly, and a percentile is within one bin width of its value in
+    the sorted stream, at worst about 4 / bins of the range of the values
+    """
+
+    def __init__(self, columns, bins=4096):
+        self.bins = bins
+        self.counts = np.zeros((columns, bins), dtype=np.int64)
+        # bin i of column j covers [(start + i) * 2**k, (start + i + 1) * 2**k)
+        self.k = np.zeros(columns, dtype=int)
+        self.start = np.zeros(columns, dtype=int)
+        self.empty = np.ones(columns, dtype=bool)
+
+    def _extent(self, j):
+        # the first value of the occupied bins of column j and the last value
+        # below them
+        occupied = np.flatnonzero(self.counts[j])
+        width = 2.0 ** self.k[j]
+        first = (self.start[j] + occupied[0]) * width
+        last = (self.start[j] + occupied[-1] + 1) * width
+        return first, np.nextafter(last, -np.inf)
+
+    def _cover(self, j, k, low, high):
+        # the smallest width 2**k, at least the given one & that of column j,
+        # whose bins reach over low to high and the occupied bins of column j
+        if not self.empty[j]:
+            first, last = self._extent(j)
+            k, low, high = max(k, self.k[j]), min(low, first), max(high, last)
+        while math.floor(high / 2.0**k) - math.floor(low / 2.0**k) >= self.bins:
+            k += 1
+        return k, math.floor(low / 2.0**k)
+
+    def _add(self, j, counts, k, start):
+        # adds the counts of bins of width 2**k from start to column j, whose
+        # bins are at least as wide & cover the occupied ones
+        occupied = np.flatnonzero(counts)
+        index = ((start + occupied) >> (self.k[j] - k)) - self.start[j]
+        self.counts[j] += np.bincount(
+            index, weights=counts[occupied], minlength=self.bins
+        ).astype(np.int64)
+
+    def _rebin(self, j, k, start):
+        # moves column j onto the bins of width 2**k from start
+        counts = self.counts[j].copy()
+        old_k, old_start = self.k[j], self.start[j]
+        self.k[j], self.start[j] = k, start
+        self.counts[j] = 0
+        if not self.empty[j]:
+            self._add(j, counts, old_k, old_start)
+        self.empty[j] = False
+
+    def update(self, values):
+        """Adds the finite values of an (n, columns) array"""
+        for j, column in enumerate(np.asarray(values, dtype=float).T):
+            column = column[np.isfinite(column)]
+            if len(column) == 0:
+                continue
+            low, high = float(column.min()), float(column.max())
+            if self.empty[j]:
+                # a first guess of the width, _cover widens it as needed
+                span, scale = high - low, max(abs(low), abs(high))
+                if span > 0:
+                    k = math.floor(math.log2(span / self.bins))
+                elif scale > 0:
+                    k = math.floor(math.log2(scale)) - 40
+                else:
+                    k = -60
+                self._rebin(j, *self._cover(j, k, low, high))
+            else:
+                width = 2.0 ** self.k[j]
+                first = self.start[j] * width
+                if low < first or high >= first + self.bins * width:
+                    self._rebin(j, *self._cover(j, self.k[j], low, high))
+            index = np.floor(column / 2.0 ** self.k[j]).astype(np.int64)
+            self.counts[j] += np.bincount(
+                np.clip(index - self.start[j], 0, self.bins - 1), minlength=self.bins
+            )
+
+    def merge(self, other):
+        """Adds the counts of another Histogram of the same columns & bins"""
+        for j in range(len(self.counts)):
+            if other.empty[j]:
+                continue
+            first, last = other._extent(j)
+            self._rebin(j, *self._cover(j, other.k[j], first, last))
+            self._add(j, other.counts[j], other.k[j], other.start[j])
+
+    def percentile(self, j, q, low=-np.inf, high=np.inf):
+        """
+        Returns the q-th percentile (0 to 100) of column j, interpolated within
+        its bin and clipped to [low, high], the extremes of the column if known
+        """
+        counts = self.counts[j]
+        total = counts.sum()
+        if total == 0:
+            return np.nan
+        cum = np.cumsum(counts)
+        target = q / 100 * total
+        i = min(int(np.searchsorted(cum, target)), self.bins - 1)
+        before = cum[i] - counts[i]
+        fraction = (target - before) / counts[i] if counts[i] else 0.0
+        value = (self.start[j] + i + fraction) * 2.0 ** self.k[j]
+        return float(np.clip(value, low, high))
+
+
+class Moments:
+    """
+    The running count, mean, variance, minimum & maximum per column of a stream
+    of (n, columns) values, updated a batch at a time with Welford's algorithm
+    in the pairwise form of Chan et al., which also merges two Moments
+    """
+
+    def __init__(self, columns):
+        self.n = np.zeros(columns, dtype=np.int64)
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns)
+        self.min = np.full(columns, np.inf)
+        self.max = np.full(columns, -np.inf)
+
+    def _combine(self, n, mean, m2):
+        total = self.n + n
+        ratio = np.divide(n, total, out=np.zeros(len(total)), where=total > 0)
+        delta = mean - self.mean
+        self.mean = self.mean + delta * ratio
+        self.m2 = self.m2 + m2 + delta**2 * self.n * ratio
+        self.n = total
+
+    def update(self, values):
+        """Adds the finite values of an (n, columns) array"""
+        values = np.asarray(values, dtype=float)
+        finite = np.isfinite(values)
+        n = finite.sum(axis=0)
+        batch = np.where(finite, values, 0.0)
+        mean = np.divide(batch.sum(axis=0), n, out=np.zeros(len(n)), where=n > 0)
+        m2 = (np.where(finite, values - mean, 0.0) ** 2).sum(axis=0)
+        self._combine(n, mean, m2)
+        self.min = np.fmin(self.min, np.where(finite, values, np.inf).min(axis=0))
+        self.max = np.fmax(self.max, np.where(finite, values, -np.inf).max(axis=0))
+
+    def merge(self, other):
+        """Adds the values of another Moments of the same columns"""
+        self._combine(other.n, other.mean, other.m2)
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+
+    def variance(self, ddof=1):
+        return np.divide(
+            self.m2,
+            self.n - ddof,
+            out=np.full(len(self.n), np.nan),
+            where=self.n > ddof,
+        )
+
+    def std(self, ddof=1):
+        return np.sqrt(self.variance(ddof))
+
+
+class MonteCarloStats:
+    """
+    The streaming statistics of the sweep_scenarios results of a Monte Carlo
+    run, per field of wedgebuilder.SWEEP_DTYPE: moments (a Moments) and
+    histogram (a Histogram), with realizations the number of scenarios drawn
+    and rejected those left out for a Vp, density or frequency that is not
+    positive.  Statistics of different batches merge into one
+    """
+
+    def __init__(self, bins=4096):
+        self.names = wb.SWEEP_DTYPE.names
+        self.moments = Moments(len(self.names))
+        self.histogram = Histogram(len(self.names), bins)
+        self.realizations = 0
+        self.rejected = 0
+        self.seed = None
+
+    def update(self, table, rejected=0):
+        """Adds a structured array of SWEEP_DTYPE results"""
+        values = np.stack([table[name] for name in self.names], axis=-1)
+        self.moments.update(values)
+        self.histogram.update(values)
+        self.realizations += len(table) + rejected
+        self.rejected += rejected
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.histogram.merge(other.histogram)
+        self.realizations += other.realizations
+        self.rejected += other.rejected
+
+    def percentile(self, name, q):
+        """Returns the q-th percentile (0 to 100) of the field name"""
+        j = self.names.index(name)
+        return self.histogram.percentile(j, q, self.moments.min[j], self.moments.max[j])
+
+    def describe(self, name, percentiles=PERCENTILES):
+        """
+        Returns a dict of the count, mean, std, min, max and the percentiles
+        (as p10 etc.) of the field name
+        """
+        j = self.names.index(name)
+        m = self.moments
+        record = {
+            "count": int(m.n[j]),
+            "mean": float(m.mean[j]),
+            "std": float(m.std()[j]),
+            "min": float(m.min[j]),
+            "max": float(m.max[j]),
+        }
+        for q in percentiles:
+            record["p{:g}".format(q)] = self.percentile(name, q)
+        return record
+
+
+def _chunk(seeds, sizes, distributions, duration, dt, method, dtype, bins, geometry):
+    """
+    Draws & evaluates one batch per seed (a SeedSequence) of the given sizes
+    Returns the MonteCarloStats of the batches
+    """
+    stats = MonteCarloStats(bins)
+    buffers = {}
+    for seed, size in zip(seeds, sizes):
+        params = sample(distributions, size, np.random.default_rng(seed))
+        valid = np.all(params > 0, axis=-1) & np.all(np.isfinite(params), axis=-1)
+        if valid.any():
+            table = wb.sweep_scenarios(
+                params[valid], duration, dt, None, method, dtype, buffers, **geometry
+            )
+        else:
+            table = np.empty(0, wb.SWEEP_DTYPE)
+        stats.update(table, int(size - valid.sum()))
+    return stats
+
+
+def montecarlo(
+    rock_props,
+    f=25,
+    n=100000,
+    seed=None,
+    duration=0.100,
+    dt=0.001,
+    batch_size=4096,
+    method="analytic",
+    dtype=np.float32,
+    workers=None,
+    bins=4096,
+    progress=None,
+    cancelled=None,
+    **geometry
+):
+    """
+    Assumes rock_props a list of len 6 in Vp-Density pairs and f a Ricker
+    frequency, where every entry is a number or a distribution (see
+    distribution), ex: montecarlo([{"normal": [3000, 100]}, 2315, ...], 25)
+    The n realizations are drawn and evaluated batch_size at a time with
+    sweep_scenarios (see there for method, dtype & the geometry keywords),
+    leaving out realizations with a Vp, density or frequency that is not
+    positive, and reduced into running statistics, so memory is bounded by
+    the batch size whatever n is.  Batch i draws from child i of the
+    SeedSequence of seed, so the result only depends on seed and batch_size.
+    With workers > 1 chunks of batches run on a process pool.  progress, if
+    given, is called as progress(done, n) after every chunk and cancelled, if
+    given, is checked before every chunk and stops the run when it returns True
+    Returns a MonteCarloStats, its seed the entropy of the SeedSequence used
+    """
+    distributions = [distribution(spec) for spec in list(rock_props) + [f]]
+    root = np.random.SeedSequence(seed)
+    sizes = [min(batch_size, n - start) for start in range(0, n, batch_size)]
+    seeds = root.spawn(len(sizes))
+    chunks = [
+        (seeds[i : i + _CHUNK_BATCHES], sizes[i : i + _CHUNK_BATCHES])
+        for i in range(0, len(sizes), _CHUNK_BATCHES)
+    ]
+    args = (distributions, duration, dt, method, dtype, bins, geometry)
+
+    stats = MonteCarloStats(bins)
+    stats.seed = root.entropy
+    done = 0
+
+    def add(chunk, result):
+        nonlocal done
+        stats.merge(result)
+        done += sum(chunk[1])
+        if progress is not None:
+            progress(done, n)
+
+    if not workers or workers <= 1:
+        for chunk in chunks:
+            if cancelled is not None and cancelled():
+                break
+            add(chunk, _chunk(*chunk, *args))
+        return stats
+
+    # the chunks are merged in order, so that the statistics are the same for
+    # any number of workers, with at most a few chunks per worker in flight
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for chunk in chunks:
+            if cancelled is not None and cancelled():
+                break
+            pending.append((chunk, pool.submit(_chunk, *chunk, *args)))
+            if len(pending) > 2 * workers:
+                add(pending[0][0], pending.pop(0)[1].result())
+        for chunk, future in pending:
+            if cancelled is not None and cancelled():
+                future.cancel()
+            else:
+                add(chunk, future.result())
+    return stats
+
+
+def montecarlo_summary(stats, percentiles=PERCENTILES):
+    """
+    Returns the percentiles of the measured tuning & onset thicknesses of a
+    MonteCarloStats as text, to follow results_summary, where P10 is the
+    thickness that 10% of the realizations fall below
+    """
+    labels = (
+        ("Measured Tuning Thickness", "z_tuning_meas"),
+        ("Measured Onset of Tuning Thickness", "z_onset_meas"),
+    )
+    valid = stats.realizations - stats.rejected
+    lines = [
+        "Monte Carlo Uncertainty of {} Realizations (seed {}{})".format(
+            valid,
+            stats.seed,
+            ", {} rejected".format(stats.rejected) if stats.rejected else "",
+        )
+    ]
+    quantiles = "/".join("P{:g}".format(q) for q in percentiles)
+    for label, name in labels:
+        twt = [round(stats.percentile(name + "_TWT", q), 4) for q in percentiles]
+        m = [round(stats.percentile(name + "_m", q), 1) for q in percentiles]
+        lines.append(
+            "{} {}: {} sec TWT, {} m".format(
+                label, quantiles, " / ".join(map(str, twt)), " / ".join(map(str, m))
+            )
+        )
+    return "\n\n".join(lines) + "\n"
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+# A small dependency graph of the wedgebuilder calculation stages
+# Every stage caches its last output and is only recomputed when one of its
+# inputs changed, e.g. a new wavelet does not rebuild the earth model and new
+# rock properties reuse the wavelet and its spectrum.  A WedgePipeline can also
+# look its results up in a resultcache.ResultCache shared between runs
+
+import inspect
+
+import numpy as np
+import wedgebuilder as wb
+from profiling import Profiler
+
+# the earthmodel keywords of the wedge geometry, with their defaults
+GEOMETRY = {
+    name: parameter.default
+    for name, parameter in inspect.signature(wb.earthmodel).parameters.items()
+    if name in ("traces", "samples", "dt", "top", "max_thickness", "dz")
+}
+
+
+class Pipeline:
+    """
+    A graph of named inputs and stages, where a stage is a function of the
+    values of its inputs (inputs or other stages, added before it).  Every
+    stage run is timed by profiler, a profiling.Profiler, disabled by default
+    """
+
+    def __init__(self, profiler=None):
+        self.profiler = Profiler(enabled=False) if profiler is None else profiler
+        self._values = {}
+        self._funcs = {}
+        self._inputs = {}
+        self._dirty = set()
+        self._order = []
+
+    def add_input(self, name, value=None):
+        self._values[name] = value
+        self._inputs[name] = []
+
+    def add_stage(self, name, func, inputs):
+        self._funcs[name] = func
+        self._inputs[name] = list(inputs)
+        self._order.append(name)
+        self._dirty.add(name)
+
+    def stages(self):
+        """Returns the stage names in dependency order"""
+        return list(self._order)
+
+    def set(self, name, value):
+        """Sets input name, marking the stages downstream dirty if it changed"""
+        if _same(self._values[name], value):
+            return
+        self._values[name] = value
+        self._mark(name)
+
+    def get(self, name):
+        """Returns the value of an input or stage, recomputing it if dirty"""
+        if name in self._dirty:
+            self.run()
+        return self._values[name]
+
+    def run(self, cancelled=None):
+        """
+        Recomputes the dirty stages in dependency order, stopping early, with
+        the remaining stages left dirty, once cancelled() returns True
+        Returns the list of stages that were recomputed
+        """
+        updated = []
+        for name in self._order:
+            if cancelled is not None and cancelled():
+                break
+            if name in self._dirty:
+                args = [self._values[i] for i in self._inputs[name]]
+                with self.profiler.stage(name) as stage:
+                    value = self._funcs[name](*args)
+                    stage.output(value)
+                self._values[name] = value
+                self._dirty.discard(name)
+                updated.append(name)
+        return updated
+
+    def invalidate(self):
+        """Marks every stage dirty"""
+        self._dirty.update(self._order)
+
+    def _mark(self, name):
+        for stage in self._order:
+            if name in self._inputs[stage] and stage not in self._dirty:
+                self._dirty.add(stage)
+                self._mark(stage)
+
+
+def _same(a, b):
+    """Returns True if the input values a & b are equal"""
+    try:
+        return np.array_equal(a, b)
+    except (TypeError, ValueError):
+        return a == b
+
+
+class WedgePipeline(Pipeline):
+    """
+    The tuning wedge calculation as a Pipeline with the inputs rock_props (list
+    of len 6) and wavelet_parms (duration, dt, f), and the stages
+    earthmodel (imp, rc), wavelet (dict of w, t & spectrum), synth,
+    tuningcurve (z, z_tuning, amp, z_apparent, z_onset) and summary
+    With a resultcache.ResultCache as cache, the stages cache_lookup (the
+    stored synth, tuning curve & summary of the inputs, or None) and
+    cache_store (the key the results are stored under) are added, and synth,
+    tuningcurve & summary come from the cache where possible
+    """
+
+    def __init__(
+        self, rock_props=None, wavelet_parms=None, profiler=None, cache=None, **geometry
+    ):
+        super().__init__(profiler)
+        self.geometry = geometry
+        self.cache = cache
+        self.add_input("rock_props", rock_props)
+        self.add_input("wavelet_parms", wavelet_parms)
+        self.add_stage("earthmodel", self._earthmodel, ["rock_props"])
+        self.add_stage("wavelet", self._wavelet, ["wavelet_parms"])
+        if cache is None:
+            self.add_stage("synth", self._synth, ["earthmodel", "wavelet"])
+            self.add_stage("tuningcurve", self._tuningcurve, ["earthmodel", "synth"])
+            self.add_stage(
+                "summary", self._summary, ["rock_props", "wavelet_parms", "tuningcurve"]
+            )
+            return
+        self.add_stage(
+            "cache_lookup", self._cache_lookup, ["rock_props", "wavelet_parms"]
+        )
+        self.add_stage(
+            "synth", self._cached_synth, ["cache_lookup", "earthmodel", "wavelet"]
+        )
+        self.add_stage(
+            "tuningcurve",
+            self._cached_tuningcurve,
+            ["cache_lookup", "earthmodel", "synth"],
+        )
+        self.add_stage(
+            "summary",
+            self._cached_summary,
+            ["cache_lookup", "rock_props", "wavelet_parms", "tuningcurve"],
+        )
+        self.add_stage(
+            "cache_store",
+            self._cache_store,
+            ["cache_lookup", "synth", "tuningcurve", "summary"],
+        )
+
+    def cache_key(self, rock_props, wavelet_parms):
+        """Returns the cache key of the inputs and the full wedge geometry"""
+        geometry = dict(GEOMETRY, **self.geometry)
+        return self.cache.key(
+            {
+                "rock_props": rock_props,
+                "wavelet_parms": wavelet_parms,
+                "geometry": geometry,
+            }
+        )
+
+    def _earthmodel(self, rock_props):
+        return wb.earthmodel(rock_props, **self.geometry)
+
+    def _wavelet(self, wavelet_parms):
+        w = wb.wavelet(*wavelet_parms)
+        n, m = self.geometry.get("samples", 240) - 1, len(w)
+        spectrum = None
+        if wb.convolve_method(n, m) == "fft":
+            spectrum = wb.wavelet_spectrum(*wavelet_parms, wb.fft_length(n, m))
+        t = wb.wavelet_plot_axis(*wavelet_parms)
+        return {"w": w, "t": t, "spectrum": spectrum}
+
+    def _synth(self, earthmodel, wavelet):
+        imp, rc = earthmodel
+        return wb.tuningwedge(rc, wavelet["w"], spectrum=wavelet["spectrum"])
+
+    def _tuningcurve(self, earthmodel, synth):
+        imp, rc = earthmodel
+        return wb.tuningcurve(rc, synth)
+
+    def _summary(self, rock_props, wavelet_parms, tuningcurve):
+        z, z_tuning, amp, z_apparent, z_onset = tuningcurve
+        return wb.results_summary([rock_props, wavelet_parms[2], z_tuning, z_onset])
+
+    def _cache_lookup(self, rock_props, wavelet_parms):
+        key = self.cache_key(rock_props, wavelet_parms)
+        return {"key": key, "arrays": self.cache.get(key)}
+
+    def _cached_synth(self, cached, earthmodel, wavelet):
+        if cached["arrays"] is not None:
+            return cached["arrays"]["synth"]
+        return self._synth(earthmodel, wavelet)
+
+    def _cached_tuningcurve(self, cached, earthmodel, synth):
+        if cached["arrays"] is not None:
+            arrays = cached["arrays"]
+            return tuple(arrays[name][()] for name in _CURVE)
+        return self._tuningcurve(earthmodel, synth)
+
+    def _cached_summary(self, cached, rock_props, wavelet_parms, tuningcurve):
+        if cached["arrays"] is not None:
+            return str(cached["arrays"]["summary"])
+        return self._summary(rock_props, wavelet_parms, tuningcurve)
+
+    def _cache_store(self, cached, synth, tuningcurve, summary):
+        if cached["arrays"] is None:
+            arrays = dict(zip(_CURVE, tuningcurve))
+            arrays["synth"] = synth
+            arrays["summary"] = np.array(summary)
+            self.cache.put(cached["key"], arrays)
+        return cached["key"]
+
+
+# the names the tuningcurve outputs are cached under
+_CURVE = ("z", "z_tuning", "amp", "z_apparent", "z_onset")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+# Lightweight timing of the calculation stages and plot updates
+# A Profiler keeps one StageTiming record per timed stage: the wall time, the
+# shapes & bytes of the arrays the stage produced and, if asked for, the peak
+# memory it allocated.  A disabled Profiler hands out a shared do-nothing
+# stage, so the instrumentation can stay in place at the cost of a method call
+
+import threading
+import time
+import tracemalloc
+from collections import deque, namedtuple
+
+import numpy as np
+
+StageTiming = namedtuple(
+    "StageTiming", ["stage", "seconds", "shapes", "nbytes", "peak_bytes", "depth"]
+)
+
+
+class Profiler:
+    """
+    Collects StageTiming records of the stages timed with
+        with profiler.stage("name") as stage:
+            result = calculate()
+            stage.output(result)
+    keeping the last max_records of them.  Stages may be nested, depth counts
+    the stages around a record in the same thread.  With trace_memory the peak memory
+    allocated during a stage is measured with tracemalloc, which slows the
+    stage down, and only one stage at a time is traced
+    """
+
+    def __init__(self, enabled=True, trace_memory=False, max_records=1000):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self._records = deque(maxlen=max_records)
+        self._tracing = threading.Lock()
+        self._local = threading.local()
+
+    def stage(self, name):
+        """Returns a context manager timing the stage name"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def records(self):
+        """Returns the list of StageTiming records, oldest first"""
+        return list(self._records)
+
+    def clear(self):
+        self._records.clear()
+
+    def totals(self):
+        """Returns a dict of the total seconds spent per stage name"""
+        totals = {}
+        for record in self.records():
+            totals[record.stage] = totals.get(record.stage, 0) + record.seconds
+        return totals
+
+    def report(self):
+        """Returns the records as a text table"""
+        records = self.records()
+        if not records:
+            return "No timing recorded"
+        lines = ["{:<28} {:>9} {:>9} {:>9}".format("", "ms", "MB", "peak MB")]
+        for record in records:
+            lines.append(
+                "{:<28} {:>9.2f} {:>9.3f} {:>9}  {}".format(
+                    "  " * record.depth + record.stage,
+                    record.seconds * 1000,
+                    record.nbytes / 1e6,
+                    (
+                        "-"
+                        if record.peak_bytes is None
+                        else "{:.3f}".format(record.peak_bytes / 1e6)
+                    ),
+                    " ".join(str(shape) for shape in record.shapes),
+                ).rstrip()
+            )
+        total = sum(record.seconds for record in records if record.depth == 0)
+        lines.append("{:<28} {:>9.2f}".format("total", total * 1000))
+        return "\n".join(lines)
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.arrays = []
+        self.traced = False
+
+    def output(self, *values):
+        """Records the arrays in values, which may be nested in tuples & dicts"""
+        for value in values:
+            _collect(value, self.arrays)
+
+    def __enter__(self):
+        profiler = self.profiler
+        if profiler.trace_memory and not tracemalloc.is_tracing():
+            self.traced = profiler._tracing.acquire(blocking=False)
+            if self.traced:
+                tracemalloc.start()
+        self.depth = getattr(profiler._local, "depth", 0)
+        profiler._local.depth = self.depth + 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        self.profiler._local.depth = self.depth
+        peak = None
+        if self.traced:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.profiler._tracing.release()
+        self.profiler._records.append(
+            StageTiming(
+                self.name,
+                seconds,
+                tuple(a.shape for a in self.arrays),
+                sum(a.nbytes for a in self.arrays),
+                peak,
+                self.depth,
+            )
+        )
+        return False
+
+
+class _NullStage:
+    def output(self, *values):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _collect(value, arrays):
+    if isinstance(value, np.ndarray):
+        arrays.append(value)
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            _collect(item, arrays)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect(item, arrays)
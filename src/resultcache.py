@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+
+# A content addressed disk cache of wedge calculation results
+# Every entry is an .npz file named after the SHA-256 of the normalized inputs
+# of a calculation and the version of the code that computed it, so changing
+# either one simply misses the old entries, which age out of the cache.
+#
+# Several processes may share a cache directory: entries are written to a
+# temporary file and renamed into place, so readers see a whole entry or none,
+# and the least recently used entries are evicted under an exclusive lock file
+# once the cache outgrows its size cap.  An entry that cannot be read is a miss
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_MAX_BYTES = 512 << 20
+
+# the cache is switched on for the GUI & the command line by pointing this
+# environment variable at a directory, with an optional size cap in MB
+CACHE_DIR_ENV = "PYSEISTUNED_CACHE"
+CACHE_SIZE_ENV = "PYSEISTUNED_CACHE_MB"
+
+# the modules whose code decides the cached results
+_VERSIONED_MODULES = ("wedgebuilder.py", "pipeline.py")
+
+# temporary files older than this are left over from a writer that died
+_STALE_SECONDS = 3600
+
+_code_version = None
+
+
+def code_version():
+    """
+    Returns a tag of the code that computes the results: a hash of the source
+    of the calculation modules and the numpy version
+    """
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256(np.__version__.encode())
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in _VERSIONED_MODULES:
+            with open(os.path.join(here, name), "rb") as fh:
+                digest.update(fh.read())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+
+def normalize(value):
+    """
+    Returns value as plain JSON data, with every number a float, so that equal
+    inputs hash the same whatever their type, e.g. 3000, 3000.0 & np.int64(3000)
+    """
+    if isinstance(value, dict):
+        return {str(key): normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [normalize(item) for item in value]
+    if isinstance(value, (bool, np.bool_)) or value is None:
+        return value
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    return str(value)
+
+
+class ResultCache:
+    """
+    A directory of .npz entries of at most max_bytes in total, where
+        key = cache.key(inputs)
+        arrays = cache.get(key)
+        if arrays is None:
+            arrays = calculate(inputs)
+            cache.put(key, arrays)
+    hits and misses count the lookups of this instance
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, inputs):
+        """Returns the hex key of the inputs (any JSON-like data) & code version"""
+        data = {"inputs": normalize(inputs), "version": code_version()}
+        text = json.dumps(data, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        """
+        Returns the dict of arrays stored under key, or None on a miss
+        A hit marks the entry as recently used
+        """
+        path = self.path(key)
+        try:
+            # touch & read are one step: the entry is the most recently used
+            # one while it is read, so another process evicts it last, and an
+            # entry removed before either step is a miss
+            os.utime(path)
+            with np.load(path, allow_pickle=False) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+            # a damaged entry, e.g. from a full disk, is dropped
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return arrays
+
+    def put(self, key, arrays):
+        """
+        Stores the dict of arrays under key, atomically, then evicts the least
+        recently used entries if the cache is over its size cap
+        """
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                np.savez(fh, **arrays)
+            os.replace(tmp, self.path(key))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def entries(self):
+        """Returns a list of (last used time, bytes, path) of the entries"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                with contextlib.suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self):
+        """Returns the number of entries and their total bytes"""
+        entries = self.entries()
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def evict(self, max_bytes=None):
+        """
+        Removes the least recently used entries until the cache holds at most
+        max_bytes (default the size cap), and temporary files left over by
+        writers that died
+        Returns the number of entries removed
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        removed = 0
+        with self._lock():
+            entries = sorted(self.entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= max_bytes:
+                    break
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                    removed += 1
+                total -= size
+            stale = time.time() - _STALE_SECONDS
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".tmp"):
+                    with contextlib.suppress(FileNotFoundError):
+                        if entry.stat().st_mtime < stale:
+                            os.remove(entry.path)
+        return removed
+
+    def clear(self):
+        """Removes every entry"""
+        return self.evict(0)
+
+    @contextlib.contextmanager
+    def _lock(self):
+        # an exclusive lock on a file in the directory, held by one process
+        with open(os.path.join(self.directory, ".lock"), "a+b") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+                else:
+                    fh.seek(0)
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def default_cache():
+    """
+    Returns the ResultCache of the directory in the PYSEISTUNED_CACHE
+    environment variable, capped at PYSEISTUNED_CACHE_MB megabytes, or None
+    if the variable is not set
+    """
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if not directory:
+        return None
+    size = os.environ.get(CACHE_SIZE_ENV)
+    max_bytes = DEFAULT_MAX_BYTES if not size else int(float(size) * (1 << 20))
+    return ResultCache(os.path.expanduser(directory), max_bytes)
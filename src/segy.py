@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+
+# SEG-Y (rev 1) export of wedge models and synthetics
+# The trace headers and samples of a chunk of traces are laid out in one
+# structured numpy array and written with a single call, rather than packing
+# one trace at a time, so writing large sweeps is limited by the disk
+#
+# Layout: 3200 byte EBCDIC textual header, 400 byte binary header, then per
+# trace a 240 byte header and the samples as big-endian IEEE floats (format 5).
+# The wedge thickness of a trace, in microseconds TWT, is stored in the
+# unassigned trace header bytes 233-236
+
+import datetime
+
+import numpy as np
+
+TEXT_HEADER_SIZE = 3200
+BINARY_HEADER_SIZE = 400
+TRACE_HEADER_SIZE = 240
+
+# field name: (byte offset, type), byte offsets counted from 0
+_BINARY_FIELDS = {
+    "job_id": (0, ">i4"),
+    "line_number": (4, ">i4"),
+    "reel_number": (8, ">i4"),
+    "traces_per_ensemble": (12, ">i2"),
+    "aux_traces_per_ensemble": (14, ">i2"),
+    "sample_interval": (16, ">u2"),
+    "sample_interval_orig": (18, ">u2"),
+    "samples": (20, ">u2"),
+    "samples_orig": (22, ">u2"),
+    "format_code": (24, ">i2"),
+    "ensemble_fold": (26, ">i2"),
+    "sorting_code": (28, ">i2"),
+    "measurement_system": (54, ">i2"),
+    "revision": (300, ">u2"),
+    "fixed_length": (302, ">i2"),
+    "extended_headers": (304, ">i2"),
+}
+
+_TRACE_FIELDS = {
+    "trace_sequence_line": (0, ">i4"),
+    "trace_sequence_file": (4, ">i4"),
+    "field_record": (8, ">i4"),
+    "trace_number": (12, ">i4"),
+    "cdp": (20, ">i4"),
+    "cdp_trace": (24, ">i4"),
+    "trace_id": (28, ">i2"),
+    "data_use": (34, ">i2"),
+    "coordinate_scalar": (70, ">i2"),
+    "samples": (114, ">u2"),
+    "sample_interval": (116, ">u2"),
+    "inline": (188, ">i4"),
+    "crossline": (192, ">i4"),
+    "thickness": (232, ">i4"),
+}
+
+
+def _header_dtype(fields, itemsize):
+    names = list(fields)
+    return np.dtype(
+        {
+            "names": names,
+            "formats": [fields[name][1] for name in names],
+            "offsets": [fields[name][0] for name in names],
+            "itemsize": itemsize,
+        }
+    )
+
+
+BINARY_HEADER = _header_dtype(_BINARY_FIELDS, BINARY_HEADER_SIZE)
+TRACE_HEADER = _header_dtype(_TRACE_FIELDS, TRACE_HEADER_SIZE)
+
+
+def trace_dtype(samples):
+    """Returns the structured dtype of a trace header plus samples float samples"""
+    return np.dtype([("header", TRACE_HEADER), ("data", ">f4", (samples,))])
+
+
+def text_header(lines):
+    """
+    Assumes lines a list of at most 38 strings
+    Returns the 3200 byte EBCDIC textual header, 40 card images of 80 columns
+    starting with C 1 to C40, the last two marking a rev 1 file
+    """
+    lines = list(lines)[:38]
+    lines += [""] * (38 - len(lines)) + ["SEG Y REV1", "END TEXTUAL HEADER"]
+    cards = [
+        "C{:2d} {}".format(i + 1, line.upper())[:80].ljust(80)
+        for i, line in enumerate(lines)
+    ]
+    return "".join(cards).encode("cp037")
+
+
+def wedge_description(content, rock_props, wavelet_parms, wavelet="Ricker"):
+    """
+    Assumes content what the file holds, e.g. "Tuning wedge synthetic",
+    rock_props the Vp-Density pairs of the layers and wavelet_parms the
+    (duration, dt, f) of the wavelet, in seconds & Hz
+    Returns the textual header lines of a wedge export, see write_segy
+    """
+    duration, wavelet_dt, f = wavelet_parms
+    rocks = np.asarray(rock_props, dtype=float).reshape(-1, 2)
+    lines = [content]
+    lines += [
+        "Layer {}: Vp {:g} m/s, density {:g}".format(i + 1, vp, rho)
+        for i, (vp, rho) in enumerate(rocks)
+    ]
+    lines.append(
+        "Wavelet: {} {:g} Hz, {:g} ms long, sampled at {:g} ms".format(
+            wavelet, f, duration * 1000, wavelet_dt * 1000
+        )
+    )
+    return lines
+
+
+def write_segy(path, data, dt, thickness=None, description=(), chunk_traces=4096):
+    """
+    Assumes data a numpy array (samples, traces), or a stack of them
+    (..., samples, traces) such as a tuningwedge or earthmodel output, dt the
+    sample interval in seconds and thickness the wedge thickness per trace in
+    seconds TWT, shape (traces,) or broadcastable to data without its samples
+    axis
+    Writes a rev 1 SEG-Y file with one line per model of the stack (inline
+    numbers from 1) and one trace per wedge trace (crossline & CDP numbers from
+    1), chunk_traces traces per write.  description optionally is a list of
+    text lines for the textual header, e.g. from wedge_description, followed by
+    the layout of the file
+    Returns the number of traces written
+    """
+    data = np.asarray(data)
+    samples, traces = data.shape[-2:]
+    interval = int(round(dt * 1e6))
+    if samples > 65535:
+        raise ValueError("SEG-Y traces hold at most 65535 samples")
+    if not 0 < interval <= 65535:
+        raise ValueError("SEG-Y sample intervals are 1 to 65535 microseconds")
+    models = data.reshape((-1, samples, traces))
+    if thickness is None:
+        thickness = np.zeros(traces)
+    thickness = np.broadcast_to(
+        np.rint(np.asarray(thickness) * 1e6).astype(int), data.shape[:-2] + (traces,)
+    ).reshape((-1, traces))
+
+    lines = list(description) + [
+        "Created {}".format(datetime.datetime.now().strftime("%Y-%m-%d %H:%M")),
+        "{} lines of {} traces, {} samples at {} us".format(
+            len(models), traces, samples, interval
+        ),
+        "Inline: model, crossline & CDP: wedge trace",
+        "Wedge thickness (us TWT) in trace header bytes 233-236",
+        "Sample format: 4 byte IEEE floating point",
+    ]
+    binary = np.zeros(1, BINARY_HEADER)
+    binary["line_number"] = 1
+    binary["traces_per_ensemble"] = 1
+    binary["sample_interval"] = interval
+    binary["sample_interval_orig"] = interval
+    binary["samples"] = samples
+    binary["samples_orig"] = samples
+    binary["format_code"] = 5
+    binary["ensemble_fold"] = 1
+    binary["sorting_code"] = 4
+    binary["measurement_system"] = 1
+    binary["revision"] = 0x0100
+    binary["fixed_length"] = 1
+
+    dtype = trace_dtype(samples)
+    with open(path, "wb") as fh:
+        fh.write(text_header(lines))
+        fh.write(binary.tobytes())
+        for i, model in enumerate(models):
+            for start in range(0, traces, chunk_traces):
+                stop = min(start + chunk_traces, traces)
+                crossline = np.arange(start + 1, stop + 1)
+                chunk = np.zeros(stop - start, dtype)
+                header = chunk["header"]
+                header["trace_sequence_line"] = crossline
+                header["trace_sequence_file"] = i * traces + crossline
+                header["field_record"] = i + 1
+                header["trace_number"] = crossline
+                header["cdp"] = crossline
+                header["cdp_trace"] = 1
+                header["trace_id"] = 1
+                header["data_use"] = 1
+                header["coordinate_scalar"] = 1
+                header["samples"] = samples
+                header["sample_interval"] = interval
+                header["inline"] = i + 1
+                header["crossline"] = crossline
+                header["thickness"] = thickness[i, start:stop]
+                chunk["data"] = model[:, start:stop].T
+                chunk.tofile(fh)
+    return len(models) * traces
+
+
+def read_segy(path):
+    """
+    Assumes path a fixed trace length SEG-Y file in IEEE floats, such as the
+    files of write_segy
+    Returns the textual header as a string, the binary header as a structured
+    array record, and the traces as a read-only memory mapped structured array
+    of trace_dtype, where traces["data"].T is the (samples, traces) section
+    """
+    with open(path, "rb") as fh:
+        text = fh.read(TEXT_HEADER_SIZE).decode("cp037")
+        binary = np.frombuffer(fh.read(BINARY_HEADER_SIZE), BINARY_HEADER)[0]
+    if binary["format_code"] != 5:
+        raise ValueError("Only IEEE float SEG-Y files (format 5) can be read")
+    traces = np.memmap(
+        path,
+        dtype=trace_dtype(int(binary["samples"])),
+        mode="r",
+        offset=TEXT_HEADER_SIZE + BINARY_HEADER_SIZE,
+    )
+    return text, binary, traces
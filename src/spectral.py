@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+# Spectral decomposition of the tuning wedge
+# The amplitude spectra of the synthetic traces give the spectral tuning panel
+# of the wedge, amplitude against frequency and thickness.  The composite
+# response of a thin bed is the wavelet spectrum times that of its two
+# reflections, which has notches every 1 / thickness Hz, so the thickness of
+# every trace is read from the spacing of the notches in the band of the
+# wavelet.
+#
+# All traces, and any stack of wedges, are transformed along the time axis
+# (axis -2 of the tuningwedge output) by one batched rFFT, and the short time
+# Fourier transform frames every trace with one strided view
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+import wedgebuilder as wb
+
+# window name: function of the window length returning the taper
+WINDOWS = {
+    "boxcar": np.ones,
+    "hann": np.hanning,
+    "hamming": np.hamming,
+    "blackman": np.blackman,
+}
+
+# the wavelet band searched for notches, where its amplitude spectrum is at
+# least this fraction of its peak
+BAND_LEVEL = 0.05
+
+# a notch is a minimum of at most this fraction of the peak of its spectrum in
+# the band, shallower minima are ripples, e.g. of a single reflection
+NOTCH_DEPTH = 0.9
+
+
+def _taper(window, length, dtype):
+    try:
+        return WINDOWS[window](length).astype(dtype)[:, None]
+    except KeyError:
+        raise ValueError("Unknown window: {}".format(window)) from None
+
+
+def _nfft(length, dt, nfft):
+    # by default the spectra are zero padded to a 1 Hz or finer frequency step
+    if nfft is None:
+        nfft = wb.next_fast_len(max(length, int(np.ceil(1 / dt))))
+    return nfft
+
+
+def spectral_panel(synth, dt=0.001, start=0, length=None, window="boxcar", nfft=None):
+    """
+    Assumes synth the tuningwedge output, (samples, traces) or a stack of
+    wedges (..., samples, traces), dt in seconds, the gate of length samples
+    from row start (by default every row) tapered by a WINDOWS window, and the
+    rFFT length nfft, by default a 1 Hz or finer frequency step
+    Returns the frequencies f in Hz and the amplitude spectra of every trace,
+    the (frequency, thickness) panel of shape (..., len(f), traces)
+    """
+    synth = np.asarray(synth)
+    length = synth.shape[-2] - start if length is None else length
+    gate = synth[..., start : start + length, :]
+    dtype = np.result_type(gate, np.float32)
+    nfft = _nfft(length, dt, nfft)
+    spectra = np.fft.rfft(gate * _taper(window, gate.shape[-2], dtype), nfft, axis=-2)
+    return np.fft.rfftfreq(nfft, dt), np.abs(spectra)
+
+
+def stft(synth, dt=0.001, length=32, hop=1, window="hann", nfft=None):
+    """
+    Assumes synth as for spectral_panel, the length & hop in samples of the
+    frames, the WINDOWS window of every frame and the rFFT length nfft, by
+    default a 1 Hz or finer frequency step
+    Returns the times t in seconds of the frame centres from the first sample,
+    the frequencies f in Hz and the amplitude spectra of every frame of every
+    trace, of shape (..., len(t), len(f), traces)
+    """
+    synth = np.asarray(synth)
+    samples = synth.shape[-2]
+    if not 0 < length <= samples or hop < 1:
+        raise ValueError("STFT frames need 0 < length <= samples and hop >= 1")
+    frames = (samples - length) // hop + 1
+    *strides, row, col = synth.strides
+    view = as_strided(
+        synth,
+        synth.shape[:-2] + (frames, length, synth.shape[-1]),
+        tuple(strides) + (hop * row, row, col),
+        writeable=False,
+    )
+    dtype = np.result_type(synth, np.float32)
+    nfft = _nfft(length, dt, nfft)
+    spectra = np.fft.rfft(view * _taper(window, length, dtype), nfft, axis=-2)
+    t = (np.arange(frames) * hop + (length - 1) / 2) * dt
+    return t, np.fft.rfftfreq(nfft, dt), np.abs(spectra)
+
+
+def wavelet_band(f, w, dt=0.001, level=BAND_LEVEL):
+    """
+    Assumes f the frequencies of a panel and w the wavelet of the wedge
+    Returns the wavelet amplitude spectrum at f, and the lowest & highest
+    frequency at which it is at least level times its peak
+    """
+    spectrum = np.abs(np.fft.rfft(w, 2 * (len(f) - 1)))
+    spectrum = np.interp(f, np.fft.rfftfreq(2 * (len(f) - 1), dt), spectrum)
+    inside = f[spectrum >= level * spectrum.max()]
+    return spectrum, (inside[0], inside[-1])
+
+
+def notches(amp):
+    """
+    Assumes amp a panel (..., frequencies, traces)
+    Returns a boolean array of the local minima of every spectrum, excluding
+    the first and last frequency
+    """
+    mask = np.zeros(amp.shape, dtype=bool)
+    inner = amp[..., 1:-1, :]
+    mask[..., 1:-1, :] = (inner < amp[..., :-2, :]) & (inner <= amp[..., 2:, :])
+    return mask
+
+
+def _refine(f, amp, index):
+    """Returns the frequencies of the minima at index of the panel, refined by
+    fitting a parabola through the three samples around them
+    """
+    index = np.clip(index, 1, len(f) - 2)
+    lo, mid, hi = (
+        np.take_along_axis(amp, (index + k)[..., None, :], axis=-2)[..., 0, :]
+        for k in (-1, 0, 1)
+    )
+    curvature = lo - 2 * mid + hi
+    offset = np.where(
+        curvature > 0, 0.5 * (lo - hi) / np.where(curvature > 0, curvature, 1), 0
+    )
+    return f[index] + offset * (f[1] - f[0])
+
+
+def notch_thickness(f, amp, band=None, opposite=True, depth=NOTCH_DEPTH):
+    """
+    Assumes f & amp a panel, band the (low, high) frequencies searched for
+    notches, by default all, and opposite whether the top & base reflections
+    of the bed have opposite polarity, as in a wedge between two layers of the
+    same rock, and depth the NOTCH_DEPTH of a notch
+    The notches of a bed of thickness T (TWT) are 1 / T apart, so T is read
+    from the spacing of the first and last notch in the band, or from a single
+    notch at 1 / T (opposite polarity) or 1 / 2T (same polarity)
+    Returns the notch count and the thickness in seconds TWT of every trace,
+    NaN where there is no notch in the band, each of shape (..., traces)
+    """
+    inside = np.ones(f.shape, dtype=bool)
+    if band is not None:
+        inside = (f >= band[0]) & (f <= band[1])
+    peak = np.max(amp[..., inside, :], axis=-2, keepdims=True)
+    mask = notches(amp) & inside[:, None] & (amp <= depth * peak)
+    count = mask.sum(axis=-2)
+    first = _refine(f, amp, np.argmax(mask, axis=-2))
+    last = _refine(f, amp, len(f) - 1 - np.argmax(mask[..., ::-1, :], axis=-2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spacing = (last - first) / (count - 1)
+        single = np.where(opposite, first, 2 * first)
+        thickness = np.where(count > 1, 1 / spacing, 1 / single)
+    return count, np.where(count > 0, thickness, np.nan)
+
+
+def wedge_spectra(synth, w, dt=0.001, window="boxcar", nfft=None, rc=None):
+    """
+    Assumes synth the tuningwedge output of the wavelet w, sampled at dt, and
+    the window & nfft of spectral_panel, with rc, the wedge reflectivity, to
+    read the polarity of its top and base
+    The panel is divided by the wavelet spectrum in the wavelet band before
+    its notches are searched, so that only the notches of the bed remain
+    Returns a dict of f, amp (the panel), band, count & thickness (the notch
+    count & thickness of every trace, see notch_thickness)
+    """
+    f, amp = spectral_panel(synth, dt, window=window, nfft=nfft)
+    spectrum, band = wavelet_band(f, w, dt)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        balanced = amp / spectrum[:, None]
+    opposite = True
+    if rc is not None:
+        rc = np.asarray(rc)
+        thickest = rc[..., -1]
+        opposite = (thickest.min(axis=-1) < 0) & (thickest.max(axis=-1) > 0)
+        opposite = opposite[..., None]
+    count, thickness = notch_thickness(f, balanced, band, opposite)
+    return {"f": f, "amp": amp, "band": band, "count": count, "thickness": thickness}
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+
+# A bank of wavelets on a shared time axis, to compare the tuning of several
+# wavelets on the same wedge
+# Ricker, Ormsby, Klauder and zero phase Butterworth wavelets are built from
+# their parameters, and extracted wavelets are loaded from CSV or .npy files
+# and resampled onto the axis.  The wedge of every wavelet of the bank comes
+# from one batched convolution: the reflectivity is transformed once and
+# multiplied by the stacked spectra of the bank, which are computed once per
+# rFFT length and shared by every wedge convolved with the bank
+
+import json
+import os
+
+import numpy as np
+import wedgebuilder as wb
+from wedgebuilder import BLOCK_BYTES, ricker_at, wavelet_time
+
+# the frequency step of the zero phase wavelets built from an amplitude
+# spectrum, as a fraction of 1 / wavelet length, small enough that the
+# periodic repeats of the wavelet fall far outside of it
+_SPECTRUM_OVERSAMPLING = 8
+
+
+def ormsby(t, f1, f2, f3, f4):
+    """
+    Assumes t the time axis in seconds and the corner frequencies f1 < f2 <= f3
+    < f4 in Hz of the trapezoidal amplitude spectrum
+    Returns the zero phase Ormsby wavelet, scaled to a peak of 1
+    """
+    f1, f2, f3, f4 = (np.asarray(f, dtype=float) for f in (f1, f2, f3, f4))
+
+    def term(f):
+        return (np.pi * f) ** 2 * np.sinc(f * t) ** 2
+
+    w = (term(f4) - term(f3)) / (np.pi * (f4 - f3)) - (term(f2) - term(f1)) / (
+        np.pi * (f2 - f1)
+    )
+    return w / np.max(w, axis=-1, keepdims=True)
+
+
+def klauder(t, f1, f2, sweep=7.0):
+    """
+    Assumes t the time axis in seconds and a linear Vibroseis sweep from f1 to
+    f2 Hz lasting sweep seconds
+    Returns the Klauder wavelet, the autocorrelation of the sweep, scaled to a
+    peak of 1
+    """
+    f1, f2, sweep = (np.asarray(x, dtype=float) for x in (f1, f2, sweep))
+    k = np.pi * (f2 - f1) / sweep * t
+    envelope = np.sin(k * (sweep - np.abs(t))) / np.where(k == 0, 1, k)
+    envelope = np.where(k == 0, sweep - np.abs(t), envelope)
+    return envelope * np.cos(np.pi * (f1 + f2) * t) / sweep
+
+
+def butterworth(t, f_low, f_high, order=4):
+    """
+    Assumes t the time axis in seconds, the low and high cut frequencies in Hz
+    and the order of a Butterworth band-pass filter
+    Returns the zero phase wavelet of the amplitude spectrum of the filter,
+    scaled to a peak of 1
+    """
+    f_low, f_high, order = (np.asarray(x, dtype=float) for x in (f_low, f_high, order))
+    # the parameters broadcast against the frequencies as they would against t
+    dt = (t[-1] - t[0]) / (len(t) - 1) if len(t) > 1 else 1.0
+    df = 1 / (_SPECTRUM_OVERSAMPLING * len(t) * dt)
+    f = np.arange(0, 0.5 / dt + df / 2, df)
+    high_pass = f**order / np.sqrt(f ** (2 * order) + f_low ** (2 * order))
+    low_pass = 1 / np.sqrt(1 + (f / f_high) ** (2 * order))
+    amplitude = high_pass * low_pass
+    amplitude[..., 0] /= 2
+    return _cosine_sum(amplitude, f, t)
+
+
+def _cosine_sum(amplitude, f, t):
+    """
+    Assumes amplitude (..., len(f)) a zero phase amplitude spectrum sampled at
+    the frequencies f
+    Returns its inverse Fourier transform at the times t, scaled to a peak of 1
+    """
+    w = np.empty(amplitude.shape[:-1] + t.shape)
+    step = max(BLOCK_BYTES // (8 * len(f)), 1)
+    for j in range(0, len(t), step):
+        block = slice(j, j + step)
+        w[..., block] = amplitude @ np.cos(2 * np.pi * f[:, None] * t[block])
+    return w / np.max(w, axis=-1, keepdims=True)
+
+
+# wavelet name: function of the time axis and the parameters of the wavelet
+WAVELETS = {
+    "ricker": ricker_at,
+    "ormsby": ormsby,
+    "klauder": klauder,
+    "butterworth": butterworth,
+}
+
+
+def load_wavelet(path):
+    """
+    Assumes path a .npy or CSV file of a wavelet, either one column of
+    amplitudes or columns of time in seconds and amplitude, the CSV with an
+    optional header row
+    Returns the time, None for a column of amplitudes, and the amplitudes
+    """
+    if path.endswith(".npy"):
+        data = np.load(path, allow_pickle=False).astype(float)
+    else:
+        try:
+            data = np.loadtxt(path, delimiter=",", ndmin=2)
+        except ValueError:
+            data = np.loadtxt(path, delimiter=",", ndmin=2, skiprows=1)
+    if data.ndim == 2 and data.shape[-1] == 2:
+        return data[:, 0], data[:, 1]
+    if data.ndim == 1 or 1 in data.shape:
+        return None, data.reshape(-1)
+    raise ValueError("A wavelet file needs one or two columns: {}".format(path))
+
+
+def resample(t, time, amplitude):
+    """
+    Assumes t the time axis of a bank and a loaded wavelet, where time None
+    means that the amplitudes are sampled like t, their middle sample on the
+    middle sample of t
+    Returns the wavelet on t, zero outside of its time range
+    """
+    amplitude = np.asarray(amplitude, dtype=float)
+    if time is None:
+        w = np.zeros(t.shape)
+        shift = len(t) // 2 - len(amplitude) // 2
+        lo, hi = max(shift, 0), min(shift + len(amplitude), len(t))
+        w[lo:hi] = amplitude[lo - shift : hi - shift]
+        return w
+    time = np.asarray(time, dtype=float)
+    if np.any(np.diff(time) <= 0):
+        raise ValueError("The time of a wavelet must increase")
+    return np.interp(t, time, amplitude, left=0.0, right=0.0)
+
+
+class WaveletBank:
+    """
+    Wavelets sharing the time axis of a duration & dt, where
+        bank = WaveletBank(0.100, 0.001)
+        bank.add("ricker", [20, 25, 30]).add("ormsby", 5, 10, 40, 50)
+        bank.load("extracted.csv")
+        synth = bank.tuningwedge(rc)
+    convolves rc with every wavelet at once, synth[i] the wedge of bank.names[i]
+    """
+
+    def __init__(self, duration=0.100, dt=0.001):
+        self.duration = duration
+        self.dt = dt
+        self.t = wavelet_time(duration, dt)
+        self.names = []
+        self._rows = []
+        self._w = None
+        self._spectra = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, kind, *params, name=None):
+        """
+        Adds the wavelets of WAVELETS[kind] with the parameters params, which
+        may be arrays: one wavelet is added per element of their broadcast
+        Returns the bank
+        """
+        try:
+            func = WAVELETS[kind]
+        except KeyError:
+            raise ValueError("Unknown wavelet: {}".format(kind)) from None
+        params = np.broadcast_arrays(*(np.asarray(p, dtype=float) for p in params))
+        shape = params[0].shape if params else ()
+        w = func(self.t, *(p[..., None] for p in params))
+        w = np.broadcast_to(w, shape + self.t.shape).reshape(-1, len(self.t))
+        for i, row in enumerate(w):
+            values = [p.reshape(-1)[i] for p in params]
+            label = "{}({})".format(kind, ", ".join("{:g}".format(v) for v in values))
+            self.append(row, name if name is not None and len(w) == 1 else label)
+        return self
+
+    def load(self, path, name=None):
+        """Adds the wavelet of a file, see load_wavelet, and returns the bank"""
+        time, amplitude = load_wavelet(path)
+        w = resample(self.t, time, amplitude)
+        return self.append(w, os.path.basename(path) if name is None else name)
+
+    def append(self, w, name):
+        """Adds a wavelet sampled on the time axis t and returns the bank"""
+        w = np.asarray(w, dtype=float)
+        if w.shape != self.t.shape:
+            raise ValueError(
+                "A wavelet of the bank needs {} samples".format(len(self.t))
+            )
+        self.names.append(name)
+        self._rows.append(w)
+        self._w = None
+        self._spectra.clear()
+        return self
+
+    @property
+    def w(self):
+        """The wavelets, read-only (len(bank), taps)"""
+        if self._w is None:
+            if not self._rows:
+                raise ValueError("The wavelet bank is empty")
+            self._w = np.array(self._rows)
+            self._w.setflags(write=False)
+        return self._w
+
+    def spectrum(self, nfft):
+        """Returns the rFFT of length nfft of every wavelet, cached and read-only"""
+        spectrum = self._spectra.get(nfft)
+        if spectrum is None:
+            spectrum = np.fft.rfft(self.w, nfft, axis=-1)
+            spectrum.setflags(write=False)
+            self._spectra[nfft] = spectrum
+        return spectrum
+
+    def tuningwedge(self, rc, method="auto", dtype=None, out=None):
+        """
+        Assumes rc the reflectivity of a wedge, or a stack of them, and the
+        method, dtype & out of wedgebuilder.convolve_rc
+        The rFFT of the reflectivity is taken once and multiplied by the
+        shared spectra of the bank, or the direct convolution runs over all
+        wavelets at once
+        Returns the synthetics of shape (len(bank), ..., samples, traces)
+        """
+        if isinstance(rc, wb.SparseReflectivity):
+            ndim = np.ndim(rc.vals)
+            samples = rc.length
+        else:
+            ndim = np.ndim(rc)
+            samples = np.shape(rc)[-2]
+        # a bank axis in front of the leading dims of rc
+        shape = (len(self),) + (1,) * (ndim - 2)
+        w = self.w.reshape(shape + (-1,))
+        taps = w.shape[-1]
+        if method == "auto":
+            method = wb.convolve_method(samples, taps)
+        spectrum = None
+        if method == "fft":
+            spectrum = self.spectrum(wb.fft_length(samples, taps)).reshape(
+                shape + (-1,)
+            )
+        return wb.tuningwedge(rc, w, method, spectrum, dtype, out)
+
+    def tuningcurve(self, rc, synth):
+        """
+        Assumes rc the reflectivity given to tuningwedge and synth its result
+        Returns the wedgebuilder.tuningcurve of every wavelet, each value with a
+        leading bank axis
+        """
+        if isinstance(rc, wb.SparseReflectivity):
+            rc = wb.dense_reflectivity(rc)
+        rc = np.broadcast_to(rc, synth.shape[:-2] + np.shape(rc)[-2:])
+        return wb.tuningcurve(rc, synth)
+
+
+def wavelet_bank(spec, duration=0.100, dt=0.001):
+    """
+    Assumes spec a list of wavelets, each a dict of one WAVELETS name to its
+    parameters (a number or a list, any of them may be a list of values), or
+    of "file" to the path of a wavelet file, and optionally of "name" to its
+    label, e.g. [{"ricker": [[20, 25, 30]]}, {"ormsby": [5, 10, 40, 50]},
+    {"file": "extracted.csv", "name": "well 3"}]
+    Returns the WaveletBank of the wavelets of spec
+    """
+    bank = WaveletBank(duration, dt)
+    for entry in spec:
+        entry = dict(entry)
+        name = entry.pop("name", None)
+        if len(entry) != 1:
+            raise ValueError("A wavelet needs one kind: {}".format(entry))
+        ((kind, params),) = entry.items()
+        if kind == "file":
+            bank.load(params, name)
+        else:
+            params = params if isinstance(params, list) else [params]
+            bank.add(kind, *params, name=name)
+    return bank
+
+
+def read_spec(path):
+    """
+    Returns the wavelet_bank spec of a JSON file, with the paths of wavelet
+    files taken relative to the directory of the file
+    """
+    with open(path) as fh:
+        spec = json.load(fh)
+    directory = os.path.dirname(os.path.abspath(path))
+    for entry in spec:
+        if "file" in entry:
+            entry["file"] = os.path.join(directory, entry["file"])
+    return spec
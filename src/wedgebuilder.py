@@ -4,56 +4,436 @@
 # The base code for this comes from Agile Scientific's Synthetic Tuning Wedge nb
 # source: https://github.com/agile-geoscience/xlines/blob/master/notebooks/00_Synthetic_wedge_model.ipynb
 
+import contextlib
+import importlib.util
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
+# Wavelets with more taps than _FFT_COST_FACTOR * log2(nfft) are convolved
+# in the frequency domain, shorter ones directly
+_FFT_COST_FACTOR = 2
+
+# The frequency domain convolution and the sparse synthesis run on blocks of
+# traces sized so that their temporaries stay around this many bytes, however
+# many models are stacked
+BLOCK_BYTES = 1 << 22
+
+# A reflectivity stored as spikes: rows (spikes, traces) holds the RC row of
+# every spike, vals (..., spikes, traces) its value, where a zero value is an
+# unused spike, and length the number of RC rows of the dense reflectivity
+SparseReflectivity = namedtuple("SparseReflectivity", ["rows", "vals", "length"])
+
+
+def wedge_thickness(traces=101, dt=0.001, max_thickness=None, dz=None):
+    """Assumes traces an int and dt, max_thickness & dz in seconds TWT
+    dz is the thickness increment between traces (default one sample) and
+    max_thickness caps the wedge, after which it continues as a flat layer
+    Returns a numpy int array with the wedge thickness in samples per trace
+    """
+    dz = dt if dz is None else dz
+    thickness = np.arange(traces) * dz
+    if max_thickness is not None:
+        thickness = np.minimum(thickness, max_thickness)
+    return np.rint(thickness / dt).astype(int)
+
+
+def _top_sample(samples, dt, top):
+    """Returns the top-of-wedge sample index, samples // 3 when top is None"""
+    return samples // 3 if top is None else int(round(top / dt))
+
+
+def _layer_impedance(rock_props):
+    """Assumes rock_props a list of Vp-Density pairs of len 2N, or an array of
+    shape (..., 2N), e.g. len 6 for the three layers of the wedge
+    Returns the impedance of the N layers, shape (..., N), and the reflection
+    coefficients between every upper & lower pair, shape (..., N, N)
+    """
+    rocks = np.asarray(rock_props, dtype=float)
+    rocks = rocks.reshape(rocks.shape[:-1] + (-1, 2))
+    AI = rocks[..., 0] * rocks[..., 1]
+    upper, lower = AI[..., :, None], AI[..., None, :]
+    pairs = (lower - upper) / (lower + upper)
+    return AI, pairs
+
+
+def wedge_interfaces(
+    traces=101, samples=240, dt=0.001, top=None, max_thickness=None, dz=None
+):
+    """
+    Assumes the wedge geometry as for earthmodel
+    Returns the first sample of layers 1 & 2 (the wedge and the layer below it)
+    in every trace, an int array of shape (2, traces)
+    """
+    t0 = _top_sample(samples, dt, top)
+    thickness = wedge_thickness(traces, dt, max_thickness, dz)
+    return np.stack([np.full(traces, t0), t0 + thickness])
+
+
+def _layer_model(samples, interfaces):
+    """Assumes interfaces the (N - 1, traces) first samples of layers 1 to N - 1
+    Returns the layer index (0 to N - 1) of every sample, shape (samples, traces),
+    the number of interfaces at or above the sample
+    """
+    t = np.arange(samples)[:, None]
+    model = np.zeros((samples, interfaces.shape[-1]), np.intp)
+    for interface in interfaces:
+        model += t >= interface
+    return model
+
+
+def _output(out, shape, dtype):
+    """Returns out after checking its shape, or a new array if out is None"""
+    if out is None:
+        return np.empty(shape, dtype)
+    if out.shape != shape:
+        raise ValueError(
+            "out has shape {}, expected {}".format(out.shape, tuple(shape))
+        )
+    return out
 
-def earthmodel(rock_props):
+
+def earthmodel(
+    rock_props,
+    traces=101,
+    samples=240,
+    dt=0.001,
+    top=None,
+    max_thickness=None,
+    dz=None,
+    dtype=float,
+    out=None,
+):
     """
-	Input:
-	rock_props as a list of len 6 in Vp-Density pairs
+    Input:
+    rock_props as a list of len 6 in Vp-Density pairs, or an array of shape
+    (..., 6) to build a stack of models in one call
 
-	ex: rock_props = [3000, 2.315, 2200, 2.15, 3000, 2.315]
+    ex: rock_props = [3000, 2.315, 2200, 2.15, 3000, 2.315]
 
-	this function creates the earth model that is used
-	to create the wedge model.  First, three layers are defined.
-	Second, each layer is populated with a Vp & Density.
-	Finally, the Impedance of each layer is populated
-	returns rc
-	"""
+    the wedge geometry is set by the number of traces and samples, the sample
+    interval dt, the top-of-wedge time (default samples // 3), and the maximum
+    thickness and thickness increment per trace (see wedge_thickness), all
+    times in seconds TWT.  The defaults reproduce the original 240 x 101 wedge
 
-    # define the initial earth model
-    duration, depth = 101, 240
-    model = 1 + np.tri(depth, duration, -depth // 3, dtype=int)
-    model[: depth // 3, :] = 0
+    this function creates the earth model that is used
+    to create the wedge model.  First, three layers are defined.
+    Second, each layer is populated with a Vp & Density.
+    Finally, the Impedance of each layer is populated
 
-    # Populate each layer of the earth model with specific rock properties
-    rocks = np.array(rock_props).reshape(3, 2)
+    dtype sets the precision of imp & rc (see reflectivity) and out optionally
+    is a pair of arrays (imp, rc) of the output shapes to fill, so that repeated
+    calls reuse the same memory
+    returns imp, rc with shapes (..., samples, traces) & (..., samples - 1, traces)
+    """
 
-    # use fancy indexing to create an earth model where each layer of the model
-    # has Vp & Density at each location
-    earth = rocks[model]
+    # define the initial earth model as a layer index (0, 1, 2) per sample
+    interfaces = wedge_interfaces(traces, samples, dt, top, max_thickness, dz)
+    model = _layer_model(samples, interfaces)
+    imp_out, rc_out = (None, None) if out is None else out
 
-    # Calculate the acoustic impedance of each layer
-    imp = np.apply_along_axis(np.product, -1, earth)
+    # Calculate the acoustic impedance of each layer and populate the model
+    # with it directly, there is no need for a per-cell Vp & Density array
+    AI, pairs = _layer_impedance(rock_props)
+    AI = AI.astype(dtype, copy=False)
+    imp = _output(imp_out, AI.shape[:-1] + model.shape, dtype)
+    np.take(AI, model, axis=-1, out=imp, mode="clip")
 
-    # Finally, calculate the reflection coefficients for the interfaces between
-    # each layer and then return
-    rc = (imp[1:, :] - imp[:-1, :]) / (imp[1:, :] + imp[:-1, :])
+    # Finally, place the reflection coefficient of every interface, all other
+    # samples of the reflectivity are zero
+    rc = dense_reflectivity(
+        sparse_reflectivity(rock_props, interfaces, samples, dtype), rc_out
+    )
 
     return imp, rc
 
 
-def wavelet(duration=0.100, dt=0.001, f=25):
+def sparse_reflectivity(rock_props, interfaces, samples=240, dtype=float):
+    """
+    Assumes rock_props a list of Vp-Density pairs of N layers, top to bottom,
+    of len 2N (or an array of shape (..., 2N) for a stack of models) and
+    interfaces an int array of shape (N - 1, traces) with the first sample of
+    layers 1 to N - 1 in every trace, as wedge_interfaces for the wedge.
+    Layers between coinciding interfaces are pinched out, and interfaces at
+    or above the first sample, or below the last, have no RC
+    Returns a SparseReflectivity of the samples - 1 RC rows per trace, with one
+    spike per interface, the same reflectivity as that of earthmodel for a
+    dense model of the layers
+    """
+    AI, pairs = _layer_impedance(rock_props)
+    return _sparse_spikes(pairs, interfaces, samples, dtype)
+
+
+def _sparse_spikes(pairs, interfaces, samples, dtype):
+    """
+    Assumes pairs the (..., N, N) RCs between every upper & lower layer and the
+    interfaces of sparse_reflectivity
+    Returns the SparseReflectivity of sparse_reflectivity
+    """
+    interfaces = np.asarray(interfaces)
+    if pairs.shape[-1] != len(interfaces) + 1:
+        raise ValueError(
+            "{} layers need {} interfaces, got {}".format(
+                pairs.shape[-1], pairs.shape[-1] - 1, len(interfaces)
+            )
+        )
+
+    # the layer above and below every interface is the number of interfaces
+    # above it and at or above it, coinciding interfaces keep one spike
+    other, this = interfaces[None], interfaces[:, None]
+    above = np.sum(other < this, axis=1)
+    below = np.sum(other <= this, axis=1)
+    earlier = np.tril(np.ones((len(interfaces),) * 2, bool), -1)[..., None]
+    rows = interfaces - 1
+    keep = ~np.any((other == this) & earlier, axis=1) & (rows >= 0)
+    keep &= rows < samples - 1
+
+    vals = np.where(keep, pairs[..., above, below], 0).astype(dtype, copy=False)
+    return SparseReflectivity(np.where(keep, rows, 0), vals, samples - 1)
+
+
+def dense_reflectivity(rc, out=None):
+    """
+    Assumes rc a SparseReflectivity
+    Returns the reflectivity as an array of shape (..., rc.length, traces),
+    written into out if given
+    """
+    rows = np.asarray(rc.rows)
+    vals = np.asarray(rc.vals)
+    dense = _output(out, vals.shape[:-2] + (rc.length, rows.shape[-1]), vals.dtype)
+    dense[...] = 0
+    cols = np.arange(rows.shape[-1])
+    for row, val in zip(rows, np.moveaxis(vals, -2, 0)):
+        dense[..., row, cols] += val
+    return dense
+
+
+def reflectivity(
+    rock_props,
+    traces=101,
+    samples=240,
+    dt=0.001,
+    top=None,
+    max_thickness=None,
+    dz=None,
+    dtype=float,
+    out=None,
+):
+    """
+    Assumes the same inputs as earthmodel
+    Only the reflection coefficients are built, for callers that have no use
+    for the impedance model, e.g. parameter sweeps.  With dtype=np.float32 the
+    RCs are the float64 values rounded to float32, a relative error of at most
+    2**-24 (6e-8), for half the memory
+    Returns rc, the array of shape (..., samples - 1, traces) of earthmodel
+    """
+    interfaces = wedge_interfaces(traces, samples, dt, top, max_thickness, dz)
+    return dense_reflectivity(
+        sparse_reflectivity(rock_props, interfaces, samples, dtype), out
+    )
+
+
+# Angle dependent P-P reflection coefficients, see avo_rc
+AVO_METHODS = ("aki-richards", "shuey", "zoeppritz")
+
+
+def elastic_props(rock_props, vs):
+    """
+    Assumes rock_props a list of Vp-Density pairs of len 2N (or an array of
+    shape (..., 2N)) and vs the Vs of the N layers, of len N (or (..., N))
+    Returns the Vp-Vs-Density triples of the layers, an array of shape (..., 3N)
+    """
+    rocks = np.asarray(rock_props, dtype=float)
+    rocks = rocks.reshape(rocks.shape[:-1] + (-1, 2))
+    vp, rho = rocks[..., 0], rocks[..., 1]
+    vp, vs, rho = np.broadcast_arrays(vp, np.asarray(vs, dtype=float), rho)
+    triples = np.stack([vp, vs, rho], axis=-1)
+    return triples.reshape(triples.shape[:-2] + (-1,))
+
+
+def _avo_pp(vp1, vs1, rho1, vp2, vs2, rho2, p, method):
+    """
+    Assumes the Vp, Vs & density above (1) and below (2) an interface and the
+    ray parameter p (sin(angle) / Vp in any layer), as arrays that broadcast
+    Returns the P-P reflection coefficients, see avo_rc
+    """
+    if method not in AVO_METHODS:
+        raise ValueError("Unknown AVO method: {}".format(method))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if method == "zoeppritz":
+            # the explicit form of Aki & Richards (1980) eq. 5.40, cosines of the
+            # P & S angles complex past their critical angle
+            p2 = p**2
+            cos_i1 = np.emath.sqrt(1 - p2 * vp1**2) / vp1
+            cos_i2 = np.emath.sqrt(1 - p2 * vp2**2) / vp2
+            cos_j1 = np.emath.sqrt(1 - p2 * vs1**2) / vs1
+            cos_j2 = np.emath.sqrt(1 - p2 * vs2**2) / vs2
+            a = rho2 * (1 - 2 * vs2**2 * p2) - rho1 * (1 - 2 * vs1**2 * p2)
+            b = rho2 * (1 - 2 * vs2**2 * p2) + 2 * rho1 * vs1**2 * p2
+            c = rho1 * (1 - 2 * vs1**2 * p2) + 2 * rho2 * vs2**2 * p2
+            d = 2 * (rho2 * vs2**2 - rho1 * vs1**2)
+            E = b * cos_i1 + c * cos_i2
+            F = b * cos_j1 + c * cos_j2
+            G = a - d * cos_i1 * cos_j2
+            H = a - d * cos_i2 * cos_j1
+            D = E * F + G * H * p2
+            rpp = (
+                (b * cos_i1 - c * cos_i2) * F - (a + d * cos_i1 * cos_j2) * H * p2
+            ) / D
+            return np.real(rpp)
+
+        # the linear approximations, around the average angle & properties
+        theta = (np.arcsin(p * vp1) + np.arcsin(p * vp2)) / 2
+        vp, vs, rho = (vp1 + vp2) / 2, (vs1 + vs2) / 2, (rho1 + rho2) / 2
+        dvp, drho = (vp2 - vp1) / vp, (rho2 - rho1) / rho
+        dvs = np.where(vs > 0, (vs2 - vs1) / vs, 0.0)
+        if method == "shuey":
+            r0 = (dvp + drho) / 2
+            g = dvp / 2 - 2 * (vs / vp) ** 2 * (drho + 2 * dvs)
+            sin2 = np.sin(theta) ** 2
+            return r0 + g * sin2 + dvp / 2 * (np.tan(theta) ** 2 - sin2)
+        k = 4 * p**2 * vs**2
+        return (1 - k) * drho / 2 + dvp / (2 * np.cos(theta) ** 2) - k * dvs
+
+
+def avo_rc(vp1, vs1, rho1, vp2, vs2, rho2, angles, method="aki-richards"):
+    """
+    Assumes the Vp, Vs & density above (1) and below (2) an interface and the
+    incidence angles in degrees, as arrays that broadcast, and method one of
+    AVO_METHODS: the linear Aki-Richards or three term Shuey approximations,
+    or the exact Zoeppritz solution (which needs Vs > 0)
+    Returns the P-P reflection coefficients, where the approximations give NaN
+    past the critical angle and Zoeppritz the real part of the complex RC
+    """
+    vp1, vs1, rho1, vp2, vs2, rho2 = (
+        np.asarray(value, dtype=float) for value in (vp1, vs1, rho1, vp2, vs2, rho2)
+    )
+    p = np.sin(np.radians(angles)) / vp1
+    return _avo_pp(vp1, vs1, rho1, vp2, vs2, rho2, p, method)
+
+
+def _layer_avo(elastic_props, angles, method):
+    """Assumes elastic_props a list of Vp-Vs-Density triples of len 3N, or an
+    array of shape (..., 3N), and the incidence angles in degrees in the top
+    layer, carried down through the layers with Snell's law
+    Returns the RCs between every upper & lower pair, shape (..., angles, N, N)
+    """
+    rocks = np.asarray(elastic_props, dtype=float)
+    rocks = rocks.reshape(rocks.shape[:-1] + (-1, 3))[..., None, :, :]
+    vp, vs, rho = rocks[..., 0], rocks[..., 1], rocks[..., 2]
+    angles = np.radians(np.atleast_1d(np.asarray(angles, dtype=float)))
+    p = (np.sin(angles) / vp[..., 0])[..., None, None]
+    upper = (prop[..., :, None] for prop in (vp, vs, rho))
+    lower = (prop[..., None, :] for prop in (vp, vs, rho))
+    return _avo_pp(*upper, *lower, p, method)
+
+
+def sparse_avo_reflectivity(
+    elastic_props, interfaces, angles, samples=240, method="aki-richards", dtype=float
+):
+    """
+    Assumes elastic_props a list of Vp-Vs-Density triples of N layers, top to
+    bottom, of len 3N (or an array of shape (..., 3N)), interfaces as for
+    sparse_reflectivity, angles a 1D sequence of incidence angles in degrees in
+    the top layer and method one of AVO_METHODS (see avo_rc)
+    The RCs of every interface at every angle are computed in one broadcast
+    pass, the angles carried down through the layers with Snell's law
+    Returns a SparseReflectivity with an angles axis before its spikes axis,
+    vals of shape (..., angles, N - 1, traces)
+    """
+    pairs = _layer_avo(elastic_props, angles, method)
+    return _sparse_spikes(pairs, interfaces, samples, dtype)
+
+
+def avo_reflectivity(
+    elastic_props,
+    angles,
+    traces=101,
+    samples=240,
+    dt=0.001,
+    top=None,
+    max_thickness=None,
+    dz=None,
+    method="aki-richards",
+    dtype=float,
+    out=None,
+):
+    """
+    Assumes elastic_props a list of len 9 in Vp-Vs-Density triples of the three
+    wedge layers (or an array of shape (..., 9)), the wedge geometry as for
+    earthmodel and the angles & method of sparse_avo_reflectivity
+    Returns rc, an array of shape (..., angles, samples - 1, traces), at normal
+    incidence equal to the rc of earthmodel for Zoeppritz within rounding
+    """
+    interfaces = wedge_interfaces(traces, samples, dt, top, max_thickness, dz)
+    return dense_reflectivity(
+        sparse_avo_reflectivity(
+            elastic_props, interfaces, angles, samples, method, dtype
+        ),
+        out,
+    )
+
+
+def avo_tuningwedge(
+    elastic_props, angles, w, method="aki-richards", dtype=None, **geometry
+):
+    """
+    Assumes the elastic_props, angles & method of avo_reflectivity, a wavelet w
+    and geometry any of the earthmodel wedge geometry keywords
+    The angle gather of the wedge is synthesized from the spikes of all angles
+    at once, so there is no loop over angles, and tuningcurve(rc, synth) gives
+    the tuning curve of every angle, each value gaining an angles axis
+    Returns rc & synth, of shapes (..., angles, samples - 1, traces) and
+    (..., angles, max(samples - 1, taps), traces)
+    """
+    samples = geometry.get("samples", 240)
+    interfaces = wedge_interfaces(**geometry)
+    sparse = sparse_avo_reflectivity(
+        elastic_props, interfaces, angles, samples, method, float
+    )
+    synth = tuningwedge(sparse, w, dtype=dtype)
+    return dense_reflectivity(sparse).astype(synth.dtype, copy=False), synth
+
+
+def wavelet_samples(duration=0.100, dt=0.001):
+    """Returns the number of samples of a wavelet, duration / dt rounded"""
+    samples = int(round(duration / dt))
+    if samples < 1:
+        raise ValueError("A wavelet needs a duration of at least dt")
+    return samples
+
+
+def wavelet_time(duration=0.100, dt=0.001):
+    """Returns the time axis in seconds of the wavelets, centred on t = 0"""
+    return np.linspace(
+        -duration / 2, (duration - dt) / 2, wavelet_samples(duration, dt)
+    )
+
+
+def ricker(duration=0.100, dt=0.001, f=25):
+    """
+    This function defines a Ricker wavelet to convolve with the earth model
+    reflection coefficients to build the tuning wedge.  It is not cached, see
+    wavelet for the cached version
+    returns w
+    """
+    return ricker_at(wavelet_time(duration, dt), f)
+
+
+def ricker_at(t, f=25):
+    """
+    Assumes t the time axis in seconds and f the peak frequency in Hz, a number
+    or an array broadcasting against t
+    Returns the Ricker wavelet at the times t
     """
-	This function defines a Ricker wavelet to convolve with the earth model
-	reflection coefficients to build the tuning wedge.
-	returns w
-	"""
-    t = np.linspace(-duration / 2, (duration - dt) / 2, duration / dt)
-    w = (1.0 - 2.0 * (np.pi ** 2) * (f ** 2) * (t ** 2)) * np.exp(
-        -(np.pi ** 2) * (f ** 2) * (t ** 2)
+    return (1.0 - 2.0 * (np.pi**2) * (f**2) * (t**2)) * np.exp(
+        -(np.pi**2) * (f**2) * (t**2)
     )
-    return w
 
 
 def get_wavelet_plot_parms(w):
@@ -66,83 +446,942 @@ def get_wavelet_plot_parms(w):
     return np.linspace(start, stop, num)
 
 
-def tuningwedge(rc, w):
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "entries", "nbytes", "max_bytes"]
+)
+
+
+class ArrayCache:
+    """
+    A least recently used cache of read-only numpy arrays, bounded by the
+    total number of bytes it holds rather than by its number of entries, safe
+    to share between threads
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Returns the array cached under key, calling build() on a miss"""
+        with self._lock:
+            arr = self._entries.get(key)
+            if arr is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return arr
+            self.misses += 1
+        # built outside the lock, build may use the cache itself
+        arr = np.array(build())
+        arr.setflags(write=False)
+        with self._lock:
+            # another thread may have built the same key in the meantime
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                return cached
+            self._entries[key] = arr
+            self.nbytes += arr.nbytes
+            self._evict()
+        return arr
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = self.hits = self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, len(self._entries), self.nbytes, self.max_bytes
+            )
+
+    def _evict(self):
+        # called with the lock held
+        while self.nbytes > self.max_bytes and self._entries:
+            key, arr = self._entries.popitem(last=False)
+            self.nbytes -= arr.nbytes
+
+
+# Wavelets, plot axes and spectra repeat for the same few (duration, dt, f)
+_wavelet_cache = ArrayCache(max_bytes=16 * 2**20)
+
+
+def _wavelet_key(duration, dt, f):
+    return float(duration), float(dt), float(f)
+
+
+def wavelet(duration=0.100, dt=0.001, f=25):
+    """
+    Assumes the duration & dt in seconds and the frequency f in Hz of a Ricker
+    wavelet, see ricker
+    Returns w, cached and read-only
     """
-	This function takes the reflection coefficients and convolves them with the
-	wavelet to produce a synthetic tuning wedge
-	returns synth
-	"""
+    key = _wavelet_key(duration, dt, f)
+    return _wavelet_cache.get(("w",) + key, lambda: ricker(*key))
 
-    synth = np.apply_along_axis(
-        lambda t: np.convolve(t, w, mode="same"), axis=0, arr=rc
+
+def wavelet_plot_axis(duration=0.100, dt=0.001, f=25):
+    """Returns get_wavelet_plot_parms of the cached wavelet, cached and read-only"""
+    key = _wavelet_key(duration, dt, f)
+    return _wavelet_cache.get(
+        ("t",) + key, lambda: get_wavelet_plot_parms(wavelet(*key))
+    )
+
+
+def wavelet_spectrum(duration=0.100, dt=0.001, f=25, nfft=None):
+    """
+    Assumes nfft the rFFT length, as returned by fft_length, by default the
+    length of the wavelet
+    Returns the rFFT of the cached wavelet, cached and read-only, that can be
+    passed as the spectrum of convolve_rc or tuningwedge
+    """
+    key = _wavelet_key(duration, dt, f)
+    return _wavelet_cache.get(
+        ("spectrum", nfft) + key, lambda: np.fft.rfft(wavelet(*key), nfft)
     )
+
+
+def wavelet_cache_info():
+    """Returns the hits, misses, entries, nbytes & max_bytes of the wavelet cache"""
+    return _wavelet_cache.info()
+
+
+def wavelet_cache_clear():
+    """Empties the wavelet cache and resets its statistics"""
+    _wavelet_cache.clear()
+
+
+def set_wavelet_cache_size(max_bytes):
+    """Bounds the wavelet cache to max_bytes, evicting least recently used entries"""
+    _wavelet_cache.resize(max_bytes)
+
+
+def next_fast_len(n):
+    """Assumes n a positive int
+    Returns the smallest 2-3-5 smooth int >= n, an efficient rFFT length
+    """
+    best = 1 << (int(n) - 1).bit_length()
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            p = p35
+            while p < n:
+                p *= 2
+            best = min(best, p)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def fft_length(samples, taps):
+    """Assumes samples and taps are the trace and wavelet lengths
+    Returns the rFFT length used for a linear (non-circular) convolution
+    """
+    return next_fast_len(samples + taps - 1)
+
+
+def _batch_shape(rc, w):
+    """Returns the broadcast of the leading (batch) dims of rc and w"""
+    return np.broadcast(rc[..., 0, 0], w[..., 0]).shape
+
+
+def _convolve_direct(rc, w, start, out):
+    """Rows start: of the full linear convolution along axis -2, written into
+    out, as one shifted add per wavelet tap
+    """
+    n, m = rc.shape[-2], w.shape[-1]
+    length = out.shape[-2]
+    out[...] = 0
+    term = np.empty(np.broadcast(out[..., :n, :], rc).shape, out.dtype)
+    for k in range(m):
+        # tap k adds w[k] * rc[i] to row i + k of the full convolution
+        lo, hi = max(start - k, 0), min(start - k + length, n)
+        if lo >= hi:
+            continue
+        part = term[..., : hi - lo, :]
+        np.multiply(w[..., k, None, None], rc[..., lo:hi, :], out=part)
+        rows = out[..., lo + k - start : hi + k - start, :]
+        np.add(rows, part, out=rows)
+    return out
+
+
+def _convolve_fft(rc, w, start, out, spectrum=None):
+    """Rows start: of the full linear convolution along axis -2, written into
+    out, as one batched rFFT product
+    """
+    n, m = rc.shape[-2], w.shape[-1]
+    nfft = fft_length(n, m)
+    if spectrum is None:
+        spectrum = np.fft.rfft(w, nfft, axis=-1)
+    spectrum = spectrum[..., None]
+
+    # a trace costs a complex spectrum and a real inverse of nfft samples, plus
+    # the work buffers of the transforms, about 4 real arrays of nfft
+    batch = int(np.prod(out.shape[:-2]))
+    step = max(BLOCK_BYTES // (4 * batch * nfft * out.itemsize), 1)
+    for j in range(0, out.shape[-1], step):
+        block = slice(j, j + step)
+        spec = np.fft.rfft(rc[..., block], nfft, axis=-2)
+        if spec.shape == np.broadcast(spec, spectrum).shape:
+            spec *= spectrum
+        else:
+            # more wavelets than models, e.g. a bank of wavelets on one model
+            spec = spec * spectrum
+        full = np.fft.irfft(spec, nfft, axis=-2)
+        out[..., block] = full[..., start : start + out.shape[-2], :]
+    return out
+
+
+def sparse_synthetic(rc, w, dtype=None, out=None):
+    """
+    Assumes rc a SparseReflectivity and w a wavelet as for convolve_rc
+    Every spike scatter-adds a copy of the wavelet, scaled by its RC, to its
+    trace, one vectorized add per spike, so the cost scales with spikes x taps
+    x traces rather than with samples x traces x taps.  The result is that of
+    convolve_rc(dense_reflectivity(rc), w), identical to the "direct" method
+    where at most two spikes overlap (and otherwise up to the order of the
+    sums); dtype and out are as for convolve_rc
+    Returns a numpy array of shape (..., max(rc.length, taps), traces)
+    """
+    if dtype is None:
+        dtype = np.result_type(rc.vals, w, np.float32)
+    rows = np.asarray(rc.rows)
+    vals = np.asarray(rc.vals, dtype=dtype)
+    w = np.asarray(w, dtype=dtype)
+    n, m = rc.length, w.shape[-1]
+    traces = rows.shape[-1]
+    length = max(n, m)
+    start = (min(n, m) - 1) // 2
+    batch = np.broadcast(vals[..., 0, 0], w[..., 0]).shape
+    out = _output(out, batch + (length, traces), dtype)
+
+    # the full convolution has room for every tap of every spike, tap k of the
+    # spike at row r lands on row r + k
+    taps = np.arange(m)[:, None]
+    wavelet = w[..., :, None]
+    models = int(np.prod(batch))
+    step = max(BLOCK_BYTES // (2 * models * (n + m) * out.itemsize), 1)
+    for j in range(0, traces, step):
+        block = slice(j, j + step)
+        cols = np.arange(len(range(traces)[block]))
+        full = np.zeros(batch + (n + m - 1, len(cols)), dtype)
+        for row, val in zip(rows[:, block], np.moveaxis(vals[..., block], -2, 0)):
+            full[..., row + taps, cols] += wavelet * val[..., None, :]
+        out[..., block] = full[..., start : start + length, :]
+    return out
+
+
+def convolve_method(samples, taps):
+    """Assumes samples and taps are the trace and wavelet lengths
+    Returns "direct" or "fft", whichever is cheaper for the problem size
+    """
+    # the direct path costs ~taps operations per output sample, the rFFT path
+    # ~log2(nfft) with a larger constant (forward, product, inverse)
+    if taps <= _FFT_COST_FACTOR * np.log2(fft_length(samples, taps)):
+        return "direct"
+    return "fft"
+
+
+# Compute backends
+# The convolution of the traces and the reductions of tuningcurve run on a
+# backend: "numpy", the reference, "threaded", which splits the traces across
+# a pool of threads running the same NumPy calls (NumPy releases the GIL in
+# them), and "numba", compiled parallel kernels, when numba is installed.  The
+# default comes from $PYSEISTUNED_BACKEND, else "numpy", and "auto" picks the
+# fastest backend for the problem size from a one time calibration
+BACKEND_ENV = "PYSEISTUNED_BACKEND"
+
+
+class NumpyBackend:
+    """The reference backend, vectorized NumPy calls over all traces"""
+
+    name = "numpy"
+
+    def convolve(self, rc, w, start, out, method, spectrum=None):
+        """Rows start: of the full convolution of rc & w along axis -2 with
+        method "direct" or "fft", written into out, see convolve_rc
+        """
+        if method == "direct":
+            return _convolve_direct(rc, w, start, out)
+        return _convolve_fft(rc, w, start, out, spectrum)
+
+    def argextrema(self, arr):
+        """Returns the rows of the minimum & maximum of every trace of arr
+        (..., samples, traces), ignoring NaNs
+        """
+        return (
+            _nanarg(arr, np.argmin, np.nanargmin),
+            _nanarg(arr, np.argmax, np.nanargmax),
+        )
+
+
+class ThreadedBackend(NumpyBackend):
+    """
+    The NumPy backend run on blocks of at least min_traces traces by a pool of
+    workers threads, its results identical to those of the NumPy backend
+    """
+
+    name = "threaded"
+
+    def __init__(self, workers=None, min_traces=64):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_traces = min_traces
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _blocks(self, traces):
+        """Returns the slices of traces of every block, None for one block"""
+        blocks = min(self.workers, traces // self.min_traces)
+        if blocks < 2:
+            return None
+        edges = np.linspace(0, traces, blocks + 1).astype(int)
+        return [slice(lo, hi) for lo, hi in zip(edges[:-1], edges[1:])]
+
+    def _map(self, func, blocks):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="wedgebuilder"
+                )
+        return list(self._pool.map(func, blocks))
+
+    def convolve(self, rc, w, start, out, method, spectrum=None):
+        blocks = self._blocks(rc.shape[-1])
+        if blocks is None:
+            return super().convolve(rc, w, start, out, method, spectrum)
+        if method == "fft" and spectrum is None:
+            # transformed once and shared by the blocks
+            spectrum = np.fft.rfft(w, fft_length(rc.shape[-2], w.shape[-1]), axis=-1)
+
+        def block(cols):
+            NumpyBackend.convolve(
+                self, rc[..., cols], w, start, out[..., cols], method, spectrum
+            )
+
+        self._map(block, blocks)
+        return out
+
+    def argextrema(self, arr):
+        blocks = self._blocks(arr.shape[-1])
+        if blocks is None:
+            return super().argextrema(arr)
+        parts = self._map(
+            lambda cols: NumpyBackend.argextrema(self, arr[..., cols]), blocks
+        )
+        return tuple(np.concatenate(part, axis=-1) for part in zip(*parts))
+
+
+class NumbaBackend(NumpyBackend):
+    """
+    Compiled parallel kernels for the direct convolution of a single model &
+    wavelet and for the reductions of tuningcurve, the rFFT convolution and
+    stacks of wavelets left to NumPy.  Needs numba, which is imported (and the
+    kernels compiled) on the first use of the backend
+    """
+
+    name = "numba"
+
+    @property
+    def kernels(self):
+        """The wedgenumba module of the compiled kernels"""
+        import wedgenumba
+
+        return wedgenumba
+
+    def convolve(self, rc, w, start, out, method, spectrum=None):
+        if method != "direct" or rc.ndim != 2 or w.ndim != 1:
+            return super().convolve(rc, w, start, out, method, spectrum)
+        return self.kernels.direct(rc, w, start, out)
+
+    def argextrema(self, arr):
+        if arr.dtype.kind != "f":
+            return super().argextrema(arr)
+        flat = arr.reshape((-1,) + arr.shape[-2:])
+        lo = np.empty((flat.shape[0], flat.shape[-1]), np.intp)
+        hi = np.empty_like(lo)
+        self.kernels.argextrema(flat, lo, hi)
+        if (lo < 0).any():
+            raise ValueError("All-NaN slice encountered")
+        shape = arr.shape[:-2] + arr.shape[-1:]
+        return lo.reshape(shape), hi.reshape(shape)
+
+
+BACKENDS = OrderedDict([("numpy", NumpyBackend()), ("threaded", ThreadedBackend())])
+# registered without importing numba, which takes longer than the rest
+if importlib.util.find_spec("numba") is not None:
+    BACKENDS["numba"] = NumbaBackend()
+
+_backend = {"name": None, "calibration": None}
+_backend_lock = threading.Lock()
+
+
+def set_backend(name):
+    """Assumes name one of BACKENDS or "auto", the default backend from now on"""
+    if name != "auto" and name not in BACKENDS:
+        raise ValueError("Unknown backend: {}".format(name))
+    _backend["name"] = name
+
+
+def get_backend(backend=None, elements=None):
+    """
+    Assumes backend a name of BACKENDS, "auto", a backend, or None for the
+    default, and elements the size of the synthetics to compute
+    Returns the backend, for "auto" the calibrated fastest at the size class
+    closest to elements, calibrating on the first call
+    """
+    if backend is None:
+        backend = _backend["name"] or os.environ.get(BACKEND_ENV) or "numpy"
+    if not isinstance(backend, str):
+        return backend
+    if backend == "auto":
+        with _backend_lock:
+            calibration = _backend["calibration"] or calibrate()
+        if elements is None:
+            return BACKENDS[calibration[0][1]]
+        size = np.log(max(elements, 1))
+        return BACKENDS[min(calibration, key=lambda c: abs(np.log(c[0]) - size))[1]]
+    try:
+        return BACKENDS[backend]
+    except KeyError:
+        raise ValueError("Unknown backend: {}".format(backend)) from None
+
+
+def calibrate(traces=(101, 1001, 10001), repeat=3):
+    """
+    Times tuningwedge & tuningcurve on every backend for the default wedge with
+    each number of traces, the best of repeat runs after a warm up run (which
+    compiles the numba kernels).  "auto" calibrates on its first use, calling
+    calibrate again replaces the calibration
+    Returns the calibration [(elements, fastest backend name)] that "auto"
+    uses, elements the size of the synthetics of each wedge
+    """
+    calibration = []
+    w = wavelet()
+    for n in traces:
+        rc = earthmodel(
+            [3000, 2315, 2200, 2150, 3000, 2315], n, dz=0.100 / max(n - 1, 1)
+        )[1]
+        best = None
+        for name, backend in BACKENDS.items():
+            times = []
+            for _ in range(repeat + 1):
+                start = time.perf_counter()
+                synth = tuningwedge(rc, w, backend=backend)
+                tuningcurve(rc, synth, backend=backend)
+                times.append(time.perf_counter() - start)
+            if best is None or min(times[1:]) < best[0]:
+                best = (min(times[1:]), name)
+        calibration.append((synth.size, best[1]))
+    _backend["calibration"] = calibration
+    return calibration
+
+
+def convolve_rc(
+    rc, w, method="auto", spectrum=None, dtype=None, out=None, backend=None
+):
+    """
+    Assumes rc a numpy array of reflection coefficients with time along
+    axis -2, either (samples, traces) or stacked (..., samples, traces), and w a
+    1D wavelet, or stacked (..., taps) with leading dims that broadcast against
+    those of rc.
+
+    Every trace is convolved with the wavelet in one vectorized call, either
+    directly or through a batched rFFT (method="direct", "fft" or "auto"), and
+    the result keeps the alignment of np.convolve(trace, w, mode="same").
+    spectrum optionally is the precomputed rFFT of w of length
+    fft_length(samples, taps), e.g. from wavelet_spectrum, for the rFFT path.
+    The result has the precision dtype, by default that of rc & w (float64
+    unless both are float32), and is written into out if given.  In float32
+    every output sample carries a relative rounding error of about
+    taps * 2**-24 of the sum of the absolute terms, ~1e-5 for 100 taps.
+    backend is a name of BACKENDS, "auto" or a backend, see get_backend
+    rc may also be a SparseReflectivity, which is synthesized with
+    sparse_synthetic whatever the method
+    Returns a numpy array of shape (..., max(samples, taps), traces)
+    """
+    if isinstance(rc, SparseReflectivity):
+        return sparse_synthetic(rc, w, dtype, out)
+    if dtype is None:
+        dtype = np.result_type(rc, w, np.float32)
+    rc = np.asarray(rc, dtype=dtype)
+    w = np.asarray(w, dtype=dtype)
+    n, m = rc.shape[-2], w.shape[-1]
+    if method == "auto":
+        method = convolve_method(n, m)
+    if method not in ("direct", "fft"):
+        raise ValueError("Unknown convolution method: {}".format(method))
+
+    # np.convolve(mode="same") keeps max(n, m) samples of the full result,
+    # centred on the shorter of the two inputs
+    start = (min(n, m) - 1) // 2
+    shape = _batch_shape(rc, w) + (max(n, m), rc.shape[-1])
+    out = _output(out, shape, dtype)
+    backend = get_backend(backend, int(np.prod(shape)))
+    if method == "fft" and spectrum is not None and dtype == np.float32:
+        spectrum = spectrum.astype(np.complex64, copy=False)
+    return backend.convolve(rc, w, start, out, method, spectrum)
+
+
+def tuningwedge(
+    rc, w, method="auto", spectrum=None, dtype=None, out=None, backend=None
+):
+    """
+    This function takes the reflection coefficients and convolves them with the
+    wavelet to produce a synthetic tuning wedge.  All traces are convolved in a
+    single vectorized call, see convolve_rc for the method, spectrum, dtype,
+    out and backend options
+    returns synth
+    """
+
+    synth = convolve_rc(rc, w, method, spectrum, dtype, out, backend)
     return synth
 
 
 def mask_rc(rc):
     """Assumes rc is a numpy array
-    Returns a masked numpy array for zero values
+    Returns a masked numpy array for zero values, a view of rc plus the mask
+    """
+    return np.ma.masked_equal(rc, 0, copy=False)
+
+
+def _row(arr, row):
+    """Returns arr[..., row, :] for a row index per model of a stack"""
+    return np.take_along_axis(arr, np.asarray(row)[..., None, None], axis=-2)[..., 0, :]
+
+
+def _nanarg(arr, argfunc, nanfunc):
+    """Returns argfunc(arr, axis=-2), or nanfunc(arr, axis=-2) if arr holds NaNs
+    where it matters, without the full copy of arr nanargmin & nanargmax make
     """
-    return np.ma.masked_equal(rc, 0)
+    best = argfunc(arr, axis=-2)
+    # argmin & argmax return the first NaN of a column that has one
+    if np.isnan(np.take_along_axis(arr, best[..., None, :], axis=-2)).any():
+        return nanfunc(arr, axis=-2)
+    return best
 
 
-def tuningcurve(rc, synth, rock_props):
+def tuningcurve(rc, synth, rock_props=None, backend=None):
+    """
+    This function calculates the tuning curve with axis-wise reductions, for a
+    single model with rc & synth of shape (samples, traces) or for a stack of
+    models of shape (n_models, samples, traces), in which case every returned
+    value gains a leading n_models axis (z_tuning & z_onset become arrays).
+    The polarity of the top of the wedge is read from rc, so rock_props is not
+    needed anymore and is only accepted for backwards compatibility.  The
+    reductions run on backend, see get_backend
+    Returns: z, z_tuning, amp, z_apparent, z_onset
     """
-	This function calculates the tuning curve
-	Returns: z, z_tuning, amp, z_apparent, z_onset
-	"""
 
-    depth = 240
+    rc = np.asarray(rc)
+    synth = np.asarray(synth)
+    backend = get_backend(backend, synth.size)
 
-    rocks = np.array(rock_props).reshape(3, 2)
-    AI = np.apply_along_axis(np.product, -1, rocks)
+    # Determine the polarity of the top of the wedge from the shallowest
+    # non-zero RC of the thickest (last) trace
+    thickest = rc[..., -1]
+    first = np.argmax(thickest != 0, axis=-1)
+    rc_top = np.take_along_axis(thickest, first[..., None], axis=-1)[..., 0]
+    softer = (rc_top < 0)[..., None]
 
     # Determine the wedge thickness at each trace
     # Initially we assume that the top RC is a decrease in impedance,
     # negative value (trough) SEG normal polarity
-    if AI[1] < AI[0]:
-        top = np.apply_along_axis(np.nanargmin, 0, rc) + 1
-        base = np.apply_along_axis(np.nanargmax, 0, rc) + 1
-    else:
-        top = np.apply_along_axis(np.nanargmax, 0, rc) + 1
-        base = np.apply_along_axis(np.nanargmin, 0, rc) + 1
+    rc_min, rc_max = (arg + 1 for arg in backend.argextrema(rc))
+    top = np.where(softer, rc_min, rc_max)
+    base = np.where(softer, rc_max, rc_min)
 
     # calculate the wedge thickness, z, in twt, m, & ft.
     z = base - top
 
     # Determine the thickness at which synth has max amplitude
     # This is the measured tuning thickness in TWT
-    z_tuning = np.nanargmax(abs(synth[np.nanmax(top), :]))
+    z_tuning = np.nanargmax(np.abs(_row(synth, np.nanmax(top, axis=-1))), axis=-1)
 
     # Determine the apparent thickness at which synth has max amplitude
     # This represents what is seismically resolvable, in TWT
-    if AI[1] < AI[0]:
-        topApparent = np.apply_along_axis(np.nanargmin, 0, synth) + 1
-        baseApparent = np.apply_along_axis(np.nanargmax, 0, synth) + 1
+    synth_min, synth_max = (arg + 1 for arg in backend.argextrema(synth))
+    z_apparent = np.where(softer, synth_max - synth_min, synth_min - synth_max)
+    z_apparent[..., 0] = z_apparent[..., 1]
 
+    # Extract the amplitude along the top of the wedge model
+    amp = np.abs(_row(synth, first + 1))
+
+    # calculate the tuning onset thickness
+    z_onset = _tuning_onset(amp)
+
+    return z, z_tuning, amp, z_apparent, z_onset
+
+
+def _tuning_onset(amp):
+    """Assumes amp the (..., traces) amplitude along the top of the wedge
+    Returns the thickest trace at which the amplitude is still more than 1%
+    above the reference amplitude taken where z >> z_tuning, 0 if there is none
+    """
+    ampRef = amp[..., -1:]
+    ampPC = (amp - ampRef) / ampRef
+    tuned = ampPC > 0.01
+    return np.where(
+        tuned.any(axis=-1), amp.shape[-1] - 1 - np.argmax(tuned[..., ::-1], axis=-1), 0
+    )[()]
+
+
+def _spike_extremum(rows, vals, n, argfunc):
+    """Assumes rows & vals of shape (..., k) describe columns of length n that
+    are zero apart from the spikes vals at rows (spikes outside the column or
+    with a zero value are ignored) and argfunc np.argmin or np.argmax
+    Returns argfunc along each column, as if the dense column had been searched,
+    the shallowest row of the extreme value on ties as numpy
+    """
+    valid = (rows >= 0) & (rows < n) & (vals != 0)
+
+    # the shallowest zero sample of the column competes with the spikes
+    zero = np.zeros(rows.shape[:-1], dtype=int)
+    for _ in range(rows.shape[-1]):
+        zero = zero + np.any(valid & (rows == zero[..., None]), axis=-1)
+
+    # the extreme spike, then the zero sample if it is more extreme
+    if argfunc is np.argmin:
+        vals = np.where(valid & ~np.isnan(vals), vals, np.inf)
+        best = vals.min(axis=-1)
+        zero_wins = best > 0
     else:
-        topApparent = np.apply_along_axis(np.nanargmax, 0, synth) + 1
-        baseApparent = np.apply_along_axis(np.nanargmin, 0, synth) + 1
+        vals = np.where(valid & ~np.isnan(vals), vals, -np.inf)
+        best = vals.max(axis=-1)
+        zero_wins = best < 0
+    rows = np.where(vals == best[..., None], rows, np.iinfo(rows.dtype).max)
+    return np.where(zero_wins & (zero < n), zero, rows.min(axis=-1))
+
+
+def _wavelet_taps(w, taps):
+    """Assumes w a wavelet (..., m) and taps an int array
+    Returns w[..., taps], with zeros for taps outside of [0, m)
+    """
+    m = w.shape[-1]
+    wz = np.concatenate([w, np.zeros(w.shape[:-1] + (1,))], axis=-1)
+    return wz[..., np.where((taps >= 0) & (taps < m), taps, m)]
+
+
+def _spike_synth_row(w, rows, vals, start, length, row):
+    """
+    Assumes w a wavelet (..., m), the spike rows (traces, 2) & values
+    (..., traces, 2) of a wedge, the synthetic length & its first wavelet tap
+    start as tuningwedge computes them, and row an int per model
+    Returns synth[..., row, :] of the synthetic from the two shifted wavelets of
+    those traces only, with zeros for rows outside of the synthetic
+    """
+    row = np.asarray(row)
+    m = w.shape[-1]
+    taps = row[..., None, None] + start - rows
+    taps = np.where((taps >= 0) & (taps < m), taps, m)
+    batch = np.broadcast(w[..., 0], taps[..., 0, 0]).shape
+    taps = np.broadcast_to(taps, batch + taps.shape[-2:])
+    wz = np.concatenate([w, np.zeros(w.shape[:-1] + (1,))], axis=-1)
+    picked = np.take_along_axis(
+        np.broadcast_to(wz, batch + (m + 1,)), taps.reshape(batch + (-1,)), axis=-1
+    ).reshape(taps.shape)
+    synth = vals[..., 0] * picked[..., 0] + vals[..., 1] * picked[..., 1]
+    inside = (row >= 0) & (row < length)
+    return np.where(inside[..., None], synth, 0.0)
 
-    z_apparent = baseApparent - topApparent
-    z_apparent[0] = z_apparent[1]
+
+def _spike_wedge(rock_props, traces, samples, dt, top, max_thickness, dz):
+    """
+    Assumes rock_props and the wedge geometry as for earthmodel
+    Every trace of the wedge holds the top RC at row t0 - 1 and the base RC
+    thickness samples below it, or a single RC between layers 1 & 3 where the
+    wedge pinches out.  The wedge top & thickness are found from these spikes
+    exactly as tuningcurve finds them in the dense reflectivity
+    Returns t0, thickness, the spike rows (traces, 2) & values (..., traces, 2),
+    the row of the first RC of the thickest trace, the top polarity (softer),
+    and top & z as tuningcurve computes them
+    """
+    n = samples - 1
+    interfaces = wedge_interfaces(traces, samples, dt, top, max_thickness, dz)
+    t0 = _top_sample(samples, dt, top)
+    thickness = interfaces[1] - t0
+    rc = sparse_reflectivity(rock_props, interfaces, samples)
+    rows = rc.rows.T
+    vals = np.swapaxes(rc.vals, -1, -2)
+
+    # Determine the polarity of the top of the wedge, as tuningcurve does
+    nonzero = vals[..., -1, :] != 0
+    shallow = np.where(nonzero, rows[-1], n)
+    spike = np.argmin(shallow, axis=-1)[..., None]
+    rc_top = np.take_along_axis(vals[..., -1, :], spike, axis=-1)[..., 0]
+    first = np.where(nonzero.any(axis=-1), np.min(shallow, axis=-1), 0)
+    softer = (rc_top < 0)[..., None]
+
+    # Determine the wedge thickness at each trace
+    spikes = np.broadcast_to(rows, vals.shape)
+    rc_min = _spike_extremum(spikes, vals, n, np.argmin) + 1
+    rc_max = _spike_extremum(spikes, vals, n, np.argmax) + 1
+    top = np.where(softer, rc_min, rc_max)
+    base = np.where(softer, rc_max, rc_min)
+    return t0, thickness, rows, vals, first, softer, top, base - top
+
+
+def analytictuningcurve(
+    rock_props,
+    w,
+    traces=101,
+    samples=240,
+    dt=0.001,
+    top=None,
+    max_thickness=None,
+    dz=None,
+):
+    """
+    Assumes rock_props and the wedge geometry as for earthmodel and a wavelet w,
+    either 1D or stacked (..., taps) to match a stack of rock_props
+    The wedge is a two-spike linear system: every trace holds the top RC and
+    the base RC thickness samples below it.  Rather than convolving the full
+    reflectivity, the synthetic is only evaluated as the sum of two shifted
+    wavelets over the rows that the wavelet reaches, and the wedge top & base
+    come straight from the spike positions, so no (samples x traces) model or
+    convolution is built.  The results are those of
+    tuningcurve(rc, tuningwedge(rc, w)) for the same model, identical to the
+    "direct" convolution and within rounding of the "fft" one
+    Returns: z, z_tuning, amp, z_apparent, z_onset
+    """
+    w = np.asarray(w, dtype=float)
+    n, m = samples - 1, w.shape[-1]
+    length = max(n, m)
+    start = (min(n, m) - 1) // 2
+    t0, thickness, rows, vals, first, softer, top, z = _spike_wedge(
+        rock_props, traces, samples, dt, top, max_thickness, dz
+    )
+
+    # evaluate the synthetic as the sum of the two shifted wavelets over the
+    # window of rows reached by the wavelet of either spike, every other row of
+    # the synthetic is zero
+    first_row = t0 - 1 - start
+    window = np.arange(
+        max(first_row, 0), min(first_row + m + int(thickness.max()), length)
+    )
+    picked = _wavelet_taps(w, window[:, None, None] + start - rows)
+    rc1, rc2 = vals[..., None, :, 0], vals[..., None, :, 1]
+    synth = rc1 * picked[..., 0] + rc2 * picked[..., 1]
+
+    # the shallowest zero row of the synthetic, if there is one
+    zero = 0 if window[0] > 0 else window[-1] + 1
+    has_zero = zero < length
+
+    def synth_row(row):
+        # synth[..., row, :]
+        return _spike_synth_row(w, rows, vals, start, length, row)
+
+    def synth_extremum(argfunc):
+        # argfunc(synth, axis=-2) with the zero rows outside of the window
+        best = argfunc(synth, axis=-2)
+        best_val = np.take_along_axis(synth, best[..., None, :], axis=-2)[..., 0, :]
+        best = window[best]
+        beaten = best_val > 0 if argfunc is np.argmin else best_val < 0
+        tied = (best_val == 0) & (zero < best)
+        return np.where(has_zero & (beaten | tied), zero, best)
+
+    # Determine the thickness at which synth has max amplitude
+    z_tuning = np.nanargmax(np.abs(synth_row(np.nanmax(top, axis=-1))), axis=-1)
+
+    # Determine the apparent thickness at which synth has max amplitude
+    synth_min = synth_extremum(np.argmin) + 1
+    synth_max = synth_extremum(np.argmax) + 1
+    z_apparent = np.where(softer, synth_max - synth_min, synth_min - synth_max)
+    z_apparent[..., 0] = z_apparent[..., 1]
 
     # Extract the amplitude along the top of the wedge model
-    # amp = abs(synth[np.nanmax(top),:])
-    ampTop = abs(synth[depth // 3, :])
-    amp = ampTop
-    # ampBase = abs(np.diag(synth, k=-depth//3))
+    amp = np.abs(synth_row(first + 1))
 
     # calculate the tuning onset thickness
-    ampRef = abs(ampTop[-1])  # grabs amplitude "reference" when z >> z_tuning
-    ampPC = [
-        ((abs(x) - ampRef) / ampRef) for x in ampTop
-    ]  # calculates Percent Change in amp along wedge top
-    z_onset = (len(ampTop) - np.argwhere(np.flip(ampPC) > 0.01)[0][0]) - 1
+    z_onset = _tuning_onset(amp)
 
     return z, z_tuning, amp, z_apparent, z_onset
 
 
+def analytictuningthickness(
+    rock_props,
+    w,
+    traces=101,
+    samples=240,
+    dt=0.001,
+    top=None,
+    max_thickness=None,
+    dz=None,
+):
+    """
+    Assumes the inputs of analytictuningcurve
+    The tuning & onset thicknesses only need two rows of the synthetic, the row
+    of the deepest wedge top and the amplitude along the top of the wedge, so
+    only those rows are evaluated from the spikes, for a small fraction of the
+    work of analytictuningcurve.  This is the analytic method of tuningsweep
+    Returns z_tuning, z_onset of analytictuningcurve
+    """
+    w = np.asarray(w, dtype=float)
+    n, m = samples - 1, w.shape[-1]
+    length = max(n, m)
+    start = (min(n, m) - 1) // 2
+    t0, thickness, rows, vals, first, softer, top, z = _spike_wedge(
+        rock_props, traces, samples, dt, top, max_thickness, dz
+    )
+    row = _spike_synth_row(w, rows, vals, start, length, np.nanmax(top, axis=-1))
+    z_tuning = np.nanargmax(np.abs(row), axis=-1)
+    amp = np.abs(_spike_synth_row(w, rows, vals, start, length, first + 1))
+    return z_tuning, _tuning_onset(amp)
+
+
+WedgeBlock = namedtuple("WedgeBlock", ["start", "imp", "rc", "synth"])
+
+
+def wedge_blocks(
+    rock_props,
+    w,
+    block_traces=1024,
+    traces=101,
+    samples=240,
+    dt=0.001,
+    top=None,
+    max_thickness=None,
+    dz=None,
+    dtype=float,
+    method="auto",
+    spectrum=None,
+):
+    """
+    Assumes rock_props and the wedge geometry as for earthmodel and a wavelet w
+    as for tuningwedge
+    Builds the wedge block_traces traces at a time, so that models too large
+    for memory can be streamed, e.g. to write_npy and tuningcurve_blocks
+    Returns a generator of WedgeBlock(start, imp, rc, synth), the arrays of
+    earthmodel & tuningwedge for the traces start:start + block_traces
+    """
+    interfaces = wedge_interfaces(traces, samples, dt, top, max_thickness, dz)
+    AI, pairs = _layer_impedance(rock_props)
+    AI = AI.astype(dtype, copy=False)
+    for start in range(0, traces, block_traces):
+        block = interfaces[:, start : start + block_traces]
+        imp = np.take(AI, _layer_model(samples, block), axis=-1, mode="clip")
+        rc = dense_reflectivity(sparse_reflectivity(rock_props, block, samples, dtype))
+        synth = tuningwedge(rc, w, method, spectrum, dtype)
+        yield WedgeBlock(start, imp, rc, synth)
+
+
+def write_npy(blocks, path, traces, field="synth"):
+    """
+    Assumes blocks a stream of WedgeBlock, e.g. from wedge_blocks, and traces
+    the total number of traces
+    The field array of every block is written into a memory mapped .npy file
+    at path, created from the first block, and the block is passed on, so that
+    write_npy calls can be chained and the stream reduced at the same time
+    ex: tuningcurve_blocks(write_npy(wedge_blocks(...), "synth.npy", traces), ...)
+    The file is written under a temporary_path and only moved to path once the
+    stream is complete, a stream that is closed early or fails leaves no file
+    Returns a generator of the same WedgeBlocks
+    """
+    out = temporary = None
+    complete = False
+    try:
+        for block in blocks:
+            data = getattr(block, field)
+            if out is None:
+                temporary = temporary_path(path)
+                out = np.lib.format.open_memmap(
+                    temporary, "w+", data.dtype, data.shape[:-1] + (traces,)
+                )
+            out[..., block.start : block.start + data.shape[-1]] = data
+            yield block
+        complete = True
+    finally:
+        if out is not None:
+            out.flush()
+            del out
+        if temporary is not None:
+            if complete:
+                os.replace(temporary, path)
+            else:
+                os.remove(temporary)
+
+
+def temporary_path(path):
+    """
+    Returns a new path in the directory of path, with the same extension, to
+    write the file of path under until it is complete and can be moved into
+    place with os.replace, so that path never holds a partly written file
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    stem, ext = os.path.splitext(name)
+    return os.path.join(directory, ".{}-{}{}".format(stem, uuid.uuid4().hex, ext))
+
+
+def tuningcurve_blocks(
+    blocks,
+    rock_props,
+    traces=101,
+    samples=240,
+    dt=0.001,
+    top=None,
+    max_thickness=None,
+    dz=None,
+):
+    """
+    Assumes blocks a stream of WedgeBlock, e.g. from wedge_blocks, of the wedge
+    built from rock_props and the geometry
+    The tuning curve is reduced block by block, keeping only a few values per
+    trace.  The wedge top & thickness, and so the rows the amplitudes are read
+    from, come from the geometry (see analytictuningcurve) rather than from
+    the reflectivity, the rest is as tuningcurve(rc, synth) of the whole wedge
+    Returns: z, z_tuning, amp, z_apparent, z_onset
+    """
+    t0, thickness, rows, vals, first, softer, top, z = _spike_wedge(
+        rock_props, traces, samples, dt, top, max_thickness, dz
+    )
+    tuning_row = np.nanmax(top, axis=-1)
+    tuning = amp = synth_min = synth_max = None
+    for block in blocks:
+        synth = block.synth
+        if amp is None:
+            shape = synth.shape[:-2] + (traces,)
+            tuning = np.empty(shape, synth.dtype)
+            amp = np.empty(shape, synth.dtype)
+            synth_min = np.empty(shape, int)
+            synth_max = np.empty(shape, int)
+        cols = slice(block.start, block.start + synth.shape[-1])
+        tuning[..., cols] = np.abs(_row(synth, tuning_row))
+        amp[..., cols] = np.abs(_row(synth, first + 1))
+        synth_min[..., cols] = _nanarg(synth, np.argmin, np.nanargmin) + 1
+        synth_max[..., cols] = _nanarg(synth, np.argmax, np.nanargmax) + 1
+
+    z_tuning = np.nanargmax(tuning, axis=-1)
+    z_apparent = np.where(softer, synth_max - synth_min, synth_min - synth_max)
+    z_apparent[..., 0] = z_apparent[..., 1]
+    z_onset = _tuning_onset(amp)
+    return z, z_tuning, amp, z_apparent, z_onset
+
+
+def stream_wedge(path, rock_props, w, block_traces=1024, dtype=float, **geometry):
+    """
+    Assumes rock_props, w & geometry as for wedge_blocks
+    Streams the synthetic wedge into the .npy file path, block_traces traces at
+    a time, so memory use is set by the block size rather than the model size.
+    The result can be opened with np.load(path, mmap_mode="r")
+    Returns the tuning curve of the wedge, as tuningcurve_blocks
+    """
+    traces = geometry.get("traces", 101)
+    blocks = wedge_blocks(rock_props, w, block_traces, dtype=dtype, **geometry)
+    # closed at once if the reduction fails, which removes the partial file
+    with contextlib.closing(write_npy(blocks, path, traces)) as written:
+        return tuningcurve_blocks(written, rock_props, **geometry)
+
+
 def tuningVLine(amp):
     """
     Assumes amp a numpy array
@@ -153,20 +1392,20 @@ def tuningVLine(amp):
     return ampMin, ampMax
 
 
-def results_summary(inArr):
+def summary_values(rock_props, f_central, z_tuning_meas_TWT, z_onset_meas_TWT):
     """
-    Assumes inArr a list
-    Returns a string
+    Assumes rock_props a list of len 6 (or an array of shape (..., 6)), f_central
+    the Ricker central frequency in Hz and the measured tuning and onset
+    thicknesses in sec TWT, where any of them may be arrays that broadcast
+    Returns a dict of the measured and theoretical values of results_summary
     """
-    rock_props = inArr[0]
-    f_central = inArr[1]
-    z_tuning_meas_TWT = inArr[2] / 1000
-    z_onset_meas_TWT = inArr[3] / 1000
+    rock_props = np.asarray(rock_props, dtype=float)
+    f_central = np.asarray(f_central, dtype=float)
 
-    AI1 = rock_props[0] * rock_props[1] / 1000
-    AI2 = rock_props[2] * rock_props[3] / 1000
-    vp2 = rock_props[2]
-    AI3 = rock_props[4] * rock_props[5] / 1000
+    AI1 = rock_props[..., 0] * rock_props[..., 1] / 1000
+    AI2 = rock_props[..., 2] * rock_props[..., 3] / 1000
+    vp2 = rock_props[..., 2]
+    AI3 = rock_props[..., 4] * rock_props[..., 5] / 1000
 
     rc1 = (AI2 - AI1) / (AI2 + AI1)
     rc2 = (AI3 - AI2) / (AI3 + AI2)
@@ -197,6 +1436,48 @@ def results_summary(inArr):
     z_limit_simm_TWT = 1 / (2.31 * f_dom_simm)
     z_limit_simm_m = z_limit_simm_TWT / 2 * vp2
 
+    return {
+        "AI1": AI1,
+        "AI2": AI2,
+        "AI3": AI3,
+        "rc1": rc1,
+        "rc2": rc2,
+        "f_apparent": f_apparent,
+        "f_dom_simm": f_dom_simm,
+        "z_tuning_meas_TWT": z_tuning_meas_TWT,
+        "z_tuning_meas_m": z_tuning_meas_m,
+        "z_tuning_widess_TWT": z_tuning_widess_TWT,
+        "z_tuning_widess_m": z_tuning_widess_m,
+        "z_tuning_simm_TWT": z_tuning_simm_TWT,
+        "z_tuning_simm_m": z_tuning_simm_m,
+        "z_onset_meas_TWT": z_onset_meas_TWT,
+        "z_onset_meas_m": z_onset_meas_m,
+        "z_onset_widess_TWT": z_onset_widess_TWT,
+        "z_onset_widess_m": z_onset_widess_m,
+        "z_onset_simm_TWT": z_onset_simm_TWT,
+        "z_onset_simm_m": z_onset_simm_m,
+        "wlength_widess": wlength_widess,
+        "wlength_simm": wlength_simm,
+        "z_limit_widess_TWT": z_limit_widess_TWT,
+        "z_limit_widess_m": z_limit_widess_m,
+        "z_limit_simm_TWT": z_limit_simm_TWT,
+        "z_limit_simm_m": z_limit_simm_m,
+    }
+
+
+def results_summary(inArr):
+    """
+    Assumes inArr a list
+    Returns a string
+    """
+    rock_props = inArr[0]
+    f_central = inArr[1]
+    z_tuning_meas_TWT = inArr[2] / 1000
+    z_onset_meas_TWT = inArr[3] / 1000
+
+    values = summary_values(rock_props, f_central, z_tuning_meas_TWT, z_onset_meas_TWT)
+    v = {key: float(value) for key, value in values.items()}
+
     summary = """Summary of Measured and Theoretical Values\n
 Layer 1 Acoustic Impedance: {} (m/s).(g/cm3)\n
 Layer 2 Acoustic Impedance: {} (m/s).(g/cm3)\n
@@ -217,31 +1498,223 @@ Wavelength (F_dom): {} m\n
 Theoretical limit of resolution (F_apparent / 8, Widess, 1973): {} sec TWT, {} m\n
 Theoretical limit of resolution (1/2.31*Fdom, Simm & Bacon, 2014): {} sec TWT, {}m
 	""".format(
-        round(AI1, 2),
-        round(AI2, 2),
-        round(AI3, 2),
-        round(rc1, 4),
-        round(rc2, 4),
+        round(v["AI1"], 2),
+        round(v["AI2"], 2),
+        round(v["AI3"], 2),
+        round(v["rc1"], 4),
+        round(v["rc2"], 4),
         f_central,
-        round(f_apparent, 2),
-        f_dom_simm,
-        round(z_tuning_meas_TWT, 4),
-        round(z_tuning_meas_m, 1),
-        round(z_tuning_widess_TWT, 4),
-        round(z_tuning_widess_m, 1),
-        round(z_tuning_simm_TWT, 4),
-        round(z_tuning_simm_m, 1),
-        round(z_onset_meas_TWT, 4),
-        round(z_onset_meas_m, 1),
-        round(z_onset_widess_TWT, 4),
-        round(z_onset_widess_m, 1),
-        round(z_onset_simm_TWT, 4),
-        round(z_onset_simm_m, 1),
-        round(wlength_widess, 2),
-        round(wlength_simm, 2),
-        round(z_limit_widess_TWT, 4),
-        round(z_limit_widess_m, 1),
-        round(z_limit_simm_TWT, 4),
-        round(z_limit_simm_m, 1),
+        round(v["f_apparent"], 2),
+        v["f_dom_simm"],
+        round(v["z_tuning_meas_TWT"], 4),
+        round(v["z_tuning_meas_m"], 1),
+        round(v["z_tuning_widess_TWT"], 4),
+        round(v["z_tuning_widess_m"], 1),
+        round(v["z_tuning_simm_TWT"], 4),
+        round(v["z_tuning_simm_m"], 1),
+        round(v["z_onset_meas_TWT"], 4),
+        round(v["z_onset_meas_m"], 1),
+        round(v["z_onset_widess_TWT"], 4),
+        round(v["z_onset_widess_m"], 1),
+        round(v["z_onset_simm_TWT"], 4),
+        round(v["z_onset_simm_m"], 1),
+        round(v["wlength_widess"], 2),
+        round(v["wlength_simm"], 2),
+        round(v["z_limit_widess_TWT"], 4),
+        round(v["z_limit_widess_m"], 1),
+        round(v["z_limit_simm_TWT"], 4),
+        round(v["z_limit_simm_m"], 1),
     )
     return summary
+
+
+# Parameters of a sweep scenario, in the order of the rows of sweep_grid
+SWEEP_PARAMS = ("vp1", "rho1", "vp2", "rho2", "vp3", "rho3", "f")
+
+# Labeled columns of a tuningsweep result, the scenario parameters followed by
+# the values of summary_values (thicknesses in sec TWT and m)
+SWEEP_DTYPE = np.dtype(
+    [(name, float) for name in SWEEP_PARAMS]
+    + [
+        (name, float)
+        for name in (
+            "AI1",
+            "AI2",
+            "AI3",
+            "rc1",
+            "rc2",
+            "f_apparent",
+            "f_dom_simm",
+            "z_tuning_meas_TWT",
+            "z_tuning_meas_m",
+            "z_tuning_widess_TWT",
+            "z_tuning_widess_m",
+            "z_tuning_simm_TWT",
+            "z_tuning_simm_m",
+            "z_onset_meas_TWT",
+            "z_onset_meas_m",
+            "z_onset_widess_TWT",
+            "z_onset_widess_m",
+            "z_onset_simm_TWT",
+            "z_onset_simm_m",
+            "wlength_widess",
+            "wlength_simm",
+            "z_limit_widess_TWT",
+            "z_limit_widess_m",
+            "z_limit_simm_TWT",
+            "z_limit_simm_m",
+        )
+    ]
+)
+
+
+# sweep_scenarios takes the wavelets of up to this many distinct frequencies
+# from the wavelet cache
+_SWEEP_CACHED_WAVELETS = 64
+
+
+def sweep_grid(rock_props, f):
+    """
+    Assumes rock_props a list of len 6 in Vp-Density pairs and f a Ricker
+    frequency, where any of the seven entries may be a 1D sequence of values
+    Returns params, an (n_scenarios, 7) array with one row per combination of
+    the sequences (columns in SWEEP_PARAMS order), and the shape of the grid,
+    which has one axis per sequence entry in that same order
+    """
+    entries = list(rock_props) + [f]
+    axes = [np.atleast_1d(np.asarray(entry, dtype=float)) for entry in entries]
+    shape = tuple(len(axis) for axis, entry in zip(axes, entries) if np.ndim(entry))
+    grid = np.meshgrid(*axes, indexing="ij")
+    params = np.stack([g.ravel() for g in grid], axis=-1)
+    return params, shape
+
+
+def _buffer(buffers, name, shape, dtype):
+    """Returns a scratch array of shape & dtype kept in the dict buffers, the
+    leading rows of a larger one if it is already there
+    """
+    buf = buffers.get(name)
+    fits = buf is not None and buf.dtype == dtype and buf.shape[1:] == shape[1:]
+    if not fits or len(buf) < shape[0]:
+        buf = buffers[name] = np.empty(shape, dtype)
+    return buf[: shape[0]]
+
+
+def sweep_scenarios(
+    params,
+    duration=0.100,
+    dt=0.001,
+    out=None,
+    method="synthetic",
+    dtype=np.float32,
+    buffers=None,
+    wavelet_dt=None,
+    **geometry
+):
+    """
+    Assumes params an (n_scenarios, 7) array as returned by sweep_grid and
+    geometry any of the earthmodel wedge geometry keywords, where the wavelets
+    are sampled at wavelet_dt, by default the dt of the model
+    The tuning curves of all scenarios are computed as stacked arrays, with one
+    Ricker wavelet per distinct frequency (cached unless there are many of
+    them), either from the full wedge models
+    and synthetics (method="synthetic") or with analytictuningthickness
+    (method="analytic")
+    The synthetic method computes in dtype, by default float32 for half the
+    memory of float64 (see convolve_rc for the precision), and keeps its
+    reflectivity & synthetic arrays in the dict buffers, if given, so that
+    repeated calls reuse them rather than allocating new ones
+    Returns a structured array of SWEEP_DTYPE, written into out if given
+    """
+    params = np.asarray(params, dtype=float)
+    if out is None:
+        out = np.empty(len(params), dtype=SWEEP_DTYPE)
+    rock_props, f = params[:, :6], params[:, 6]
+
+    wavelet_dt = dt if wavelet_dt is None else wavelet_dt
+    freqs, which = np.unique(f, return_inverse=True)
+    if len(freqs) > _SWEEP_CACHED_WAVELETS:
+        # e.g. random frequencies, built in one pass rather than filling the
+        # wavelet cache, equal to the cached wavelets within rounding
+        w = ricker(duration, wavelet_dt, freqs[:, None])
+    else:
+        w = np.stack([wavelet(duration, wavelet_dt, fk) for fk in freqs])
+    if method == "synthetic":
+        # only the reflectivity is needed, not the impedance model, and the
+        # synthetic is built from its two spikes per trace
+        buffers = {} if buffers is None else buffers
+        traces = geometry.get("traces", 101)
+        samples = geometry.get("samples", 240)
+        n, m = samples - 1, w.shape[-1]
+        sparse = sparse_reflectivity(
+            rock_props, wedge_interfaces(dt=dt, **geometry), samples, dtype
+        )
+        rc = dense_reflectivity(
+            sparse, _buffer(buffers, "rc", (len(params), n, traces), dtype)
+        )
+        synth = tuningwedge(
+            sparse,
+            w[which],
+            dtype=dtype,
+            out=_buffer(buffers, "synth", (len(params), max(n, m), traces), dtype),
+        )
+        z, z_tuning, amp, z_apparent, z_onset = tuningcurve(rc, synth)
+    elif method == "analytic":
+        z_tuning, z_onset = analytictuningthickness(
+            rock_props, w[which], dt=dt, **geometry
+        )
+    else:
+        raise ValueError("Unknown sweep method: {}".format(method))
+
+    # tuningcurve reports trace indices, convert them to thickness in TWT
+    traces = geometry.get("traces", 101)
+    thickness = wedge_thickness(
+        traces, dt, geometry.get("max_thickness"), geometry.get("dz")
+    )
+    values = summary_values(
+        rock_props, f, thickness[z_tuning] * dt, thickness[z_onset] * dt
+    )
+
+    for i, name in enumerate(SWEEP_PARAMS):
+        out[name] = params[:, i]
+    for name, value in values.items():
+        out[name] = value
+    return out
+
+
+def tuningsweep(
+    rock_props,
+    f=25,
+    duration=0.100,
+    dt=0.001,
+    chunk_size=32,
+    method="synthetic",
+    dtype=np.float32,
+    **geometry
+):
+    """
+    Assumes rock_props a list of len 6 in Vp-Density pairs and f a Ricker
+    frequency, where any entry may be a 1D sequence of values to sweep over,
+    ex: tuningsweep([3000, 2315, [2000, 2200, 2400], 2150, 3000, 2315], [20, 30])
+    Scenarios are computed chunk_size at a time in buffers that are reused for
+    every chunk (about 200 kB per scenario in float32 for the default
+    geometry) so memory stays bounded for large grids, see sweep_scenarios for
+    the method & dtype options
+    Returns a structured array of SWEEP_DTYPE with one axis per swept entry
+    """
+    params, shape = sweep_grid(rock_props, f)
+    result = np.empty(len(params), dtype=SWEEP_DTYPE)
+    buffers = {}
+    for start in range(0, len(params), chunk_size):
+        stop = start + chunk_size
+        sweep_scenarios(
+            params[start:stop],
+            duration,
+            dt,
+            result[start:stop],
+            method,
+            dtype,
+            buffers,
+            **geometry
+        )
+    return result.reshape(shape)
@@ -0,0 +1,518 @@
+#!/usr/bin/env python
+
+# Headless command line entry point to the wedgebuilder calculations
+# This module only needs numpy, matplotlib is imported when a plot is asked for
+# and Qt is never imported, so it runs on machines without a display
+#
+# usage:
+#   python -m wedgecli compute --rock-props 3000 2315 2200 2150 3000 2315 -f 25
+#   python -m wedgecli compute --input scenarios.csv --npz results.npz
+#   python -m wedgecli compute --rock-props 3000 2315 2200 2150 3000 2315 \
+#       --vs 1500 1000 1500 --angles 0 10 20 30 40
+#   python -m wedgecli compute --rock-props 3000 2315 2200 2150 3000 2315 \
+#       --wavelets bank.json
+#   python -m wedgecli sweep spec.json --workers 8 > table.csv
+#   python -m wedgecli montecarlo uncertainty.json -n 1000000 --seed 1
+#
+# Results are looked up in the resultcache directory of --cache or of the
+# PYSEISTUNED_CACHE environment variable, if either is given
+
+import argparse
+import csv
+import io
+import json
+import sys
+
+import numpy as np
+import resultcache
+import segy
+import wedgebuilder as wb
+from pipeline import WedgePipeline
+from profiling import Profiler
+
+# the default angles of an AVO gather, in degrees
+AVO_ANGLES = (0, 10, 20, 30, 40)
+
+
+def read_scenarios(path):
+    """
+    Assumes path a JSON file holding one scenario or a list of them, or a CSV
+    file with one scenario per row, where a scenario holds vp1, rho1, vp2, rho2,
+    vp3, rho3 (or a rock_props list) and optionally f, duration & dt, and for
+    an AVO gather vs1, vs2, vs3 (or a vs list) and in JSON an angles list
+    Returns a list of scenario dicts
+    """
+    with open(path) as fh:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(fh))
+        else:
+            rows = json.load(fh)
+    if isinstance(rows, dict):
+        rows = [rows]
+    scenarios = []
+    for row in rows:
+        row = {key.strip(): value for key, value in row.items()}
+        if "rock_props" not in row:
+            row["rock_props"] = [row.pop(name) for name in wb.SWEEP_PARAMS[:6]]
+        scenario = {
+            "rock_props": [float(value) for value in row["rock_props"]],
+            "f": float(row.get("f", 25)),
+            "duration": float(row.get("duration", 0.100)),
+            "dt": float(row.get("dt", 0.001)),
+        }
+        if "vs" not in row and "vs1" in row:
+            row["vs"] = [row.pop(name) for name in ("vs1", "vs2", "vs3")]
+        if "vs" in row:
+            scenario["vs"] = [float(value) for value in row["vs"]]
+        if "angles" in row:
+            scenario["angles"] = [float(value) for value in row["angles"]]
+        scenarios.append(scenario)
+    return scenarios
+
+
+def compute(
+    rock_props,
+    f=25,
+    duration=0.100,
+    dt=0.001,
+    profiler=None,
+    cache=None,
+    vs=None,
+    angles=AVO_ANGLES,
+    avo_method="aki-richards",
+    wavelets=None,
+):
+    """
+    Runs the wedgebuilder calculation of one scenario, timing every stage with
+    profiler (a profiling.Profiler) if given, and reusing the results stored in
+    cache (a resultcache.ResultCache) if given.  With the Vs of the layers, the
+    angle gather of the wedge at angles (degrees) is computed as well, and with
+    a wavelets.wavelet_bank spec the wedge of every wavelet of the bank
+    Returns a dict of the wavelet, model, synthetic and tuning curve arrays,
+    plus avo_rc, avo_synth, avo_z_tuning & avo_z_onset with an angles axis and
+    bank_names, bank_w, bank_synth, bank_z_tuning & bank_z_onset with a bank axis
+    """
+    pipeline = WedgePipeline(rock_props, (duration, dt, f), profiler, cache, dt=dt)
+    imp, rc = pipeline.get("earthmodel")
+    wavelet = pipeline.get("wavelet")
+    z, z_tuning, amp, z_apparent, z_onset = pipeline.get("tuningcurve")
+    results = {
+        "t": wavelet["t"],
+        "w": wavelet["w"],
+        "imp": imp,
+        "rc": rc,
+        "synth": pipeline.get("synth"),
+        "z": z,
+        "amp": amp,
+        "z_tuning": z_tuning,
+        "z_apparent": z_apparent,
+        "z_onset": z_onset,
+    }
+    if vs is not None:
+        results.update(avo(rock_props, vs, angles, wavelet["w"], avo_method, dt))
+    if wavelets is not None:
+        results.update(bank(wavelets, rc, duration, dt))
+    return results
+
+
+def avo(rock_props, vs, angles, w, method="aki-richards", dt=0.001):
+    """Returns the angle gather results of compute"""
+    elastic = wb.elastic_props(rock_props, vs)
+    rc, synth = wb.avo_tuningwedge(elastic, angles, w, method, dt=dt)
+    z, z_tuning, amp, z_apparent, z_onset = wb.tuningcurve(rc, synth)
+    return {
+        "angles": np.asarray(angles, dtype=float),
+        "avo_rc": rc,
+        "avo_synth": synth,
+        "avo_amp": amp,
+        "avo_z_tuning": z_tuning,
+        "avo_z_onset": z_onset,
+    }
+
+
+def bank(spec, rc, duration=0.100, dt=0.001):
+    """Returns the wavelet bank results of compute"""
+    import wavelets
+
+    wavelet_bank = wavelets.wavelet_bank(spec, duration, dt)
+    synth = wavelet_bank.tuningwedge(rc)
+    z, z_tuning, amp, z_apparent, z_onset = wavelet_bank.tuningcurve(rc, synth)
+    return {
+        "bank_names": np.array(wavelet_bank.names),
+        "bank_w": wavelet_bank.w,
+        "bank_synth": synth,
+        "bank_amp": amp,
+        "bank_z_tuning": z_tuning,
+        "bank_z_onset": z_onset,
+    }
+
+
+def scenario_record(scenario, results):
+    """Returns the JSON serializable inputs and summary values of a scenario"""
+    dt = scenario["dt"]
+    values = wb.summary_values(
+        scenario["rock_props"],
+        scenario["f"],
+        results["z_tuning"] * dt,
+        results["z_onset"] * dt,
+    )
+    record = dict(scenario)
+    record["z_tuning"] = int(results["z_tuning"])
+    record["z_onset"] = int(results["z_onset"])
+    record.update((key, float(value)) for key, value in values.items())
+    if "avo_z_tuning" in results:
+        record["angles"] = results["angles"].tolist()
+        for name in ("z_tuning", "z_onset"):
+            trace = results["avo_" + name]
+            record["avo_" + name] = trace.tolist()
+            record["avo_{}_TWT".format(name)] = (trace * dt).tolist()
+    if "bank_z_tuning" in results:
+        record["wavelets"] = results["bank_names"].tolist()
+        for name in ("z_tuning", "z_onset"):
+            values = results["bank_" + name]
+            record["bank_" + name] = values.tolist()
+            record["bank_{}_TWT".format(name)] = (values * dt).tolist()
+    return record
+
+
+def plot(path, results):
+    """Saves the wavelet, wedge and tuning curve of a scenario as an image"""
+    import wedgeplots
+
+    fig = wedgeplots.results_figure(
+        results["t"],
+        results["w"],
+        results["imp"],
+        results["rc"],
+        results["synth"],
+        results["z"],
+        results["amp"],
+        results["z_tuning"],
+        results["z_apparent"],
+        results["z_onset"],
+    )
+    fig.savefig(path)
+
+
+def numbered(path, i, n):
+    """Returns path with _i before the extension when there are n > 1 files"""
+    if n == 1:
+        return path
+    stem, dot, ext = path.rpartition(".")
+    return "{}_{}.{}".format(stem, i, ext) if dot else "{}_{}".format(path, i)
+
+
+def save_segy(path, results, scenario, field="synth"):
+    """
+    Saves the synthetic (or impedance model, field="imp") of a scenario as
+    SEG-Y, with the inputs of the scenario in the textual header
+    """
+    data = results[field]
+    dt = scenario["dt"]
+    thickness = wb.wedge_thickness(data.shape[-1], dt) * dt
+    description = segy.wedge_description(
+        "Tuning wedge synthetic" if field == "synth" else "Tuning wedge impedance",
+        scenario["rock_props"],
+        (scenario["duration"], dt, scenario["f"]),
+    )
+    segy.write_segy(path, data, dt, thickness, description)
+
+
+def tuningsweep(rock_props, workers=None, cache=None, **kwargs):
+    """
+    Runs wedgebuilder.tuningsweep, on workers processes if more than one, and
+    reuses the table stored in cache (a resultcache.ResultCache) if given
+    Returns the structured array of wedgebuilder.SWEEP_DTYPE
+    """
+    if cache is not None:
+        key = cache.key({"sweep": {"rock_props": rock_props, **kwargs}})
+        arrays = cache.get(key)
+        if arrays is not None:
+            return arrays["sweep"]
+    if workers and workers > 1:
+        import wedgeparallel
+
+        table = wedgeparallel.parallel_tuningsweep(
+            rock_props, workers=workers, **kwargs
+        )
+    else:
+        table = wb.tuningsweep(rock_props, **kwargs)
+    if cache is not None:
+        cache.put(key, {"sweep": table})
+    return table
+
+
+def open_cache(args):
+    """Returns the ResultCache the --cache & --no-cache options ask for, or None"""
+    if args.no_cache:
+        return None
+    if args.cache:
+        return resultcache.ResultCache(args.cache)
+    return resultcache.default_cache()
+
+
+def structured_csv(table):
+    """Returns a structured numpy array as CSV text with a header row"""
+    table = table.reshape(-1)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(table.dtype.names)
+    writer.writerows(row.tolist() for row in table)
+    return out.getvalue()
+
+
+def cmd_compute(args):
+    if args.input:
+        scenarios = read_scenarios(args.input)
+    elif args.rock_props:
+        scenarios = [
+            {
+                "rock_props": args.rock_props,
+                "f": args.f,
+                "duration": args.length,
+                "dt": args.dt,
+            }
+        ]
+    else:
+        raise SystemExit("compute needs --rock-props or --input")
+    if args.wavelets:
+        import wavelets
+
+        wavelet_spec = wavelets.read_spec(args.wavelets)
+    for scenario in scenarios:
+        if args.vs:
+            scenario["vs"] = args.vs
+        if "vs" in scenario and args.angles:
+            scenario["angles"] = args.angles
+        if "vs" in scenario:
+            scenario["avo_method"] = args.avo_method
+        if args.wavelets:
+            scenario["wavelets"] = wavelet_spec
+
+    profiler = Profiler(trace_memory=True) if args.profile else None
+    cache = open_cache(args)
+    records, arrays = [], {}
+    for i, scenario in enumerate(scenarios):
+        results = compute(profiler=profiler, cache=cache, **scenario)
+        records.append(scenario_record(scenario, results))
+        if args.summary:
+            print(
+                wb.results_summary(
+                    [
+                        scenario["rock_props"],
+                        scenario["f"],
+                        results["z_tuning"] * scenario["dt"] * 1000,
+                        results["z_onset"] * scenario["dt"] * 1000,
+                    ]
+                )
+            )
+        if args.npz:
+            prefix = "" if len(scenarios) == 1 else "{}_".format(i)
+            arrays.update((prefix + key, value) for key, value in results.items())
+        if args.plot:
+            plot(numbered(args.plot, i, len(scenarios)), results)
+        if args.segy:
+            path = numbered(args.segy, i, len(scenarios))
+            save_segy(path, results, scenario)
+        if args.segy_model:
+            path = numbered(args.segy_model, i, len(scenarios))
+            save_segy(path, results, scenario, "imp")
+
+    if args.npz:
+        np.savez_compressed(args.npz, **arrays)
+    if profiler is not None:
+        print(profiler.report(), file=sys.stderr)
+    if not args.summary:
+        json.dump(records[0] if len(records) == 1 else records, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+def cmd_sweep(args):
+    with open(args.spec) as fh:
+        spec = json.load(fh)
+    kwargs = {
+        "f": spec.get("f", 25),
+        "duration": spec.get("duration", 0.100),
+        "dt": spec.get("dt", 0.001),
+        "method": args.method or spec.get("method", "synthetic"),
+    }
+    kwargs.update(spec.get("geometry", {}))
+    table = tuningsweep(
+        spec["rock_props"], workers=args.workers, cache=open_cache(args), **kwargs
+    )
+
+    if args.npz:
+        np.savez_compressed(args.npz, sweep=table)
+    else:
+        sys.stdout.write(structured_csv(table))
+
+
+def add_cache_arguments(parser):
+    parser.add_argument(
+        "--cache",
+        metavar="DIR",
+        help="reuse the results stored in this cache directory "
+        "(default $PYSEISTUNED_CACHE)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="compute without the result cache"
+    )
+
+
+def cmd_montecarlo(args):
+    import montecarlo
+
+    with open(args.spec) as fh:
+        spec = json.load(fh)
+    stats = montecarlo.montecarlo(
+        spec["rock_props"],
+        spec.get("f", 25),
+        args.n,
+        args.seed if args.seed is not None else spec.get("seed"),
+        spec.get("duration", 0.100),
+        spec.get("dt", 0.001),
+        args.batch_size,
+        args.method or spec.get("method", "analytic"),
+        workers=args.workers,
+        **spec.get("geometry", {})
+    )
+    if args.summary:
+        print(montecarlo.montecarlo_summary(stats))
+        return
+    record = {
+        "realizations": stats.realizations,
+        "rejected": stats.rejected,
+        "seed": stats.seed,
+        "statistics": {name: stats.describe(name) for name in stats.names},
+    }
+    json.dump(record, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="wedgecli", description="Headless seismic tuning wedge calculations"
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    compute_parser = commands.add_parser(
+        "compute", help="tuning wedge and tuning curve of one or more scenarios"
+    )
+    compute_parser.add_argument(
+        "--rock-props",
+        nargs=6,
+        type=float,
+        metavar=("VP1", "RHO1", "VP2", "RHO2", "VP3", "RHO3"),
+        help="Vp (m/s) & density of the three layers",
+    )
+    compute_parser.add_argument(
+        "--input", help="JSON or CSV file of scenarios instead of --rock-props"
+    )
+    compute_parser.add_argument(
+        "-f", type=float, default=25, help="Ricker frequency (Hz)"
+    )
+    compute_parser.add_argument(
+        "--length", type=float, default=0.100, help="wavelet length (s)"
+    )
+    compute_parser.add_argument("--dt", type=float, default=0.001, help="dt (s)")
+    compute_parser.add_argument(
+        "--vs",
+        nargs=3,
+        type=float,
+        metavar=("VS1", "VS2", "VS3"),
+        help="Vs (m/s) of the three layers, for an AVO angle gather",
+    )
+    compute_parser.add_argument(
+        "--angles",
+        nargs="+",
+        type=float,
+        help="incidence angles (degrees) of the AVO gather, default 0 to 40 by 10",
+    )
+    compute_parser.add_argument(
+        "--avo-method",
+        choices=wb.AVO_METHODS,
+        default="aki-richards",
+        help="angle dependent reflectivity",
+    )
+    compute_parser.add_argument(
+        "--wavelets",
+        metavar="SPEC",
+        help="JSON list of wavelets to convolve the wedge with as well, "
+        'e.g. [{"ricker": [[20, 30]]}, {"ormsby": [5, 10, 40, 50]}, '
+        '{"file": "extracted.csv"}]',
+    )
+    compute_parser.add_argument("--npz", help="save the result arrays to this file")
+    compute_parser.add_argument(
+        "--plot", help="save the wavelet, wedge & tuning curve to this image file"
+    )
+    compute_parser.add_argument(
+        "--segy", help="save the synthetic wedge to this SEG-Y file"
+    )
+    compute_parser.add_argument(
+        "--segy-model", help="save the impedance model to this SEG-Y file"
+    )
+    compute_parser.add_argument(
+        "--summary", action="store_true", help="print the text summary, not JSON"
+    )
+    compute_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the time & memory of every stage to stderr",
+    )
+    add_cache_arguments(compute_parser)
+    compute_parser.set_defaults(func=cmd_compute)
+
+    sweep_parser = commands.add_parser(
+        "sweep", help="tuning table over a grid of rock properties & frequencies"
+    )
+    sweep_parser.add_argument(
+        "spec",
+        help="JSON file with rock_props and f, where entries may be lists, and "
+        "optionally duration, dt, method and geometry",
+    )
+    sweep_parser.add_argument(
+        "--method", choices=("synthetic", "analytic"), help="tuningsweep method"
+    )
+    sweep_parser.add_argument("--workers", type=int, help="run on this many processes")
+    sweep_parser.add_argument("--npz", help="save the table to this file, not CSV")
+    add_cache_arguments(sweep_parser)
+    sweep_parser.set_defaults(func=cmd_sweep)
+
+    montecarlo_parser = commands.add_parser(
+        "montecarlo",
+        help="percentiles of the tuning thickness under rock property uncertainty",
+    )
+    montecarlo_parser.add_argument(
+        "spec",
+        help="JSON file with rock_props and f, where entries may be distributions "
+        'such as {"normal": [mean, std]}, and optionally duration, dt, method, '
+        "seed and geometry",
+    )
+    montecarlo_parser.add_argument(
+        "-n", type=int, default=100000, help="number of realizations"
+    )
+    montecarlo_parser.add_argument("--seed", type=int, help="random seed")
+    montecarlo_parser.add_argument(
+        "--batch-size", type=int, default=4096, help="realizations per batch"
+    )
+    montecarlo_parser.add_argument(
+        "--method", choices=("synthetic", "analytic"), help="tuningsweep method"
+    )
+    montecarlo_parser.add_argument(
+        "--workers", type=int, help="run on this many processes"
+    )
+    montecarlo_parser.add_argument(
+        "--summary", action="store_true", help="print the percentiles as text"
+    )
+    montecarlo_parser.set_defaults(func=cmd_montecarlo)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
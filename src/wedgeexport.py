@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+# Writes the results of a wedge calculation as a bundle of files: the figures
+# (raster at a chosen dpi, or vector PDF/SVG), the arrays as a compressed .npz,
+# the summary as JSON and the synthetic & impedance model as SEG-Y
+# The bundle is written one file at a time, so a caller running it in the
+# background can report progress and cancel between files.  Only numpy is
+# needed, matplotlib is imported when figures are written
+
+import json
+import os
+
+import numpy as np
+import segy
+import wedgebuilder as wb
+
+FIGURE_FORMATS = ("png", "tiff", "jpeg", "pdf", "svg")
+VECTOR_FORMATS = ("pdf", "svg")
+
+# the .npz keys of the result arrays, named as in PySeisTuned
+ARRAY_NAMES = {
+    "imp": "earthmod",
+    "rc": "refCoef",
+    "w": "w",
+    "t": "waveletAxis",
+    "synth": "synth",
+    "z": "z",
+    "amp": "amp",
+    "z_apparent": "z_apparent",
+    "z_tuning": "z_tuning",
+    "z_onset": "z_onset",
+}
+
+
+def summary_record(results, rock_props, wavelet_parms, dt=0.001):
+    """
+    Assumes results a dict of the tuning curve outputs (and optionally the
+    text summary under "summary"), rock_props a list of len 6 and wavelet_parms
+    the (duration, dt, f) of the Ricker wavelet, dt the model sample interval
+    Returns a JSON serializable dict of the inputs and the summary values
+    """
+    duration, wavelet_dt, f = wavelet_parms
+    values = wb.summary_values(
+        rock_props, f, results["z_tuning"] * dt, results["z_onset"] * dt
+    )
+    record = {
+        "rock_props": [float(x) for x in rock_props],
+        "wavelet": {"f": f, "duration": duration, "dt": wavelet_dt},
+        "z_tuning": int(results["z_tuning"]),
+        "z_onset": int(results["z_onset"]),
+    }
+    record.update((key, float(value)) for key, value in values.items())
+    if "summary" in results:
+        record["summary"] = results["summary"]
+    return record
+
+
+def bundle_tasks(
+    base,
+    results,
+    rock_props,
+    wavelet_parms,
+    dt=0.001,
+    figures=True,
+    arrays=True,
+    summary=True,
+    segy_files=True,
+    fig_format="png",
+    dpi=300,
+):
+    """
+    Assumes base a path prefix, e.g. /data/wedge, results a dict of t, w, imp,
+    rc, synth, z, amp, z_tuning, z_apparent & z_onset (and optionally the text
+    summary), and rock_props, wavelet_parms & dt as for summary_record
+    Returns the list of (path, write) pairs of the files of the bundle, where
+    write(target) writes the file of path at target
+    """
+    if fig_format not in FIGURE_FORMATS:
+        raise ValueError("Unknown figure format: {}".format(fig_format))
+    tasks = []
+
+    def add(suffix, write):
+        tasks.append((base + suffix, write))
+
+    if figures:
+
+        def save(make, *args):
+            def write(path):
+                # imported here so that bundles without figures need no matplotlib
+                import wedgeplots
+
+                getattr(wedgeplots, make)(*args).savefig(path, dpi=dpi)
+
+            return write
+
+        r = results
+        add("_ricker." + fig_format, save("ricker_figure", r["t"], r["w"]))
+        add(
+            "_wedge." + fig_format,
+            save("wedge_figure", r["imp"], r["synth"], r["rc"]),
+        )
+        add(
+            "_tuningcurve." + fig_format,
+            save(
+                "tuningcurve_figure",
+                r["z"],
+                r["amp"],
+                r["z_tuning"],
+                r["z_apparent"],
+                r["z_onset"],
+            ),
+        )
+    if arrays:
+        add(
+            ".npz",
+            lambda path: np.savez_compressed(
+                path, **{name: results[key] for key, name in ARRAY_NAMES.items()}
+            ),
+        )
+    if summary:
+
+        def write_summary(path):
+            record = summary_record(results, rock_props, wavelet_parms, dt)
+            with open(path, "w") as fh:
+                json.dump(record, fh, indent=2)
+
+        add("_summary.json", write_summary)
+    if segy_files:
+        thickness = wb.wedge_thickness(results["synth"].shape[-1], dt) * dt
+
+        def save_segy(field, content):
+            def write(path):
+                description = segy.wedge_description(content, rock_props, wavelet_parms)
+                segy.write_segy(path, results[field], dt, thickness, description)
+
+            return write
+
+        add("_synthetic.sgy", save_segy("synth", "Tuning wedge synthetic"))
+        add("_impedance.sgy", save_segy("imp", "Tuning wedge impedance"))
+    return tasks
+
+
+def export_bundle(base, results, progress=None, cancelled=None, **options):
+    """
+    Assumes the inputs of bundle_tasks, plus optionally progress, called as
+    progress(done, total, path) before every file and once when all are done,
+    and cancelled, checked before every file
+    Every file is written under a wedgebuilder.temporary_path, and the files
+    are only moved to their paths once all of them are written: when
+    cancelled() returns True or a write fails, the temporary files are removed
+    and the files at the paths of the bundle are left as they were
+    Returns the list of paths written, empty when cancelled
+    """
+    tasks = bundle_tasks(base, results, **options)
+    temporary = []
+    try:
+        for done, (path, write) in enumerate(tasks):
+            if cancelled is not None and cancelled():
+                return []
+            if progress is not None:
+                progress(done, len(tasks), path)
+            temporary.append(wb.temporary_path(path))
+            write(temporary[-1])
+        for (path, write), target in zip(tasks, temporary):
+            os.replace(target, path)
+        temporary = []
+    finally:
+        for target in temporary:
+            if os.path.exists(target):
+                os.remove(target)
+    if progress is not None:
+        progress(len(tasks), len(tasks), "")
+    return [path for path, write in tasks]
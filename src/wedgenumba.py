@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+# The compiled kernels of the "numba" backend of wedgebuilder
+# This module imports numba, so wedgebuilder imports it only when the backend
+# is first used.  The parallel kernels are compiled on their first call and
+# cached next to this file by numba
+
+import numba
+
+
+@numba.njit(parallel=True, cache=True)
+def direct(rc, w, start, out):
+    # the taps are added in the order of _convolve_direct, row by row
+    n, m = rc.shape[0], w.shape[0]
+    length, traces = out.shape
+    for row in numba.prange(length):
+        for j in range(traces):
+            out[row, j] = 0
+        for k in range(m):
+            i = row + start - k
+            if 0 <= i < n:
+                for j in range(traces):
+                    out[row, j] += w[k] * rc[i, j]
+    return out
+
+
+@numba.njit(parallel=True, cache=True)
+def argextrema(arr, lo, hi):
+    # first minimum & maximum of every trace skipping NaNs, -1 if all NaN
+    batch, n, traces = arr.shape
+    for b in numba.prange(batch):
+        for j in range(traces):
+            lo[b, j] = -1
+            hi[b, j] = -1
+        for i in range(n):
+            for j in range(traces):
+                x = arr[b, i, j]
+                if x != x:
+                    continue
+                if lo[b, j] < 0 or x < arr[b, lo[b, j], j]:
+                    lo[b, j] = i
+                if hi[b, j] < 0 or x > arr[b, hi[b, j], j]:
+                    hi[b, j] = i
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+# Multi-core execution of wedgebuilder parameter sweeps
+# Chunks of scenarios are spread over a process pool and every worker writes its
+# results straight into a shared memory array, so only the scenario parameters
+# travel to the workers and nothing is pickled back to the parent process
+# multiprocessing.shared_memory needs Python 3.8, on older versions the array
+# is a memory-mapped temporary file instead
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import wedgebuilder as wb
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+
+def _create(n_scenarios):
+    """Returns the name of a new shared block for n_scenarios results and the
+    handle to release it with
+    """
+    size = max(n_scenarios * wb.SWEEP_DTYPE.itemsize, 1)
+    if shared_memory is None:
+        fd, name = tempfile.mkstemp(prefix="wedgesweep", suffix=".dat")
+        with os.fdopen(fd, "wb") as fh:
+            fh.truncate(size)
+        return name, name
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    return shm.name, shm
+
+
+def _attach(name, n_scenarios):
+    """Returns the handle and the result array of the shared block name"""
+    if shared_memory is None:
+        return None, np.memmap(name, wb.SWEEP_DTYPE, "r+", shape=(n_scenarios,))
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(n_scenarios, dtype=wb.SWEEP_DTYPE, buffer=shm.buf)
+
+
+def _release(handle, unlink=False):
+    """Closes a shared block, and with unlink frees it"""
+    if isinstance(handle, str):
+        if unlink:
+            os.remove(handle)
+    elif handle is not None:
+        handle.close()
+        if unlink:
+            handle.unlink()
+
+
+def _sweep_chunk(
+    name, n_scenarios, start, params, duration, dt, batch, method, dtype, geometry
+):
+    """Computes the scenarios params into rows start: of the shared result array
+    Returns the number of scenarios computed
+    """
+    # pool workers share the resource tracker of the parent, which owns the
+    # block and unlinks it once the sweep is done
+    shm, result = _attach(name, n_scenarios)
+    try:
+        rows = result[start : start + len(params)]
+        buffers = {}
+        for i in range(0, len(params), batch):
+            wb.sweep_scenarios(
+                params[i : i + batch],
+                duration,
+                dt,
+                rows[i : i + batch],
+                method,
+                dtype,
+                buffers,
+                **geometry
+            )
+        # the views must be released before the block can be closed
+        del result, rows
+    finally:
+        _release(shm)
+    return len(params)
+
+
+def parallel_tuningsweep(
+    rock_props,
+    f=25,
+    duration=0.100,
+    dt=0.001,
+    workers=None,
+    chunk_size=256,
+    batch_size=32,
+    progress=None,
+    method="synthetic",
+    dtype=np.float32,
+    **geometry
+):
+    """
+    Assumes the same inputs as wedgebuilder.tuningsweep
+    The scenarios are split in chunks of chunk_size that run on a pool of
+    worker processes (default os.cpu_count()), each computing batch_size
+    scenarios at a time into a shared memory result array.  progress, if given,
+    is called in the parent as progress(done, total) whenever a chunk finishes
+    Returns a structured array of SWEEP_DTYPE with one axis per swept entry
+    """
+    params, shape = wb.sweep_grid(rock_props, f)
+    n_scenarios = len(params)
+    workers = workers or os.cpu_count()
+
+    name, shm = _create(n_scenarios)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _sweep_chunk,
+                    name,
+                    n_scenarios,
+                    start,
+                    params[start : start + chunk_size],
+                    duration,
+                    dt,
+                    batch_size,
+                    method,
+                    dtype,
+                    geometry,
+                )
+                for start in range(0, n_scenarios, chunk_size)
+            ]
+            done = 0
+            for future in as_completed(futures):
+                done += future.result()
+                if progress is not None:
+                    progress(done, n_scenarios)
+        handle, shared = _attach(name, n_scenarios)
+        result = np.array(shared)
+        del shared
+        _release(handle)
+    finally:
+        _release(shm, unlink=True)
+    return result.reshape(shape)
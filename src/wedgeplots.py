@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+
+# Headless plotting of wedgebuilder results with matplotlib
+# The figures are plain matplotlib Figures drawn with the Agg canvas, so this
+# module neither needs Qt nor pyplot and is only imported when plotting
+#
+# The plot_* functions return the artists they create, which the update_*
+# functions give new data, so an interactive canvas can keep its artists and
+# only blit them (see Blitter) rather than rebuild and redraw the whole figure
+
+from collections import namedtuple
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+import wedgebuilder as wb
+
+TuningCurveArtists = namedtuple(
+    "TuningCurveArtists", ["amp", "tuning", "onset", "true", "apparent", "legend"]
+)
+
+
+class Blitter:
+    """
+    Redraws the animated artists of a canvas on top of a cached background
+    The background is captured whenever the canvas is fully drawn, so after
+    new data is set on the artists, update() only needs to draw the artists
+    themselves, unless the rest of the figure changed as well (redraw=True)
+    Opaque static artists that belong on top of the animated ones, such as a
+    legend, are covers: they stay in the background and their area of it is
+    restored over the animated artists, rather than being drawn every time
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.artists = []
+        self.covers = []
+        self.background = None
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def add(self, *artists):
+        for artist in artists:
+            artist.set_animated(True)
+            self.artists.append(artist)
+
+    def cover(self, *artists):
+        self.covers.extend(artists)
+
+    def clear(self):
+        self.artists = []
+        self.covers = []
+        self.background = None
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.canvas.figure.draw_artist(artist)
+        for artist in self.covers:
+            x0, y0, x1, y1 = artist.get_window_extent().extents
+            bbox = (
+                int(x0) - 1,
+                int(y0) - 1,
+                int(np.ceil(x1)) + 1,
+                int(np.ceil(y1)) + 1,
+            )
+            self.canvas.restore_region(self.background, bbox, bbox[:2])
+
+    def update(self, redraw=False):
+        """Blits the artists, or schedules a full draw if redraw"""
+        if redraw or self.background is None:
+            # a blit before the draw happened would restore a stale background
+            self.background = None
+            self.canvas.draw_idle()
+        else:
+            self.canvas.restore_region(self.background)
+            self._draw_artists()
+            self.canvas.blit(self.canvas.figure.bbox)
+
+
+def display_shape(ax):
+    """Returns the (rows, columns) of pixels of ax on its canvas"""
+    bbox = ax.get_window_extent()
+    return max(int(bbox.height), 1), max(int(bbox.width), 1)
+
+
+def decimate(arr, max_shape=None):
+    """
+    Assumes arr a 2D numpy array and max_shape the (rows, columns) of pixels
+    it is shown in, or None
+    Returns arr reduced by a whole step along the axes that are at least twice
+    the size of max_shape, keeping the value of largest magnitude per block so
+    spikes and thin layers stay visible
+    """
+    if max_shape is None:
+        return arr
+    steps = [max(n // m, 1) for n, m in zip(arr.shape, max_shape)]
+    if steps == [1, 1]:
+        return arr
+    hi = lo = arr
+    # along the traces first, which shrinks the array the most for wide wedges
+    for axis in (1, 0):
+        if steps[axis] > 1:
+            starts = np.arange(0, arr.shape[axis], steps[axis])
+            hi = np.maximum.reduceat(hi, starts, axis=axis)
+            lo = np.minimum.reduceat(lo, starts, axis=axis)
+    return np.where(hi >= -lo, hi, lo)
+
+
+def _extent(shape):
+    # the default imshow extent of the full array, kept when decimated
+    return -0.5, shape[1] - 0.5, shape[0] - 0.5, -0.5
+
+
+def rescale(ax):
+    """
+    Autoscales ax when its data left the view or fills less than half of it,
+    so small changes of the data keep the axes, and their ticks, as they are
+    Returns True if the view limits changed
+    """
+    ax.relim()
+    (x0, x1), (y0, y1) = sorted(ax.get_xlim()), sorted(ax.get_ylim())
+    data = ax.dataLim
+    if (
+        x0 <= data.x0
+        and data.x1 <= x1
+        and y0 <= data.y0
+        and data.y1 <= y1
+        and data.width >= (x1 - x0) / 2
+        and data.height >= (y1 - y0) / 2
+    ):
+        return False
+    ax.autoscale_view()
+    return True
+
+
+def plot_ricker(ax, t, w):
+    """Draws the wavelet w against its plot axis t
+    Returns the Line2D of the wavelet
+    """
+    return ax.plot(t, w)[0]
+
+
+def update_ricker(line, t, w):
+    """Sets a new wavelet on the line of plot_ricker
+    Returns True if the axes limits changed
+    """
+    line.set_data(t, w)
+    return rescale(line.axes)
+
+
+def plot_wedge(ax_model, ax_wedge, imp, synth, rc, max_shape=None):
+    """
+    Draws the impedance model and the tuning wedge with its RCs on top, where
+    max_shape optionally is the display_shape the images are decimated to
+    Returns the AxesImages of the model, the wedge and the RCs
+    """
+    images = (
+        ax_model.imshow(
+            decimate(imp, max_shape),
+            cmap="viridis_r",
+            aspect=0.2,
+            interpolation="bilinear",
+            extent=_extent(imp.shape),
+        ),
+        ax_wedge.imshow(
+            decimate(synth, max_shape),
+            cmap="viridis_r",
+            aspect=0.2,
+            interpolation="bilinear",
+            extent=_extent(synth.shape),
+        ),
+        ax_wedge.imshow(
+            wb.mask_rc(decimate(rc, max_shape)),
+            cmap="Greys",
+            aspect=0.2,
+            extent=_extent(rc.shape),
+        ),
+    )
+    ax_model.set_ylabel("TWT (ms)")
+    ax_wedge.set_xlabel("Thickness, TWT (ms)")
+    ax_wedge.set_ylabel("TWT (ms)")
+    ax_wedge.set_xlim(0, synth.shape[-1] - 1)
+    return images
+
+
+def update_wedge(images, imp, synth, rc, max_shape=None):
+    """
+    Assumes images the return of plot_wedge for arrays of the same shapes
+    Sets the new arrays on the images and rescales their colours
+    """
+    model, wedge, spikes = images
+    for image, arr in ((model, imp), (wedge, synth)):
+        image.set_data(decimate(arr, max_shape))
+        image.autoscale()
+    spikes.set_data(wb.mask_rc(decimate(rc, max_shape)))
+    spikes.autoscale()
+
+
+def _vline_label(name, z):
+    return "Measured {} {}ms TWT".format(name, z)
+
+
+def plot_tuningcurve(ax, ax2, z, amp, z_tuning, z_apparent, z_onset):
+    """Draws the tuning curve on ax and the true & apparent thickness on ax2
+    Returns the TuningCurveArtists of the plot
+    """
+    (amp_line,) = ax.plot(z, amp, label="Tuning Curve (top)")
+    ampMin, ampMax = wb.tuningVLine(amp)
+    tuning = ax.vlines(
+        z_tuning, ampMin, ampMax, label=_vline_label("Tuning Thickness", z_tuning)
+    )
+    onset = ax.vlines(
+        z_onset,
+        ampMin,
+        ampMax,
+        linestyles="dashed",
+        label=_vline_label("Onset of Tuning", z_onset),
+    )
+    ax.set_xlabel("Thickness, TWT (ms)")
+    ax.set_ylabel("Amplitude")
+    (true,) = ax2.plot(z, z, "g", label="True thickness ms TWT")
+    (apparent,) = ax2.plot(z, z_apparent, "r", label="Apparent thickness ms TWT")
+    lines, labels = ax.get_legend_handles_labels()
+    lines2, labels2 = ax2.get_legend_handles_labels()
+    # an opaque legend can be a Blitter cover
+    legend = ax2.legend(
+        lines + lines2,
+        labels + labels2,
+        prop={"size": 6},
+        loc="lower right",
+        framealpha=1,
+    )
+    return TuningCurveArtists(amp_line, tuning, onset, true, apparent, legend)
+
+
+def update_tuningcurve(artists, z, amp, z_tuning, z_apparent, z_onset):
+    """
+    Assumes artists the TuningCurveArtists of plot_tuningcurve
+    Sets a new tuning curve on the artists, including the legend labels
+    Returns True if the figure needs a full draw, as the axes limits or the
+    legend labels changed
+    """
+    artists.amp.set_data(z, amp)
+    artists.true.set_data(z, z)
+    artists.apparent.set_data(z, z_apparent)
+    ampMin, ampMax = wb.tuningVLine(amp)
+    texts = artists.legend.get_texts()
+    changed = False
+    for i, (vline, name, zv) in enumerate(
+        (
+            (artists.tuning, "Tuning Thickness", z_tuning),
+            (artists.onset, "Onset of Tuning", z_onset),
+        ),
+        start=1,
+    ):
+        vline.set_segments([[(zv, ampMin), (zv, ampMax)]])
+        label = _vline_label(name, zv)
+        if label != vline.get_label():
+            vline.set_label(label)
+            texts[i].set_text(label)
+            changed = True
+    changed = rescale(artists.amp.axes) or changed
+    return rescale(artists.true.axes) or changed
+
+
+def plot_spectra(ax, ax2, z, f, amp, band, thickness, dt=0.001):
+    """
+    Assumes the wedge thickness z of tuningcurve and the panel f & amp, band
+    and notch thickness (s TWT) of spectral.wedge_spectra
+    Draws the spectral tuning panel up to twice the top of the band on ax and
+    the true & notch thickness on ax2
+    Returns the AxesImage of the panel
+    """
+    shown = f <= 2 * band[1]
+    image = ax.imshow(
+        amp[shown],
+        cmap="viridis",
+        aspect="auto",
+        origin="lower",
+        interpolation="bilinear",
+        extent=(z[0], z[-1], f[0], f[shown][-1]),
+    )
+    ax.axhline(band[0], color="w", linewidth=0.5, linestyle="dashed")
+    ax.axhline(band[1], color="w", linewidth=0.5, linestyle="dashed")
+    ax.set_ylabel("Frequency (Hz)")
+    ax2.plot(z, z, "g", label="True thickness ms TWT")
+    ax2.plot(z, thickness / dt, "r.", markersize=3, label="Notch thickness ms TWT")
+    ax2.set_xlabel("Thickness, TWT (ms)")
+    ax2.set_ylabel("TWT (ms)")
+    ax2.set_xlim(z[0], z[-1])
+    ax2.legend(prop={"size": 6}, loc="lower right")
+    return image
+
+
+def results_figure(t, w, imp, rc, synth, z, amp, z_tuning, z_apparent, z_onset):
+    """
+    Assumes the outputs of wavelet_plot_axis, wavelet, earthmodel, tuningwedge
+    and tuningcurve
+    Returns a Figure with the wavelet, the wedge and the tuning curve, laid out
+    as in the PySeisTuned Inputs tab
+    """
+    fig = Figure(figsize=(8, 7), dpi=100)
+    FigureCanvasAgg(fig)
+    grid = fig.add_gridspec(4, 2, width_ratios=(1, 2), height_ratios=(2, 2, 1, 1))
+    ax_ricker = fig.add_subplot(grid[2:, 0])
+    ax_model = fig.add_subplot(grid[0, 1])
+    ax_wedge = fig.add_subplot(grid[1, 1], sharex=ax_model, sharey=ax_model)
+    ax_amp = fig.add_subplot(grid[2:, 1])
+    ax_amp2 = ax_amp.twinx()
+    plot_ricker(ax_ricker, t, w)
+    plot_wedge(ax_model, ax_wedge, imp, synth, rc)
+    plot_tuningcurve(ax_amp, ax_amp2, z, amp, z_tuning, z_apparent, z_onset)
+    ax_ricker.set_title("Ricker Wavelet", fontsize=9)
+    ax_model.set_title("Tuning Wedge", fontsize=9)
+    ax_amp.set_title("Tuning Curve", fontsize=9)
+    fig.tight_layout()
+    return fig
+
+
+def ricker_figure(t, w):
+    """Returns a Figure of the wavelet, as the PySeisTuned Ricker Wavelet plot"""
+    fig = Figure(figsize=(5, 3), dpi=100)
+    FigureCanvasAgg(fig)
+    plot_ricker(fig.subplots(), t, w)
+    fig.tight_layout()
+    return fig
+
+
+def wedge_figure(imp, synth, rc):
+    """Returns a Figure of the impedance model above the tuning wedge"""
+    fig = Figure(figsize=(6, 6), dpi=100)
+    FigureCanvasAgg(fig)
+    ax_model, ax_wedge = fig.subplots(2, sharex=True, sharey=True)
+    fig.subplots_adjust(hspace=0)
+    plot_wedge(ax_model, ax_wedge, imp, synth, rc)
+    return fig
+
+
+def tuningcurve_figure(z, amp, z_tuning, z_apparent, z_onset):
+    """Returns a Figure of the tuning curve and the true & apparent thickness"""
+    fig = Figure(figsize=(6, 4), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    plot_tuningcurve(ax, ax.twinx(), z, amp, z_tuning, z_apparent, z_onset)
+    fig.tight_layout()
+    return fig
+
+
+def spectra_figure(z, f, amp, band, thickness, dt=0.001):
+    """Returns a Figure of the spectral tuning panel above the notch thickness"""
+    fig = Figure(figsize=(6, 6), dpi=100)
+    FigureCanvasAgg(fig)
+    ax, ax2 = fig.subplots(2, sharex=True, gridspec_kw={"height_ratios": (2, 1)})
+    plot_spectra(ax, ax2, z, f, amp, band, thickness, dt)
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,531 @@
+#!/usr/bin/env python
+
+# Local HTTP/JSON server of the wedgebuilder calculations
+# Dashboards and scripts POST a JSON scenario to /compute, /summary or /sweep
+# and get the results of wedgecli back as JSON, without embedding the GUI.
+# The calculations run on a pool of worker processes, so the asyncio event loop
+# only parses requests and serves results.  Identical requests that arrive
+# while one is being computed wait for that one calculation, and the encoded
+# responses are kept in a least recently used cache in memory.  GET /metrics
+# returns the request latencies, the queue depth and the cache counters
+#
+# usage, from the src/ directory:
+#   python -m wedgeserver --port 8750 --workers 4
+#   curl -d '{"rock_props": [3000, 2315, 2200, 2150, 3000, 2315]}' \
+#       http://127.0.0.1:8750/compute
+#
+# Only numpy and the standard library are needed.  The server binds to the
+# loopback interface unless another --host is given, and it reads no files
+# named in requests
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import signal
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+import resultcache
+import wedgebuilder as wb
+import wedgecli
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8750
+
+# the largest request body accepted, and the seconds an idle keep-alive
+# connection or a slow request is waited for
+MAX_BODY = 1 << 20
+IDLE_TIMEOUT = 30
+
+# the latencies kept per endpoint for the /metrics percentiles
+LATENCY_WINDOW = 1024
+LATENCY_PERCENTILES = (50, 90, 99)
+
+# the bytes of encoded responses kept in memory
+DEFAULT_MEMORY_BYTES = 64 << 20
+
+SCENARIO_DEFAULTS = {"f": 25, "duration": 0.100, "dt": 0.001}
+
+# the wedge geometry keywords a /sweep request may set, not the options that
+# start processes or pick buffers
+SWEEP_GEOMETRY = ("traces", "samples", "top", "max_thickness", "dz")
+
+
+class RequestError(Exception):
+    """A request the server cannot answer, with the HTTP status to reply"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _check_positive(values):
+    """
+    Assumes values a dict of parameter names to numbers or lists of numbers
+    Raises ValueError unless all of them are > 0
+    """
+    for name, value in values.items():
+        if not np.all(np.asarray(value, dtype=float) > 0):
+            raise ValueError("{} must be > 0".format(name))
+
+
+def _scenario(params):
+    """Returns the wedgecli scenario of the JSON params of a request"""
+    if not isinstance(params, dict) or "rock_props" not in params:
+        raise ValueError("A scenario needs rock_props")
+    scenario = dict(SCENARIO_DEFAULTS)
+    scenario.update(params)
+    _check_positive({name: scenario[name] for name in ("f", "duration", "dt")})
+    if any("file" in entry for entry in scenario.get("wavelets") or []):
+        raise ValueError("The server does not read wavelet files")
+    return scenario
+
+
+def _open_cache(cache):
+    # the disk cache of the server, as (directory, max_bytes), or None
+    return None if cache is None else resultcache.ResultCache(*cache)
+
+
+def compute(params, cache=None):
+    """
+    Assumes params the JSON object of a /compute request: the rock_props, f,
+    duration, dt and the optional vs, angles, avo_method & wavelets of
+    wedgecli.compute, and arrays, a list of the names of the result arrays
+    to return as well
+    Returns the wedgecli.scenario_record of the scenario
+    """
+    scenario = _scenario(params)
+    names = scenario.pop("arrays", [])
+    results = wedgecli.compute(cache=_open_cache(cache), **scenario)
+    record = wedgecli.scenario_record(scenario, results)
+    unknown = sorted(set(names) - set(results))
+    if unknown:
+        raise ValueError("Unknown result arrays: {}".format(", ".join(unknown)))
+    if names:
+        record["arrays"] = {name: np.asarray(results[name]).tolist() for name in names}
+    return record
+
+
+def summary(params, cache=None):
+    """
+    Assumes params the JSON object of a /summary request, as for compute
+    Returns the scenario record with the text summary of the GUI
+    """
+    scenario = _scenario(params)
+    if scenario.pop("arrays", None):
+        raise ValueError("A summary has no result arrays, use /compute")
+    results = wedgecli.compute(cache=_open_cache(cache), **scenario)
+    record = wedgecli.scenario_record(scenario, results)
+    record["summary"] = wb.results_summary(
+        [
+            scenario["rock_props"],
+            scenario["f"],
+            results["z_tuning"] * scenario["dt"] * 1000,
+            results["z_onset"] * scenario["dt"] * 1000,
+        ]
+    )
+    return record
+
+
+def sweep(params, cache=None):
+    """
+    Assumes params the JSON object of a /sweep request, the spec of wedgecli
+    sweep: rock_props & f, where any entry may be a list of values to sweep,
+    duration, dt, method and geometry, a dict of SWEEP_GEOMETRY keywords
+    Returns the names & shape of the sweep table and its rows
+    """
+    if not isinstance(params, dict) or "rock_props" not in params:
+        raise ValueError("A sweep needs rock_props")
+    kwargs = {
+        "f": params.get("f", 25),
+        "duration": params.get("duration", 0.100),
+        "dt": params.get("dt", 0.001),
+        "method": params.get("method", "synthetic"),
+    }
+    geometry = params.get("geometry") or {}
+    unknown = sorted(set(geometry) - set(SWEEP_GEOMETRY))
+    if unknown:
+        raise ValueError("Unknown geometry keywords: {}".format(", ".join(unknown)))
+    kwargs.update(geometry)
+    _check_positive(
+        {
+            name: kwargs[name]
+            for name in ("f", "duration", "dt", "traces", "samples")
+            if name in kwargs
+        }
+    )
+    table = wedgecli.tuningsweep(
+        params["rock_props"], cache=_open_cache(cache), **kwargs
+    )
+    return {
+        "names": list(table.dtype.names),
+        "shape": list(table.shape),
+        "rows": [list(row) for row in table.reshape(-1).tolist()],
+    }
+
+
+# POST path: calculation run on the worker pool
+ENDPOINTS = {"/compute": compute, "/summary": summary, "/sweep": sweep}
+
+
+def request_key(path, params):
+    """Returns the hex key of a request, equal for equal normalized params"""
+    text = json.dumps(
+        {"path": path, "params": resultcache.normalize(params)},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _ready():
+    # the no-op the worker processes are started with
+    return os.getpid()
+
+
+class Metrics:
+    """
+    Counters of the requests of every path, with the latencies of the last
+    LATENCY_WINDOW requests of each for the percentiles
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = {}
+        self.errors = {}
+        self.latencies = {}
+
+    def record(self, path, seconds, ok):
+        self.requests[path] = self.requests.get(path, 0) + 1
+        if not ok:
+            self.errors[path] = self.errors.get(path, 0) + 1
+        latencies = self.latencies.setdefault(path, deque(maxlen=LATENCY_WINDOW))
+        latencies.append(seconds)
+
+    def latency(self, path):
+        """Returns the count, mean, max & percentiles in ms of a path"""
+        seconds = np.array(self.latencies.get(path, ())) * 1000
+        if not len(seconds):
+            return {"count": 0}
+        latency = {"count": len(seconds), "mean": float(seconds.mean())}
+        for q, value in zip(
+            LATENCY_PERCENTILES, np.percentile(seconds, LATENCY_PERCENTILES)
+        ):
+            latency["p{}".format(q)] = float(value)
+        latency["max"] = float(seconds.max())
+        return latency
+
+    def paths(self):
+        return {
+            path: {
+                "requests": count,
+                "errors": self.errors.get(path, 0),
+                "latency_ms": self.latency(path),
+            }
+            for path, count in sorted(self.requests.items())
+        }
+
+
+class WedgeServer:
+    """
+    The request handling of the server, where
+        server = WedgeServer(workers=4)
+        await server.start("127.0.0.1", 8750)
+    serves the ENDPOINTS with workers processes (default os.cpu_count()),
+    keeping the most recent responses up to max_bytes in total, and cache
+    optionally a resultcache.ResultCache the workers share
+    """
+
+    def __init__(self, workers=None, max_bytes=DEFAULT_MEMORY_BYTES, cache=None):
+        self.workers = workers or os.cpu_count()
+        self.max_bytes = max_bytes
+        self.cache = None if cache is None else (cache.directory, cache.max_bytes)
+        self.pool = ProcessPoolExecutor(self.workers)
+        self.results = OrderedDict()
+        self.result_bytes = 0
+        self.inflight = {}
+        self.metrics = Metrics()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.queued = 0
+        self.connections = 0
+        self.server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Starts listening and returns the (host, port) bound to"""
+        # the pool forks its workers on first use: started from a request they
+        # would inherit the listening and client sockets, and a connection
+        # would stay open until they exit
+        loop = asyncio.get_event_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self.pool, _ready) for _ in range(self.workers))
+        )
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.pool.shutdown(wait=False)
+
+    async def result(self, path, params):
+        """
+        Returns the encoded JSON result of a request, from the cache, from the
+        calculation of an identical request in flight, or calculated anew
+        """
+        key = request_key(path, params)
+        body = self.results.get(key)
+        if body is not None:
+            self.results.move_to_end(key)
+            self.hits += 1
+            return body
+        task = self.inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._calculate(key, path, params))
+            self.inflight[key] = task
+        else:
+            self.coalesced += 1
+        # a client that goes away does not cancel the calculation of the others
+        return await asyncio.shield(task)
+
+    async def _calculate(self, key, path, params):
+        loop = asyncio.get_event_loop()
+        self.queued += 1
+        try:
+            result = await loop.run_in_executor(
+                self.pool, ENDPOINTS[path], params, self.cache
+            )
+        except (ValueError, TypeError, KeyError, IndexError) as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, str(e)) from None
+        finally:
+            self.queued -= 1
+            del self.inflight[key]
+        body = json.dumps(result).encode()
+        if len(body) <= self.max_bytes:
+            self.results[key] = body
+            self.result_bytes += len(body)
+            while self.result_bytes > self.max_bytes:
+                self.result_bytes -= len(self.results.popitem(last=False)[1])
+        return body
+
+    def metrics_report(self):
+        """Returns the /metrics JSON object"""
+        return {
+            "uptime_s": time.monotonic() - self.metrics.started,
+            "workers": self.workers,
+            "queue_depth": self.queued,
+            "in_flight": len(self.inflight),
+            "connections": self.connections,
+            "cache": {
+                "entries": len(self.results),
+                "bytes": self.result_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            },
+            "paths": self.metrics.paths(),
+        }
+
+    async def respond(self, method, path, body):
+        """Returns the encoded JSON response body of a request"""
+        if path in ("/metrics", "/health"):
+            if method != "GET":
+                raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET")
+            if path == "/health":
+                return b'{"status": "ok"}'
+            return json.dumps(self.metrics_report()).encode()
+        if path not in ENDPOINTS:
+            raise RequestError(HTTPStatus.NOT_FOUND, "Unknown path: " + path)
+        if method != "POST":
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST")
+        try:
+            params = json.loads(body.decode() or "{}")
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid JSON") from None
+        return await self.result(path, params)
+
+    async def handle(self, reader, writer):
+        """Serves the requests of one connection, kept alive as HTTP/1.1 asks"""
+        self.connections += 1
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await asyncio.wait_for(
+                        _read_request(reader), IDLE_TIMEOUT
+                    )
+                except (asyncio.TimeoutError, ConnectionError):
+                    break
+                except (asyncio.IncompleteReadError, ValueError):
+                    # a body shorter than its Content-Length or a line longer
+                    # than the stream limit, the request cannot be framed
+                    break
+                if request is None:
+                    break
+                method, path, headers, body, keep_alive = request
+                start = time.perf_counter()
+                try:
+                    if isinstance(body, RequestError):
+                        raise body
+                    status, payload = HTTPStatus.OK, await self.respond(
+                        method, path, body
+                    )
+                except RequestError as e:
+                    status = e.status
+                    payload = json.dumps({"error": str(e)}).encode()
+                except Exception as e:
+                    status = HTTPStatus.INTERNAL_SERVER_ERROR
+                    payload = json.dumps({"error": repr(e)}).encode()
+                if path != "/metrics":
+                    # unknown paths share one entry, so the metrics stay bounded
+                    name = path if path in ENDPOINTS or path == "/health" else "other"
+                    self.metrics.record(
+                        name, time.perf_counter() - start, status == HTTPStatus.OK
+                    )
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+
+async def _read_request(reader):
+    """
+    Returns the method, path, headers, body (or the RequestError of a body
+    that is too large or of an invalid length) and keep-alive of the next
+    request of a connection, None at its end
+    """
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        return "GET", "", {}, RequestError(HTTPStatus.BAD_REQUEST, "Bad request"), False
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" and (
+        version == "HTTP/1.1" or connection == "keep-alive"
+    )
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        error = RequestError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        return method, target.split("?")[0], headers, error, False
+    if length > MAX_BODY:
+        error = RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large")
+        return method, target.split("?")[0], headers, error, False
+    body = await reader.readexactly(length) if length else b""
+    return method, target.split("?")[0], headers, body, keep_alive
+
+
+def _response(status, payload, keep_alive):
+    head = (
+        "HTTP/1.1 {} {}\r\n"
+        "Content-Type: application/json\r\n"
+        "Content-Length: {}\r\n"
+        "Connection: {}\r\n\r\n"
+    ).format(
+        status.value,
+        status.phrase,
+        len(payload),
+        "keep-alive" if keep_alive else "close",
+    )
+    return head.encode("latin-1") + payload
+
+
+async def serve(host, port, workers=None, max_bytes=DEFAULT_MEMORY_BYTES, cache=None):
+    """Runs a WedgeServer until it is interrupted or terminated"""
+    server = WedgeServer(workers, max_bytes, cache)
+    try:
+        host, port = await server.start(host, port)
+        print("Serving on http://{}:{}".format(host, port), file=sys.stderr)
+        # the server serves from start on, this waits for SIGTERM
+        loop = asyncio.get_event_loop()
+        stop = loop.create_future()
+        with contextlib.suppress(NotImplementedError):  # Windows
+            loop.add_signal_handler(signal.SIGTERM, stop.cancel)
+        with contextlib.suppress(asyncio.CancelledError):
+            await stop
+    finally:
+        await server.close()
+
+
+def run(coro):
+    """
+    Runs coro on a new event loop like asyncio.run, which needs Python 3.7,
+    cancelling it on Ctrl-C so that its clean up runs
+    Returns the result of coro
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    task = loop.create_task(coro)
+    try:
+        return loop.run_until_complete(task)
+    except KeyboardInterrupt:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            loop.run_until_complete(task)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Local HTTP/JSON server of the wedge calculations"
+    )
+    parser.add_argument(
+        "--host",
+        default=DEFAULT_HOST,
+        help="interface to listen on, default the loopback interface",
+    )
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help="0 picks a free port"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="worker processes, default the CPU count"
+    )
+    parser.add_argument(
+        "--memory-mb",
+        type=float,
+        default=DEFAULT_MEMORY_BYTES / (1 << 20),
+        help="megabytes of responses kept in memory, default %(default)g",
+    )
+    wedgecli.add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    run(
+        serve(
+            args.host,
+            args.port,
+            args.workers,
+            int(args.memory_mb * (1 << 20)),
+            wedgecli.open_cache(args),
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
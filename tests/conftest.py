@@ -0,0 +1,16 @@
+# The modules live flat in src/, which is put on the import path of the tests
+# as it is for the command line and the benchmarks, and the frozen original
+# implementation in benchmarks/reference.py is the reference of the tests
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+sys.path.insert(0, SRC)
+sys.path.insert(1, os.path.join(ROOT, "benchmarks"))
+
+# rock properties of the original example and of a hard wedge in a soft
+# background, Vp-Density pairs of the three layers
+ROCK_PROPS = [3000, 2315, 2200, 2150, 3000, 2315]
+HARD_WEDGE = [2400, 2200, 3400, 2450, 2400, 2200]
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+# The two-spike tuning curve gives the results of the direct convolution of the
+# full wedge, for the default and other geometries and for stacks of models
+
+import numpy as np
+import pytest
+import wedgebuilder as wb
+from conftest import HARD_WEDGE, ROCK_PROPS
+
+
+def direct_curve(rock_props, w, **geometry):
+    rc = wb.earthmodel(rock_props, **geometry)[1]
+    return wb.tuningcurve(rc, wb.tuningwedge(rc, w, "direct"))
+
+
+@pytest.mark.parametrize("rock_props", [ROCK_PROPS, HARD_WEDGE])
+@pytest.mark.parametrize("duration, f", [(0.100, 25), (0.200, 10), (0.050, 60)])
+def test_analytic_curve(rock_props, duration, f):
+    w = wb.wavelet(duration, 0.001, f)
+    curve = wb.analytictuningcurve(rock_props, w)
+    for a, b in zip(curve, direct_curve(rock_props, w)):
+        assert np.array_equal(a, b)
+    z_tuning, z_onset = wb.analytictuningthickness(rock_props, w)
+    assert (z_tuning, z_onset) == (curve[1], curve[4])
+
+
+@pytest.mark.parametrize(
+    "geometry",
+    [
+        {"traces": 61, "samples": 150},
+        {"top": 0.020},
+        {"max_thickness": 0.030},
+        {"dz": 0.002},
+    ],
+)
+def test_geometry(geometry):
+    w = wb.wavelet()
+    curve = wb.analytictuningcurve(ROCK_PROPS, w, **geometry)
+    for a, b in zip(curve, direct_curve(ROCK_PROPS, w, **geometry)):
+        assert np.array_equal(a, b)
+
+
+def test_stack():
+    stack = np.array([ROCK_PROPS, HARD_WEDGE])
+    w = np.stack([wb.wavelet(0.100, 0.001, 20), wb.wavelet(0.100, 0.001, 35)])
+    curve = wb.analytictuningcurve(stack, w)
+    for k in range(2):
+        for a, b in zip(curve, direct_curve(stack[k], w[k])):
+            assert np.array_equal(a[k], b)
+    assert np.array_equal(wb.analytictuningthickness(stack, w), curve[1::3])
+
+
+def test_sweep_methods_agree():
+    grid = [3000, 2315, [2000, 2400, 2800], 2150, [2800, 3200], 2315]
+    analytic = wb.tuningsweep(grid, [20, 30], method="analytic")
+    assert np.array_equal(wb.tuningsweep(grid, [20, 30]), analytic)
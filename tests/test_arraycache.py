@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+# The in-memory cache of wavelets, plot axes & spectra: least recently used
+# eviction under a byte bound, and sharing between threads
+
+import threading
+
+import numpy as np
+import wedgebuilder as wb
+
+
+def entry(value, size=100):
+    """Returns a build function of an array of size float64 values"""
+    return lambda: np.full(size, value, dtype=float)
+
+
+def test_hit_and_miss():
+    cache = wb.ArrayCache(max_bytes=10000)
+    first = cache.get("a", entry(1))
+    assert cache.get("a", entry(2)) is first
+    assert not first.flags.writeable
+    info = cache.info()
+    assert (info.hits, info.misses, info.entries, info.nbytes) == (1, 1, 1, 800)
+
+
+def test_byte_bound_evicts_least_recently_used():
+    cache = wb.ArrayCache(max_bytes=2400)
+    for key in "abc":
+        cache.get(key, entry(key == "a"))
+    # "a" was used last, so "b" goes first
+    cache.get("a", entry(0))
+    cache.get("d", entry(0))
+    assert cache.info().nbytes == 2400
+    assert cache.get("a", entry(5))[0] == 1
+    assert cache.get("b", entry(5))[0] == 5
+
+
+def test_entry_larger_than_bound():
+    cache = wb.ArrayCache(max_bytes=100)
+    assert len(cache.get("a", entry(1))) == 100
+    assert cache.info().entries == 0
+
+
+def test_resize_and_clear():
+    cache = wb.ArrayCache(max_bytes=10000)
+    for key in range(10):
+        cache.get(key, entry(key))
+    cache.resize(1600)
+    assert (cache.info().entries, cache.info().nbytes) == (2, 1600)
+    cache.clear()
+    assert cache.info() == (0, 0, 0, 0, 1600)
+
+
+def test_build_may_use_the_cache():
+    cache = wb.ArrayCache(max_bytes=10000)
+    outer = cache.get("outer", lambda: cache.get("inner", entry(3)) * 2)
+    assert outer[0] == 6
+    assert cache.info().entries == 2
+
+
+def test_threads():
+    cache = wb.ArrayCache(max_bytes=8000)
+    errors = []
+
+    def worker(seed):
+        rng = np.random.RandomState(seed)
+        try:
+            for key in rng.randint(0, 30, 2000):
+                assert cache.get(key, entry(key))[0] == key
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    info = cache.info()
+    assert info.hits + info.misses == 8 * 2000
+    assert info.nbytes == 800 * info.entries <= 8000
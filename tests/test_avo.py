@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+# The angle dependent reflectivity: Zoeppritz matches a solve of the full
+# Zoeppritz equations and the normal incidence wedge, the linear approximations
+# stay close at small angles and contrasts, and the gather of all angles is
+# the wedge of every angle one at a time
+
+import numpy as np
+import pytest
+import wedgebuilder as wb
+from conftest import ROCK_PROPS
+
+VS = [1500, 1000, 1500]
+ANGLES = np.arange(0, 41, 5)
+
+
+def zoeppritz(vp1, vs1, rho1, vp2, vs2, rho2, angle):
+    """Returns the P-P RC of a solve of the 4 x 4 Zoeppritz equations"""
+    t1 = np.radians(angle)
+    p = np.sin(t1) / vp1
+    t2, f1, f2 = (np.arcsin(p * v + 0j) for v in (vp2, vs1, vs2))
+    M = [
+        [-np.sin(t1), -np.cos(f1), np.sin(t2), np.cos(f2)],
+        [np.cos(t1), -np.sin(f1), np.cos(t2), -np.sin(f2)],
+        [
+            2 * rho1 * vs1 * np.sin(f1) * np.cos(t1),
+            rho1 * vs1 * (1 - 2 * np.sin(f1) ** 2),
+            2 * rho2 * vs2 * np.sin(f2) * np.cos(t2),
+            rho2 * vs2 * (1 - 2 * np.sin(f2) ** 2),
+        ],
+        [
+            -rho1 * vp1 * (1 - 2 * np.sin(f1) ** 2),
+            rho1 * vs1 * np.sin(2 * f1),
+            rho2 * vp2 * (1 - 2 * np.sin(f2) ** 2),
+            -rho2 * vs2 * np.sin(2 * f2),
+        ],
+    ]
+    N = [
+        np.sin(t1),
+        np.cos(t1),
+        2 * rho1 * vs1 * np.sin(f1) * np.cos(t1),
+        rho1 * vp1 * (1 - 2 * np.sin(f1) ** 2),
+    ]
+    return np.linalg.solve(M, N)[0].real
+
+
+def interfaces(n, seed=0, contrast=(2000, 4000)):
+    """Returns n random interfaces of Vp, Vs & density above and below"""
+    rng = np.random.default_rng(seed)
+    vp = rng.uniform(*contrast, (n, 2))
+    vs = vp / rng.uniform(1.6, 2.2, (n, 2))
+    rho = rng.uniform(2000, 2600, (n, 2))
+    return np.stack([vp[:, 0], vs[:, 0], rho[:, 0], vp[:, 1], vs[:, 1], rho[:, 1]], 1)
+
+
+def test_zoeppritz():
+    for props in interfaces(50):
+        vp1, vp2 = props[0], props[3]
+        critical = np.degrees(np.arcsin(vp1 / vp2)) if vp2 > vp1 else 90
+        angles = np.linspace(0, min(40, 0.9 * critical), 7)
+        rc = wb.avo_rc(*props, angles, "zoeppritz")
+        expected = [zoeppritz(*props, angle) for angle in angles]
+        np.testing.assert_allclose(rc, expected, 0, 1e-12)
+
+
+@pytest.mark.parametrize("method", ["aki-richards", "shuey"])
+def test_approximations(method):
+    props = interfaces(50, 1, (2700, 3300)).T[..., None]
+    angles = np.array([0, 10, 20])
+    rc = wb.avo_rc(*props, angles, method)
+    expected = np.vectorize(zoeppritz)(*props, angles)
+    np.testing.assert_allclose(rc, expected, 0, 0.01)
+
+
+def test_normal_incidence():
+    elastic = wb.elastic_props(ROCK_PROPS, VS)
+    assert list(elastic) == [3000, 1500, 2315, 2200, 1000, 2150, 3000, 1500, 2315]
+    rc = wb.avo_reflectivity(elastic, [0], method="zoeppritz")
+    np.testing.assert_allclose(rc[0], wb.earthmodel(ROCK_PROPS)[1], 0, 1e-15)
+
+
+@pytest.mark.parametrize("method", wb.AVO_METHODS)
+def test_gather(method):
+    elastic = wb.elastic_props(ROCK_PROPS, VS)
+    w = wb.wavelet()
+    rc, synth = wb.avo_tuningwedge(elastic, ANGLES, w, method)
+    assert rc.shape == synth.shape == (len(ANGLES), 239, 101)
+    for k, angle in enumerate(ANGLES):
+        assert np.array_equal(
+            rc[k], wb.avo_reflectivity(elastic, [angle], method=method)[0]
+        )
+        np.testing.assert_allclose(
+            synth[k], wb.tuningwedge(rc[k], w, "direct"), 0, 1e-12
+        )
+    # one tuning curve per angle
+    curve = wb.tuningcurve(rc, synth)
+    assert curve[1].shape == curve[4].shape == ANGLES.shape
+
+
+def test_stack():
+    elastic = wb.elastic_props(ROCK_PROPS, VS)
+    stack = np.array([elastic, 1.05 * elastic])
+    rc, synth = wb.avo_tuningwedge(stack, ANGLES, wb.wavelet())
+    single = wb.avo_tuningwedge(stack[1], ANGLES, wb.wavelet())
+    assert np.array_equal(rc[1], single[0]) and np.array_equal(synth[1], single[1])
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        wb.avo_rc(3000, 1500, 2315, 2200, 1000, 2150, 10, "bogus")
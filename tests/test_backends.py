@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+# Every compute backend gives the results of the NumPy reference, the numba one
+# only where numba is installed
+
+import importlib.util
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import wedgebuilder as wb
+from conftest import SRC
+
+ROCK_PROPS = [3000, 2315, 2200, 2150, 3000, 2315]
+
+needs_numba = pytest.mark.skipif(
+    importlib.util.find_spec("numba") is None, reason="numba is not installed"
+)
+
+# name: the backend, the threaded one also split into more blocks than this
+# machine may have cores
+BACKENDS = [
+    pytest.param("threaded", id="threaded"),
+    pytest.param(wb.ThreadedBackend(workers=4, min_traces=8), id="split"),
+    pytest.param("numba", id="numba", marks=needs_numba),
+]
+
+
+@pytest.fixture(scope="module")
+def rc():
+    return wb.earthmodel(ROCK_PROPS, 1001, dz=0.0001)[1]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("method", ["direct", "fft"])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("stacked", [False, True])
+def test_tuningwedge(rc, backend, method, dtype, stacked):
+    model = np.stack([rc, -rc, 2 * rc]) if stacked else rc
+    w = wb.wavelet()
+    expected = wb.tuningwedge(model, w, method, dtype=dtype, backend="numpy")
+    synth = wb.tuningwedge(model, w, method, dtype=dtype, backend=backend)
+    assert synth.dtype == expected.dtype
+    assert np.array_equal(synth, expected)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_tuningcurve(rc, backend):
+    synth = wb.tuningwedge(rc, wb.wavelet())
+    synth[200:, 5] = np.nan
+    synth[3, 700] = np.nan
+    expected = wb.tuningcurve(rc, synth, backend="numpy")
+    curve = wb.tuningcurve(rc, synth, backend=backend)
+    for a, b in zip(curve, expected):
+        assert np.array_equal(a, b)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_all_nan_trace(rc, backend):
+    synth = wb.tuningwedge(rc, wb.wavelet())
+    synth[:, 5] = np.nan
+    with pytest.raises(ValueError):
+        wb.tuningcurve(rc, synth, backend=backend)
+
+
+def test_numba_imported_lazily():
+    code = "import sys, wedgebuilder; print('numba' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SRC,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+# The vectorized earth model reproduces the original 240 x 101 wedge, builds
+# stacks of models in one call and follows the wedge geometry keywords
+
+import numpy as np
+import pytest
+import reference as ref
+import wedgebuilder as wb
+from conftest import HARD_WEDGE, ROCK_PROPS
+
+
+@pytest.mark.parametrize("rock_props", [ROCK_PROPS, HARD_WEDGE])
+def test_reference(rock_props):
+    imp, rc = wb.earthmodel(rock_props)
+    imp_ref, rc_ref = ref.earthmodel(rock_props)
+    assert np.array_equal(imp, imp_ref)
+    assert np.array_equal(rc, rc_ref)
+
+
+def test_stack():
+    stack = np.array([ROCK_PROPS, HARD_WEDGE, np.add(ROCK_PROPS, 100)])
+    imp, rc = wb.earthmodel(stack)
+    assert imp.shape == (3, 240, 101) and rc.shape == (3, 239, 101)
+    for k, rock_props in enumerate(stack):
+        single = wb.earthmodel(rock_props)
+        assert np.array_equal(imp[k], single[0])
+        assert np.array_equal(rc[k], single[1])
+
+
+@pytest.mark.parametrize(
+    "geometry",
+    [
+        {"traces": 51, "samples": 120},
+        {"dt": 0.0005, "top": 0.030},
+        {"max_thickness": 0.040},
+        {"traces": 21, "dz": 0.005},
+    ],
+)
+def test_geometry(geometry):
+    imp = wb.earthmodel(ROCK_PROPS, **geometry)[0]
+    traces = geometry.get("traces", 101)
+    samples = geometry.get("samples", 240)
+    dt = geometry.get("dt", 0.001)
+    top = wb._top_sample(samples, dt, geometry.get("top"))
+    thickness = wb.wedge_thickness(
+        traces, dt, geometry.get("max_thickness"), geometry.get("dz")
+    )
+    assert imp.shape == (samples, traces)
+    layer = np.zeros(imp.shape, dtype=int)
+    for j in range(traces):
+        layer[top:, j] = 1
+        layer[top + thickness[j] :, j] = 2
+    AI = np.array(ROCK_PROPS[0::2]) * np.array(ROCK_PROPS[1::2])
+    assert np.array_equal(imp, AI[layer])
+
+
+def test_wedge_thickness():
+    assert np.array_equal(wb.wedge_thickness(5), [0, 1, 2, 3, 4])
+    assert np.array_equal(wb.wedge_thickness(5, dz=0.002), [0, 2, 4, 6, 8])
+    assert np.array_equal(wb.wedge_thickness(5, max_thickness=0.002), [0, 1, 2, 2, 2])
+
+
+def test_out_and_dtype():
+    imp, rc = wb.earthmodel(ROCK_PROPS, dtype=np.float32)
+    assert imp.dtype == rc.dtype == np.float32
+    out = (np.empty((240, 101), np.float32), np.empty((239, 101), np.float32))
+    result = wb.earthmodel(HARD_WEDGE, dtype=np.float32, out=out)
+    assert result[0] is out[0] and result[1] is out[1]
+    assert np.array_equal(out[1], wb.earthmodel(HARD_WEDGE, dtype=np.float32)[1])
+    with pytest.raises(ValueError):
+        wb.earthmodel(ROCK_PROPS, traces=50, out=out)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+# The export bundle and the streamed .npy files only appear at their paths once
+# complete: a cancelled or failed export leaves the directory as it was
+
+import json
+import os
+
+import numpy as np
+import pytest
+import wedgebuilder as wb
+import wedgecli
+import wedgeexport
+from conftest import ROCK_PROPS
+
+OPTIONS = {
+    "rock_props": ROCK_PROPS,
+    "wavelet_parms": (0.100, 0.001, 25),
+    "figures": False,
+}
+
+
+@pytest.fixture(scope="module")
+def results():
+    return wedgecli.compute(ROCK_PROPS)
+
+
+def test_bundle(tmp_path, results):
+    base = os.path.join(str(tmp_path), "wedge")
+    calls = []
+    written = wedgeexport.export_bundle(
+        base, results, lambda *args: calls.append(args), **OPTIONS
+    )
+    suffixes = [".npz", "_summary.json", "_synthetic.sgy", "_impedance.sgy"]
+    assert written == [base + suffix for suffix in suffixes]
+    assert sorted(os.listdir(str(tmp_path))) == sorted(
+        os.path.basename(path) for path in written
+    )
+    assert [done for done, total, path in calls] == [0, 1, 2, 3, 4]
+    with np.load(base + ".npz") as arrays:
+        assert np.array_equal(arrays["synth"], results["synth"])
+    with open(base + "_summary.json") as fh:
+        assert json.load(fh)["z_tuning"] == results["z_tuning"]
+
+
+def test_cancel(tmp_path, results):
+    base = os.path.join(str(tmp_path), "wedge")
+    with open(base + ".npz", "w") as fh:
+        fh.write("previous export")
+    files = []
+    written = wedgeexport.export_bundle(
+        base,
+        results,
+        lambda done, total, path: files.append(path),
+        lambda: len(files) == 3,
+        **OPTIONS
+    )
+    assert written == []
+    assert os.listdir(str(tmp_path)) == ["wedge.npz"]
+    with open(base + ".npz") as fh:
+        assert fh.read() == "previous export"
+
+
+def test_failed_write(tmp_path, results):
+    base = os.path.join(str(tmp_path), "wedge")
+    broken = dict(results)
+    del broken["imp"]
+    with pytest.raises(KeyError):
+        wedgeexport.export_bundle(base, broken, **dict(OPTIONS, arrays=False))
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_write_npy_closed_early(tmp_path):
+    path = os.path.join(str(tmp_path), "synth.npy")
+    np.save(path, np.arange(3))
+    stream = wb.write_npy(wb.wedge_blocks(ROCK_PROPS, wb.wavelet(), 10), path, 101)
+    next(stream)
+    stream.close()
+    assert os.listdir(str(tmp_path)) == ["synth.npy"]
+    assert np.array_equal(np.load(path), np.arange(3))
+
+
+def test_stream_wedge_failure(tmp_path, monkeypatch):
+    def failing_reduction(blocks, rock_props, **geometry):
+        next(blocks)
+        next(blocks)
+        raise ValueError("reduction failed")
+
+    monkeypatch.setattr(wb, "tuningcurve_blocks", failing_reduction)
+    path = os.path.join(str(tmp_path), "synth.npy")
+    with pytest.raises(ValueError):
+        wb.stream_wedge(path, ROCK_PROPS, wb.wavelet(), 10)
+    assert os.listdir(str(tmp_path)) == []
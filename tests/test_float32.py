@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+# The float32 mode keeps its outputs in float32 within the documented rounding
+# of the float64 results, and fills the output buffers it is given
+
+import numpy as np
+import pytest
+import wedgebuilder as wb
+from conftest import HARD_WEDGE, ROCK_PROPS
+
+STACK = np.array([ROCK_PROPS, HARD_WEDGE])
+
+
+def test_reflectivity():
+    rc = wb.reflectivity(STACK, dtype=np.float32)
+    assert rc.dtype == np.float32
+    expected = wb.earthmodel(STACK)[1]
+    assert np.array_equal(rc, expected.astype(np.float32))
+    assert np.array_equal(wb.reflectivity(STACK), expected)
+
+
+@pytest.mark.parametrize("method", ["direct", "fft"])
+def test_tuningwedge(method):
+    rc = wb.earthmodel(STACK)[1]
+    w = wb.wavelet()
+    synth = wb.tuningwedge(rc, w, method, dtype=np.float32)
+    assert synth.dtype == np.float32
+    expected = wb.tuningwedge(rc, w, method)
+    # about taps * 2**-24 of the sum of the absolute terms, see convolve_rc
+    bound = len(w) * 2.0**-24 * np.abs(rc).sum(axis=-2).max() * np.abs(w).max()
+    assert np.abs(synth - expected).max() <= bound
+    # float32 inputs stay in float32
+    rc32 = rc.astype(np.float32)
+    assert wb.tuningwedge(rc32, w.astype(np.float32), method).dtype == np.float32
+
+
+@pytest.mark.parametrize("method", ["direct", "fft"])
+def test_out(method):
+    rc = wb.reflectivity(STACK, dtype=np.float32)
+    out = np.empty((2, 239, 101), np.float32)
+    synth = wb.tuningwedge(rc, wb.wavelet(), method, dtype=np.float32, out=out)
+    assert synth is out
+    assert np.array_equal(
+        out, wb.tuningwedge(rc, wb.wavelet(), method, dtype=np.float32)
+    )
+    with pytest.raises(ValueError):
+        wb.tuningwedge(rc, wb.wavelet(), method, out=np.empty((239, 101)))
+
+
+def test_sweep_dtypes_agree():
+    grid = [3000, 2315, [2000, 2400, 2800], 2150, [2800, 3200], 2315]
+    table = wb.tuningsweep(grid, [20, 30])
+    assert np.array_equal(table, wb.tuningsweep(grid, [20, 30], dtype=np.float64))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+# The streaming Monte Carlo statistics: moments merged batch by batch equal
+# those of all values, histogram percentiles fall within a bin of the sorted
+# values, and a run matches sweep_scenarios of its draws, for any workers
+
+import montecarlo
+import numpy as np
+import pytest
+import wedgebuilder as wb
+
+SPEC = [{"normal": [3000, 100]}, 2315, {"uniform": [2000, 2400]}, 2150, 3000]
+SPEC += [2315, {"normal": [25, 2]}]
+
+
+def batches(seed=0):
+    """Returns 5 batches of 3 columns of very different scales, with NaN"""
+    rng = np.random.default_rng(seed)
+    out = []
+    for size in (1, 7, 100, 1000, 33):
+        values = rng.normal([0, 1e6, -5e-3], [1, 10, 1e-6], (size, 3))
+        values[rng.random(values.shape) < 0.05] = np.nan
+        out.append(values)
+    return out
+
+
+def test_moments():
+    values = batches()
+    moments = montecarlo.Moments(3)
+    for batch in values:
+        moments.update(batch)
+    # the same batches merged pairwise from separate Moments (Chan et al.)
+    merged = montecarlo.Moments(3)
+    for batch in values[::-1]:
+        other = montecarlo.Moments(3)
+        other.update(batch)
+        merged.merge(other)
+    every = np.concatenate(values)
+    for m in (moments, merged):
+        assert np.array_equal(m.n, np.isfinite(every).sum(axis=0))
+        np.testing.assert_allclose(m.mean, np.nanmean(every, axis=0), 1e-12)
+        np.testing.assert_allclose(m.std(), np.nanstd(every, axis=0, ddof=1), 1e-9)
+        assert np.array_equal(m.min, np.nanmin(every, axis=0))
+        assert np.array_equal(m.max, np.nanmax(every, axis=0))
+
+
+@pytest.mark.parametrize("bins", [64, 4096])
+def test_histogram_percentiles(bins):
+    values = batches()
+    histogram = montecarlo.Histogram(3, bins)
+    halves = [montecarlo.Histogram(3, bins) for _ in range(2)]
+    for i, batch in enumerate(values):
+        histogram.update(batch)
+        halves[i % 2].update(batch)
+    halves[0].merge(halves[1])
+    assert np.array_equal(halves[0].counts, histogram.counts)
+
+    every = np.concatenate(values)
+    for j in range(3):
+        ordered = np.sort(every[np.isfinite(every[:, j]), j])
+        width = 2.0 ** histogram.k[j]
+        assert width <= 4 * (ordered[-1] - ordered[0]) / bins
+        for q in (0, 10, 50, 90, 100):
+            value = ordered[max(int(np.ceil(q / 100 * len(ordered))) - 1, 0)]
+            percentile = histogram.percentile(j, q, ordered[0], ordered[-1])
+            assert abs(percentile - value) <= width
+
+
+def test_montecarlo():
+    stats = montecarlo.montecarlo(SPEC[:6], SPEC[6], 1500, 7, batch_size=512)
+    distributions = [montecarlo.distribution(entry) for entry in SPEC]
+    children = np.random.SeedSequence(7).spawn(3)
+    table = np.concatenate(
+        [
+            wb.sweep_scenarios(
+                montecarlo.sample(distributions, size, np.random.default_rng(child)),
+                method="analytic",
+            )
+            for child, size in zip(children, [512, 512, 476])
+        ]
+    )
+    assert (stats.realizations, stats.rejected, stats.seed) == (1500, 0, 7)
+    for j, name in enumerate(stats.names):
+        assert np.isclose(stats.moments.mean[j], table[name].mean())
+        assert np.isclose(stats.moments.std()[j], table[name].std(ddof=1))
+
+
+def test_reproducible_with_workers():
+    serial = montecarlo.montecarlo(SPEC[:6], SPEC[6], 600, 3, batch_size=100)
+    pooled = montecarlo.montecarlo(SPEC[:6], SPEC[6], 600, 3, batch_size=100, workers=2)
+    assert np.array_equal(serial.moments.mean, pooled.moments.mean)
+    assert np.array_equal(serial.histogram.counts, pooled.histogram.counts)
+
+
+def test_rejected():
+    stats = montecarlo.montecarlo(
+        [{"normal": [100, 200]}, 2315, 2200, 2150, 3000, 2315], 25, 500, 1
+    )
+    assert 0 < stats.rejected < 500
+    assert (
+        stats.moments.n[0]
+        == stats.realizations - stats.rejected
+        == 500 - stats.rejected
+    )
+
+
+@pytest.mark.parametrize(
+    "spec", [{"normal": [1]}, {"gamma": [1, 2]}, {"normal": [1, 2], "uniform": [1, 2]}]
+)
+def test_invalid_distribution(spec):
+    with pytest.raises(ValueError):
+        montecarlo.distribution(spec)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+# The process pool sweep gives the table of the serial sweep, with its results
+# in shared memory or, before Python 3.8, in a memory-mapped file
+
+import numpy as np
+import pytest
+import wedgebuilder as wb
+import wedgeparallel
+
+GRID = [3000, 2315, [2000, 2200, 2400, 2600, 2800], 2150, [2800, 3200], 2315]
+FREQUENCIES = [20, 30, 40]
+
+
+@pytest.mark.parametrize("method", ["synthetic", "analytic"])
+def test_parallel_sweep(method):
+    calls = []
+    table = wedgeparallel.parallel_tuningsweep(
+        GRID,
+        FREQUENCIES,
+        workers=2,
+        chunk_size=7,
+        batch_size=3,
+        progress=lambda done, total: calls.append((done, total)),
+        method=method,
+    )
+    assert table.shape == (5, 2, 3)
+    assert np.array_equal(table, wb.tuningsweep(GRID, FREQUENCIES, method=method))
+    assert calls[-1] == (30, 30) and len(calls) == 5
+
+
+@pytest.mark.parametrize("shared_memory", [wedgeparallel.shared_memory, None])
+def test_shared_block(monkeypatch, shared_memory):
+    monkeypatch.setattr(wedgeparallel, "shared_memory", shared_memory)
+    name, owner = wedgeparallel._create(4)
+    try:
+        handle, rows = wedgeparallel._attach(name, 4)
+        rows["f"] = np.arange(4)
+        del rows
+        wedgeparallel._release(handle)
+        handle, rows = wedgeparallel._attach(name, 4)
+        assert np.array_equal(rows["f"], np.arange(4))
+        del rows
+        wedgeparallel._release(handle)
+    finally:
+        wedgeparallel._release(owner, unlink=True)
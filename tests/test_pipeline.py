@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+# The calculation graph behind Calculate only recomputes the stages downstream
+# of a changed input, and gives the results of a full calculation
+
+import numpy as np
+import wedgebuilder as wb
+from conftest import HARD_WEDGE, ROCK_PROPS
+from pipeline import Pipeline, WedgePipeline
+
+
+def test_first_run():
+    pipeline = WedgePipeline(ROCK_PROPS, (0.100, 0.001, 25))
+    assert pipeline.run() == pipeline.stages()
+    assert pipeline.run() == []
+    rc = wb.earthmodel(ROCK_PROPS)[1]
+    curve = wb.tuningcurve(rc, wb.tuningwedge(rc, wb.wavelet()))
+    for a, b in zip(pipeline.get("tuningcurve"), curve):
+        assert np.array_equal(a, b)
+
+
+def test_changed_wavelet_keeps_the_model():
+    pipeline = WedgePipeline(ROCK_PROPS, (0.100, 0.001, 25))
+    pipeline.run()
+    model = pipeline.get("earthmodel")
+    pipeline.set("wavelet_parms", (0.100, 0.001, 30))
+    assert "earthmodel" not in pipeline.run()
+    assert pipeline.get("earthmodel") is model
+
+
+def test_changed_rock_props_keep_the_wavelet():
+    pipeline = WedgePipeline(ROCK_PROPS, (0.100, 0.001, 25))
+    pipeline.run()
+    # an equal value is no change
+    pipeline.set("rock_props", list(ROCK_PROPS))
+    assert pipeline.run() == []
+    pipeline.set("rock_props", HARD_WEDGE)
+    assert pipeline.run() == ["earthmodel", "synth", "tuningcurve", "summary"]
+    rc = wb.earthmodel(HARD_WEDGE)[1]
+    z_tuning = wb.tuningcurve(rc, wb.tuningwedge(rc, wb.wavelet()))[1]
+    assert pipeline.get("tuningcurve")[1] == z_tuning
+
+
+def test_invalidate():
+    pipeline = WedgePipeline(ROCK_PROPS, (0.100, 0.001, 25))
+    pipeline.run()
+    pipeline.invalidate()
+    assert pipeline.run() == pipeline.stages()
+
+
+def test_cancel_leaves_the_rest_dirty():
+    calls = []
+    pipeline = Pipeline()
+    pipeline.add_input("x", 1)
+    pipeline.add_stage("double", lambda x: calls.append("double") or 2 * x, ["x"])
+    pipeline.add_stage("inc", lambda y: calls.append("inc") or y + 1, ["double"])
+    assert pipeline.run(cancelled=lambda: bool(calls)) == ["double"]
+    assert pipeline.get("inc") == 3
+    assert calls == ["double", "inc"]
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+# The stage timings of the profiler: records, nesting, output sizes, memory
+# peaks and the disabled profiler, and the stages of a pipeline run
+
+import threading
+
+import numpy as np
+import wedgecli
+from conftest import ROCK_PROPS
+from profiling import Profiler
+
+
+def test_records():
+    profiler = Profiler()
+    with profiler.stage("outer") as outer:
+        with profiler.stage("inner") as inner:
+            inner.output(np.zeros((4, 5)))
+        outer.output({"a": np.zeros(3, np.float32), "b": (np.zeros(2), 7)})
+    inner, outer = profiler.records()
+    assert (inner.stage, inner.depth, inner.shapes, inner.nbytes) == (
+        "inner",
+        1,
+        ((4, 5),),
+        160,
+    )
+    assert (outer.stage, outer.depth, outer.shapes, outer.nbytes) == (
+        "outer",
+        0,
+        ((3,), (2,)),
+        28,
+    )
+    assert outer.seconds >= inner.seconds >= 0
+    assert outer.peak_bytes is None
+    assert set(profiler.totals()) == {"inner", "outer"}
+    report = profiler.report()
+    assert "  inner" in report and report.splitlines()[-1].startswith("total")
+    profiler.clear()
+    assert profiler.report() == "No timing recorded"
+
+
+def test_trace_memory():
+    profiler = Profiler(trace_memory=True)
+    with profiler.stage("allocate"):
+        data = np.ones(1 << 20)
+    assert profiler.records()[0].peak_bytes >= data.nbytes
+
+
+def test_disabled():
+    profiler = Profiler(enabled=False)
+    with profiler.stage("nothing") as stage:
+        stage.output(np.zeros(3))
+    assert profiler.records() == []
+
+
+def test_max_records():
+    profiler = Profiler(max_records=3)
+    for i in range(5):
+        with profiler.stage(str(i)):
+            pass
+    assert [record.stage for record in profiler.records()] == ["2", "3", "4"]
+
+
+def test_threads_keep_their_depth():
+    profiler = Profiler()
+
+    def worker():
+        with profiler.stage("thread"):
+            pass
+
+    with profiler.stage("main"):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    assert {r.stage: r.depth for r in profiler.records()} == {"thread": 0, "main": 0}
+
+
+def test_pipeline_stages():
+    profiler = Profiler()
+    wedgecli.compute(ROCK_PROPS, profiler=profiler)
+    stages = [record.stage for record in profiler.records()]
+    assert stages == ["earthmodel", "wavelet", "synth", "tuningcurve", "summary"]
+    synth = profiler.records()[2]
+    assert synth.shapes == ((239, 101),)
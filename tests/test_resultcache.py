@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+# The disk cache of results: hits & misses, keys of normalized inputs, least
+# recently used eviction under the size cap, damaged entries and entries
+# removed by another process while they are looked up
+
+import os
+
+import numpy as np
+import pipeline
+import resultcache
+from conftest import HARD_WEDGE, ROCK_PROPS
+
+
+def arrays(value, size=1000):
+    return {"a": np.full(size, value, dtype=float), "s": np.array("text")}
+
+
+def test_hit_and_miss(tmp_path):
+    cache = resultcache.ResultCache(str(tmp_path))
+    assert cache.get("k") is None
+    cache.put("k", arrays(1))
+    entry = cache.get("k")
+    assert np.array_equal(entry["a"], arrays(1)["a"]) and str(entry["s"]) == "text"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_normalization(tmp_path):
+    cache = resultcache.ResultCache(str(tmp_path))
+    key = cache.key({"rock_props": ROCK_PROPS, "f": 25})
+    assert key == cache.key({"f": 25.0, "rock_props": np.array(ROCK_PROPS)})
+    assert key == cache.key(
+        {"rock_props": tuple(np.int64(x) for x in ROCK_PROPS), "f": 25}
+    )
+    assert key != cache.key({"rock_props": HARD_WEDGE, "f": 25})
+    assert key != cache.key({"rock_props": ROCK_PROPS, "f": 30})
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = resultcache.ResultCache(str(tmp_path), max_bytes=10**9)
+    for n, key in enumerate("abc"):
+        cache.put(key, arrays(n))
+        os.utime(cache.path(key), (n, n))
+    size = os.path.getsize(cache.path("a"))
+    cache.get("a")
+    cache.max_bytes = 2 * size
+    cache.put("d", arrays(3))
+    assert cache.size() == (2, 2 * size)
+    assert cache.get("a") is not None and cache.get("d") is not None
+    assert cache.get("b") is None and cache.get("c") is None
+    cache.clear()
+    assert cache.size() == (0, 0)
+
+
+def test_damaged_entry(tmp_path):
+    cache = resultcache.ResultCache(str(tmp_path))
+    cache.put("k", arrays(1))
+    with open(cache.path("k"), "r+b") as fh:
+        fh.truncate(100)
+    assert cache.get("k") is None
+    assert not os.path.exists(cache.path("k"))
+
+
+def test_removed_before_touch(tmp_path, monkeypatch):
+    cache = resultcache.ResultCache(str(tmp_path))
+    cache.put("k", arrays(1))
+    utime = os.utime
+
+    def prune(path, *args):
+        os.remove(path)
+        utime(path, *args)
+
+    monkeypatch.setattr(resultcache.os, "utime", prune)
+    assert cache.get("k") is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_read_entry_is_evicted_last(tmp_path, monkeypatch):
+    """Another process pruning the cache while an entry is read keeps it"""
+    cache = resultcache.ResultCache(str(tmp_path))
+    for n, key in enumerate("abc"):
+        cache.put(key, arrays(n))
+        os.utime(cache.path(key), (n, n))
+    load = np.load
+
+    def prune(path, **kwargs):
+        resultcache.ResultCache(str(tmp_path)).evict(os.path.getsize(path))
+        return load(path, **kwargs)
+
+    monkeypatch.setattr(resultcache.np, "load", prune)
+    assert cache.get("a")["a"][0] == 0
+    assert sorted(os.listdir(str(tmp_path))) == [".lock", "a.npz"]
+
+
+def test_pipeline(tmp_path):
+    cache = resultcache.ResultCache(str(tmp_path))
+    stages = ("synth", "tuningcurve", "summary")
+    runs = []
+    for _ in range(2):
+        wedge = pipeline.WedgePipeline(ROCK_PROPS, (0.100, 0.001, 25), cache=cache)
+        wedge.run()
+        runs.append([wedge.get(name) for name in stages])
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert np.array_equal(runs[0][0], runs[1][0])
+    for a, b in zip(runs[0][1], runs[1][1]):
+        assert np.array_equal(a, b)
+    assert runs[0][2] == runs[1][2]
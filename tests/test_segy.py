@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+# SEG-Y files read back as the float32 traces and headers written, with the
+# inputs of the export in the textual header
+
+import os
+
+import numpy as np
+import pytest
+import segy
+import wedgebuilder as wb
+import wedgecli
+from conftest import HARD_WEDGE, ROCK_PROPS
+
+
+def read_section(path):
+    """Returns the textual header, binary header and (..., samples, traces)"""
+    text, binary, traces = segy.read_segy(path)
+    data = np.array(traces["data"])
+    header = np.array(traces["header"])
+    del traces
+    return text, binary, data, header
+
+
+@pytest.mark.parametrize("chunk_traces", [1, 40, 4096])
+def test_round_trip(tmp_path, chunk_traces):
+    stack = np.array([ROCK_PROPS, HARD_WEDGE])
+    rc = wb.earthmodel(stack)[1]
+    synth = wb.tuningwedge(rc, wb.wavelet())
+    thickness = wb.wedge_thickness(101) * 0.001
+    path = os.path.join(str(tmp_path), "wedge.sgy")
+    assert segy.write_segy(path, synth, 0.001, thickness, (), chunk_traces) == 202
+    assert os.path.getsize(path) == 3600 + 202 * (240 + 4 * 239)
+    text, binary, data, header = read_section(path)
+    assert (binary["samples"], binary["sample_interval"]) == (239, 1000)
+    assert (binary["format_code"], binary["revision"]) == (5, 0x0100)
+    # one line per model, one row of samples per trace
+    section = np.swapaxes(data.reshape(2, 101, 239), -1, -2)
+    assert np.array_equal(section, synth.astype(np.float32))
+    assert np.array_equal(header["inline"], np.repeat([1, 2], 101))
+    assert np.array_equal(header["crossline"], np.tile(np.arange(1, 102), 2))
+    assert np.array_equal(header["thickness"][:101], np.arange(101) * 1000)
+    assert len(text) == 3200 and text.startswith("C 1 ")
+
+
+def test_text_header():
+    lines = segy.wedge_description(
+        "Tuning wedge synthetic", ROCK_PROPS, (0.100, 0.0005, 25)
+    )
+    assert lines == [
+        "Tuning wedge synthetic",
+        "Layer 1: Vp 3000 m/s, density 2315",
+        "Layer 2: Vp 2200 m/s, density 2150",
+        "Layer 3: Vp 3000 m/s, density 2315",
+        "Wavelet: Ricker 25 Hz, 100 ms long, sampled at 0.5 ms",
+    ]
+    text = segy.text_header(lines).decode("cp037")
+    cards = [text[i : i + 80] for i in range(0, 3200, 80)]
+    assert cards[1].rstrip() == "C 2 LAYER 1: VP 3000 M/S, DENSITY 2315"
+    assert cards[-1].rstrip() == "C40 END TEXTUAL HEADER"
+
+
+def test_cli_header(tmp_path):
+    scenario = {"rock_props": HARD_WEDGE, "f": 30, "duration": 0.080, "dt": 0.002}
+    results = wedgecli.compute(**scenario)
+    path = os.path.join(str(tmp_path), "model.sgy")
+    wedgecli.save_segy(path, results, scenario, "imp")
+    text, binary, data, header = read_section(path)
+    assert "TUNING WEDGE IMPEDANCE" in text
+    assert "LAYER 2: VP 3400 M/S, DENSITY 2450" in text
+    assert "WAVELET: RICKER 30 HZ, 80 MS LONG, SAMPLED AT 2 MS" in text
+    assert binary["sample_interval"] == 2000
+    assert np.array_equal(data.T, results["imp"].astype(np.float32))
+
+
+@pytest.mark.parametrize("dt, samples", [(0, 10), (0.1, 10), (0.001, 70000)])
+def test_invalid(tmp_path, dt, samples):
+    path = os.path.join(str(tmp_path), "bad.sgy")
+    with pytest.raises(ValueError):
+        segy.write_segy(path, np.zeros((samples, 2)), dt)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+# The HTTP/JSON server answers malformed and invalid requests with a 4xx status
+# and a JSON error, or closes the connection cleanly, and stays up for the
+# requests that follow
+
+import asyncio
+import json
+import socket
+import threading
+
+import pytest
+import wedgeserver as ws
+
+ROCK_PROPS = [3000, 2315, 2200, 2150, 3000, 2315]
+
+
+@pytest.fixture(scope="module")
+def port():
+    """Serves a WedgeServer with one worker on a free port of a thread"""
+    loop = asyncio.new_event_loop()
+    server = ws.WedgeServer(workers=1)
+    address = loop.run_until_complete(server.start("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield address[1]
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def exchange(port, data):
+    """Returns all the bytes the server sends back for data, until it closes"""
+    with socket.create_connection(("127.0.0.1", port), timeout=30) as sock:
+        sock.sendall(data)
+        sock.shutdown(socket.SHUT_WR)
+        reply = b""
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return reply
+            reply += chunk
+
+
+def post(port, path, params=None, body=None, headers=None):
+    """Returns the status and the decoded JSON reply of a POST request"""
+    if body is None:
+        body = json.dumps(params).encode()
+    head = {"Content-Length": str(len(body)), "Connection": "close"}
+    head.update(headers or {})
+    request = "POST {} HTTP/1.1\r\nHost: test\r\n{}\r\n".format(
+        path, "".join("{}: {}\r\n".format(k, v) for k, v in head.items())
+    )
+    reply = exchange(port, request.encode("latin-1") + body)
+    status = int(reply.split(b" ", 2)[1])
+    return status, json.loads(reply.partition(b"\r\n\r\n")[2])
+
+
+def test_compute(port):
+    status, record = post(port, "/compute", {"rock_props": ROCK_PROPS})
+    assert status == 200
+    assert record["z_tuning"] > 0
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_invalid_content_length(port, length):
+    status, reply = post(
+        port, "/compute", body=b"{}", headers={"Content-Length": length}
+    )
+    assert status == 400
+    assert "Content-Length" in reply["error"]
+
+
+def test_short_body_closes(port):
+    request = b"POST /compute HTTP/1.1\r\nContent-Length: 100\r\n\r\n{}"
+    assert exchange(port, request) == b""
+    assert post(port, "/compute", {"rock_props": ROCK_PROPS})[0] == 200
+
+
+def test_body_too_large(port):
+    request = "POST /compute HTTP/1.1\r\nContent-Length: {}\r\n\r\n".format(
+        ws.MAX_BODY + 1
+    )
+    assert exchange(port, request.encode()).startswith(b"HTTP/1.1 413")
+
+
+def test_invalid_json(port):
+    status, reply = post(port, "/compute", body=b"{not json")
+    assert (status, reply["error"]) == (400, "Invalid JSON")
+
+
+def test_unknown_path(port):
+    assert post(port, "/nope", {})[0] == 404
+
+
+def test_method_not_allowed(port):
+    reply = exchange(port, b"GET /compute HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert reply.startswith(b"HTTP/1.1 405")
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"rock_props": ROCK_PROPS, "bogus": 1},
+        {"rock_props": ROCK_PROPS, "wavelets": [{"file": "/etc/passwd"}]},
+        {"rock_props": ROCK_PROPS, "dt": 0},
+        {"rock_props": ROCK_PROPS, "duration": -0.1},
+        {"rock_props": ROCK_PROPS, "f": 0},
+    ],
+)
+def test_invalid_scenario(port, params):
+    status, reply = post(port, "/compute", params)
+    assert status == 400
+    assert reply["error"]
+
+
+def test_summary_rejects_arrays(port):
+    params = {"rock_props": ROCK_PROPS, "arrays": ["amp"]}
+    assert post(port, "/summary", params)[0] == 400
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"rock_props": ROCK_PROPS, "f": [20, 0]},
+        {"rock_props": ROCK_PROPS, "dt": 0},
+        {"rock_props": ROCK_PROPS, "geometry": {"traces": 0}},
+        {"rock_props": ROCK_PROPS, "geometry": {"workers": 4}},
+    ],
+)
+def test_invalid_sweep(port, params):
+    assert post(port, "/sweep", params)[0] == 400
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+# The sparse reflectivity engine gives the dense RCs of the earth model and the
+# synthetic of the direct convolution, for the wedge and for N layer models
+
+import numpy as np
+import pytest
+import reference as ref
+import wedgebuilder as wb
+from conftest import HARD_WEDGE, ROCK_PROPS
+
+
+@pytest.mark.parametrize("rock_props", [ROCK_PROPS, HARD_WEDGE])
+@pytest.mark.parametrize("duration, f", [(0.100, 25), (0.040, 60), (0.200, 8)])
+def test_wedge(rock_props, duration, f):
+    rc = wb.earthmodel(rock_props)[1]
+    sparse = wb.sparse_reflectivity(rock_props, wb.wedge_interfaces())
+    assert np.array_equal(wb.dense_reflectivity(sparse), rc)
+    # two spikes per trace sum exactly like the direct engine
+    w = ref.wavelet(duration, 0.001, f)
+    assert np.array_equal(wb.tuningwedge(sparse, w), wb.tuningwedge(rc, w, "direct"))
+
+
+def test_stack():
+    stack = np.array([ROCK_PROPS, HARD_WEDGE])
+    sparse = wb.sparse_reflectivity(stack, wb.wedge_interfaces())
+    assert np.array_equal(wb.dense_reflectivity(sparse), wb.earthmodel(stack)[1])
+
+
+@pytest.mark.parametrize("layers", [2, 5, 9])
+def test_layers(layers):
+    """N layer models, with pinched out and crossing layers and interfaces
+    outside the model, match the RCs of their dense impedance model"""
+    rng = np.random.default_rng(layers)
+    rocks = rng.uniform([1500, 1800] * layers, [5000, 2700] * layers)
+    interfaces = rng.integers(-5, 245, (layers - 1, 101))
+    interfaces[:, ::3] = np.sort(interfaces[:, ::3], axis=0)
+    interfaces[1:, ::7] = interfaces[0, ::7]
+    AI = rocks[0::2] * rocks[1::2]
+    imp = AI[wb._layer_model(240, interfaces)]
+    rc = (imp[1:] - imp[:-1]) / (imp[1:] + imp[:-1])
+
+    sparse = wb.sparse_reflectivity(rocks, interfaces)
+    assert np.array_equal(wb.dense_reflectivity(sparse), rc)
+    w = wb.wavelet()
+    np.testing.assert_allclose(
+        wb.tuningwedge(sparse, w), wb.tuningwedge(rc, w, "direct"), 0, 1e-12
+    )
+
+
+def test_interface_count():
+    with pytest.raises(ValueError):
+        wb.sparse_reflectivity(ROCK_PROPS, np.zeros((3, 101), int))
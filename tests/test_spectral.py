@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+# Spectral decomposition of the wedge: the panel & STFT are the spectra of
+# every trace & frame on its own, and the notch spacing gives the thickness of
+# the wedge, for either polarity of its reflections and any sample rate
+
+import numpy as np
+import pytest
+import spectral
+import wedgebuilder as wb
+from conftest import ROCK_PROPS
+
+
+@pytest.fixture(scope="module")
+def synth():
+    return wb.tuningwedge(wb.earthmodel(ROCK_PROPS)[1], wb.wavelet())
+
+
+@pytest.mark.parametrize("window, taper", [("boxcar", np.ones), ("hann", np.hanning)])
+def test_panel(synth, window, taper):
+    f, amp = spectral.spectral_panel(synth, start=50, length=100, window=window)
+    assert np.allclose(np.diff(f), f[1]) and f[1] <= 1
+    gate = synth[50:150, 7] * taper(100)
+    np.testing.assert_allclose(
+        amp[:, 7], np.abs(np.fft.rfft(gate, 2 * len(f) - 2)), 0, 1e-12
+    )
+
+
+def test_stack(synth):
+    stack = np.stack([synth, -2 * synth])
+    f, amp = spectral.spectral_panel(stack, nfft=256)
+    assert amp.shape == (2, 129, 101)
+    assert np.array_equal(amp[0], spectral.spectral_panel(synth, nfft=256)[1])
+    np.testing.assert_allclose(amp[1], 2 * amp[0], 1e-12)
+
+
+def test_stft(synth):
+    t, f, amp = spectral.stft(synth, length=20, hop=3)
+    assert amp.shape == (len(t), len(f), 101) and len(t) == (239 - 20) // 3 + 1
+    assert t[5] == pytest.approx((15 + 9.5) * 0.001)
+    frame = synth[15:35, 60] * np.hanning(20)
+    np.testing.assert_allclose(
+        amp[5, :, 60], np.abs(np.fft.rfft(frame, 2 * len(f) - 2)), 0, 1e-12
+    )
+    for length, hop in ((0, 1), (240, 1), (20, 0)):
+        with pytest.raises(ValueError):
+            spectral.stft(synth, length=length, hop=hop)
+
+
+@pytest.mark.parametrize(
+    "rock_props, geometry",
+    [
+        (ROCK_PROPS, {}),
+        # reflections of the same polarity at the top & base of the wedge
+        ([2000, 2000, 2500, 2300, 3000, 2500], {}),
+        (ROCK_PROPS, {"dt": 0.0005, "samples": 480}),
+    ],
+)
+def test_notch_thickness(rock_props, geometry):
+    dt = geometry.get("dt", 0.001)
+    rc = wb.earthmodel(rock_props, **geometry)[1]
+    w = wb.wavelet(0.100, dt, 25)
+    spectra = spectral.wedge_spectra(wb.tuningwedge(rc, w), w, dt, rc=rc)
+    thickness = wb.wedge_thickness(101, dt) * dt
+    found = spectra["count"] > 0
+    assert found[thickness >= 0.020].all()
+    error = np.abs(spectra["thickness"][found] - thickness[found])
+    assert error.max() < 0.0005
+
+
+def test_unknown_window(synth):
+    with pytest.raises(ValueError):
+        spectral.spectral_panel(synth, window="bogus")
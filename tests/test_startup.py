@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+# The headless command line starts fast and without the GUI toolkits, which are
+# slow to import and missing on compute nodes
+
+import subprocess
+import sys
+import time
+
+from conftest import SRC
+
+# seconds a fresh interpreter may take to import wedgecli, the best of REPEAT
+STARTUP_BUDGET = 1.0
+REPEAT = 3
+
+GUI_MODULES = ("PyQt5", "matplotlib")
+
+
+def import_wedgecli():
+    """Returns the seconds a fresh interpreter took to import wedgecli and the
+    top-level packages it imported
+    """
+    code = "import sys, wedgecli; print(' '.join(sys.modules))"
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SRC,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    seconds = time.perf_counter() - start
+    return seconds, {name.split(".")[0] for name in out.stdout.split()}
+
+
+def test_startup_time():
+    seconds = min(import_wedgecli()[0] for _ in range(REPEAT))
+    assert seconds < STARTUP_BUDGET, "importing wedgecli took {:.3f} s".format(seconds)
+
+
+def test_no_gui_modules():
+    loaded = import_wedgecli()[1]
+    assert not loaded & set(GUI_MODULES)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+# The wedge streamed in trace blocks gives the arrays and the tuning curve of
+# the wedge built in memory, whatever the block size
+
+import os
+
+import numpy as np
+import pytest
+import wedgebuilder as wb
+from conftest import HARD_WEDGE, ROCK_PROPS
+
+STACK = np.array([ROCK_PROPS, HARD_WEDGE])
+
+
+@pytest.mark.parametrize("block_traces", [1, 7, 64, 1024])
+def test_blocks(block_traces):
+    w = wb.wavelet()
+    imp, rc = wb.earthmodel(STACK)
+    synth = wb.tuningwedge(rc, w)
+    starts = []
+    for block in wb.wedge_blocks(STACK, w, block_traces):
+        cols = slice(block.start, block.start + block.synth.shape[-1])
+        starts.append(block.start)
+        assert np.array_equal(block.imp, imp[..., cols])
+        assert np.array_equal(block.rc, rc[..., cols])
+        assert np.allclose(block.synth, synth[..., cols], 0, 1e-12)
+    assert starts == list(range(0, 101, block_traces))
+
+
+@pytest.mark.parametrize("block_traces", [1, 7, 64])
+def test_tuningcurve_blocks(block_traces):
+    w = wb.wavelet()
+    rc = wb.earthmodel(STACK)[1]
+    curve = wb.tuningcurve(rc, wb.tuningwedge(rc, w))
+    blocks = wb.wedge_blocks(STACK, w, block_traces)
+    for a, b in zip(wb.tuningcurve_blocks(blocks, STACK), curve):
+        assert np.array_equal(a, b)
+
+
+def test_stream_wedge(tmp_path):
+    path = os.path.join(str(tmp_path), "synth.npy")
+    geometry = {"traces": 301, "dz": 0.0005}
+    w = wb.wavelet()
+    curve = wb.stream_wedge(path, ROCK_PROPS, w, 50, np.float32, **geometry)
+    rc = wb.earthmodel(ROCK_PROPS, dtype=np.float32, **geometry)[1]
+    synth = wb.tuningwedge(rc, w, dtype=np.float32)
+    streamed = np.load(path, mmap_mode="r")
+    assert streamed.dtype == np.float32 and streamed.shape == synth.shape
+    assert np.allclose(streamed, synth, 0, 1e-6)
+    assert curve[1] == wb.tuningcurve(rc, synth)[1]
+    del streamed
+
+
+def test_write_npy_fields(tmp_path):
+    path = os.path.join(str(tmp_path), "imp.npy")
+    blocks = wb.wedge_blocks(ROCK_PROPS, wb.wavelet(), 30)
+    passed = list(wb.write_npy(blocks, path, 101, field="imp"))
+    assert len(passed) == 4
+    assert np.array_equal(np.load(path), wb.earthmodel(ROCK_PROPS)[0])
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+# The vectorized tuning curve reproduces the original, for one model and for a
+# stack of models in one call
+
+import numpy as np
+import pytest
+import reference as ref
+import wedgebuilder as wb
+from conftest import HARD_WEDGE, ROCK_PROPS
+
+
+@pytest.mark.parametrize("rock_props", [ROCK_PROPS, HARD_WEDGE])
+@pytest.mark.parametrize("f", [15, 25, 40])
+def test_reference(rock_props, f):
+    rc = ref.earthmodel(rock_props)[1]
+    synth = ref.tuningwedge(rc, ref.wavelet(0.100, 0.001, f))
+    expected = ref.tuningcurve(rc, synth, rock_props)
+    curve = wb.tuningcurve(rc, synth)
+    for a, b in zip(curve, expected):
+        assert np.array_equal(a, b)
+    # rock_props is accepted and not needed
+    assert np.array_equal(wb.tuningcurve(rc, synth, rock_props)[1], curve[1])
+
+
+def test_stack():
+    stack = np.array([ROCK_PROPS, HARD_WEDGE, np.add(ROCK_PROPS, 200)])
+    rc = wb.earthmodel(stack)[1]
+    synth = wb.tuningwedge(rc, wb.wavelet())
+    curve = wb.tuningcurve(rc, synth)
+    assert curve[1].shape == curve[4].shape == (3,)
+    for k in range(len(stack)):
+        single = wb.tuningcurve(rc[k], synth[k])
+        for a, b in zip(curve, single):
+            assert np.array_equal(a[k], b)
+
+
+def test_no_tuning():
+    # a flat amplitude along the top of the wedge has no tuning onset
+    assert wb._tuning_onset(np.ones(101)) == 0
+    assert np.array_equal(wb._tuning_onset(np.ones((2, 101))), [0, 0])
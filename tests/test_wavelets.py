@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+# The wavelet bank: its wedges are those of its wavelets one at a time, its
+# Ricker wavelets those of wedgebuilder, and extracted wavelets are loaded and
+# resampled onto its time axis
+
+import numpy as np
+import pytest
+import wavelets
+import wedgebuilder as wb
+from conftest import ROCK_PROPS
+
+
+@pytest.fixture(scope="module")
+def bank():
+    bank = wavelets.WaveletBank(0.100, 0.001)
+    bank.add("ricker", [20, 25, 30]).add("ormsby", 5, 10, 40, 50)
+    bank.add("klauder", 10, 60).add("butterworth", 8, 50)
+    return bank
+
+
+def test_bank(bank):
+    assert len(bank) == 6
+    assert bank.names[:4] == [
+        "ricker(20)",
+        "ricker(25)",
+        "ricker(30)",
+        "ormsby(5, 10, 40, 50)",
+    ]
+    assert np.array_equal(bank.w[1], wb.wavelet())
+    # the time axis misses t = 0 by a fraction of dt
+    assert np.allclose(bank.w.max(axis=-1), 1, 0, 0.002)
+    assert not bank.w.flags.writeable
+
+
+@pytest.mark.parametrize("method", ["direct", "fft"])
+def test_tuningwedge(bank, method):
+    rc = wb.earthmodel(ROCK_PROPS)[1]
+    synth = bank.tuningwedge(rc, method)
+    assert synth.shape == (6, 239, 101)
+    for i, w in enumerate(bank.w):
+        np.testing.assert_allclose(synth[i], wb.tuningwedge(rc, w, method), 0, 1e-12)
+    curve = bank.tuningcurve(rc, synth)
+    assert curve[1][1] == wb.tuningcurve(rc, synth[1])[1]
+
+
+def test_sparse(bank):
+    sparse = wb.sparse_reflectivity(ROCK_PROPS, wb.wedge_interfaces())
+    rc = wb.dense_reflectivity(sparse)
+    np.testing.assert_allclose(
+        bank.tuningwedge(sparse), bank.tuningwedge(rc, "direct"), 0, 1e-12
+    )
+
+
+def test_blocks(monkeypatch):
+    """The cosine sums of the zero phase wavelets are the same in any blocks"""
+    t = wb.wavelet_time(0.100, 0.001)
+    w = wavelets.butterworth(t, 8, 50)
+    monkeypatch.setattr(wavelets, "BLOCK_BYTES", 64)
+    np.testing.assert_allclose(wavelets.butterworth(t, 8, 50), w, 0, 1e-12)
+
+
+def test_load(tmp_path):
+    t = wb.wavelet_time(0.100, 0.001)
+    w = wb.wavelet()
+    np.save(str(tmp_path / "column.npy"), w[10:-10])
+    np.savetxt(
+        str(tmp_path / "pairs.csv"),
+        np.stack([t, w], 1),
+        delimiter=",",
+        header="time,amplitude",
+        comments="",
+    )
+    bank = wavelets.WaveletBank(0.100, 0.001)
+    bank.load(str(tmp_path / "column.npy")).load(str(tmp_path / "pairs.csv"), "well")
+    assert bank.names == ["column.npy", "well"]
+    expected = w.copy()
+    expected[:10] = expected[-10:] = 0
+    assert np.array_equal(bank.w[0], expected)
+    np.testing.assert_allclose(bank.w[1], w, 0, 1e-12)
+
+
+def test_resample():
+    t = wb.wavelet_time(0.020, 0.001)
+    time = np.array([-0.008, 0.0, 0.008])
+    w = wavelets.resample(t, time, [0, 1, 0])
+    inside = np.abs(t) < 0.008
+    assert np.allclose(w[inside], 1 - np.abs(t[inside]) / 0.008)
+    assert not np.any(w[~inside])
+    with pytest.raises(ValueError):
+        wavelets.resample(t, time[::-1], [0, 1, 0])
+
+
+def test_wavelet_bank(tmp_path):
+    np.save(str(tmp_path / "well.npy"), wb.wavelet(0.050))
+    spec = [{"ricker": [[20, 30]]}, {"file": str(tmp_path / "well.npy"), "name": "w3"}]
+    bank = wavelets.wavelet_bank(spec)
+    assert bank.names == ["ricker(20)", "ricker(30)", "w3"]
+    assert np.array_equal(bank.w[0], wb.wavelet(0.100, 0.001, 20))
+    for spec in ([{"bogus": 1}], [{"ricker": 25, "ormsby": [5, 10, 40, 50]}]):
+        with pytest.raises(ValueError):
+            wavelets.wavelet_bank(spec)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+# The redraw path of the plots: the wedge view follows the geometry of the
+# wedge, decimation keeps the extremes, and updated artists show the new data
+
+import numpy as np
+import pytest
+import wedgebuilder as wb
+from conftest import HARD_WEDGE, ROCK_PROPS
+
+pytest.importorskip("matplotlib")
+import wedgeplots  # noqa: E402
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+
+def wedge(rock_props, **geometry):
+    imp, rc = wb.earthmodel(rock_props, **geometry)
+    return imp, wb.tuningwedge(rc, wb.wavelet()), rc
+
+
+def axes():
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig.add_subplot(211), fig.add_subplot(212)
+
+
+@pytest.mark.parametrize("traces", [41, 101, 501])
+def test_wedge_view_follows_the_traces(traces):
+    ax_model, ax_wedge = axes()
+    imp, synth, rc = wedge(ROCK_PROPS, traces=traces, dz=0.100 / (traces - 1))
+    images = wedgeplots.plot_wedge(ax_model, ax_wedge, imp, synth, rc, (50, 60))
+    assert ax_wedge.get_xlim() == (0, traces - 1)
+    # decimated images keep the extent of the full arrays
+    assert images[1].get_extent() == [-0.5, traces - 0.5, 238.5, -0.5]
+
+
+def test_update_wedge():
+    ax_model, ax_wedge = axes()
+    images = wedgeplots.plot_wedge(ax_model, ax_wedge, *wedge(ROCK_PROPS))
+    imp, synth, rc = wedge(HARD_WEDGE)
+    wedgeplots.update_wedge(images, imp, synth, rc)
+    assert np.array_equal(images[0].get_array(), imp)
+    assert np.array_equal(images[1].get_array(), synth)
+    assert images[1].get_clim() == (synth.min(), synth.max())
+
+
+def test_decimate_keeps_extremes():
+    arr = np.zeros((100, 1000))
+    arr[37, 501] = 5
+    arr[80, 3] = -7
+    small = wedgeplots.decimate(arr, (50, 100))
+    assert small.shape == (50, 100)
+    assert small.max() == 5 and small.min() == -7
+    assert wedgeplots.decimate(arr, (100, 1000)) is arr
+    assert wedgeplots.decimate(arr) is arr
+
+
+def test_update_tuningcurve():
+    ax, ax2 = axes()
+    imp, synth, rc = wedge(ROCK_PROPS)
+    z, z_tuning, amp, z_apparent, z_onset = wb.tuningcurve(rc, synth)
+    artists = wedgeplots.plot_tuningcurve(
+        ax, ax2, z, amp, z_tuning, z_apparent, z_onset
+    )
+    # the same curve needs no full draw
+    assert not wedgeplots.update_tuningcurve(
+        artists, z, amp, z_tuning, z_apparent, z_onset
+    )
+    rc = wb.earthmodel(ROCK_PROPS)[1]
+    synth = wb.tuningwedge(rc, wb.wavelet(0.100, 0.001, 15))
+    z, z_tuning, amp, z_apparent, z_onset = wb.tuningcurve(rc, synth)
+    assert wedgeplots.update_tuningcurve(artists, z, amp, z_tuning, z_apparent, z_onset)
+    assert np.array_equal(artists.amp.get_ydata(), amp)
+    assert artists.legend.get_texts()[1].get_text() == (
+        "Measured Tuning Thickness {}ms TWT".format(z_tuning)
+    )